@@ -1,8 +1,12 @@
 import streamlit as st
 from PIL import Image
-from utils import load_data, alignement
+from utils import alignement
+from kpis import year_kpis
+from filters import sidebar_filters
+from perf import finish_run, start_run
 
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Accidents in France")
+start_run("home")
 
 
 st.title("💥 Analysis of Road Accidents in France")
@@ -11,22 +15,16 @@ st.title("💥 Analysis of Road Accidents in France")
 selected_year = st.sidebar.slider(
     "Select a year", min_value=2019, max_value=2021, value=2021, step=1
 )
-characteristics, locations, users, vehicles = load_data(selected_year)
-data_complete = (
-    characteristics.merge(users, on="Num_Acc")
-    .merge(locations, on="Num_Acc")
-    .merge(vehicles, on="Num_Acc")
-)
-
-# Calculate the total number of accidents after merging
-total_accidents = len(data_complete["Num_Acc"].unique())
-
-# Calculate the total number of deaths after merging
-total_deaths = len(data_complete[data_complete["grav"] == 2]["Num_Acc"].unique())
+active_filters = sidebar_filters(selected_year)
+kpis = year_kpis(selected_year, active_filters)
+total_accidents = kpis["accidents"]
+total_deaths = kpis["fatal_accidents"]
+total_injured = kpis["injured"]
 st.markdown(
     f"""
 <div style="display: inline-block;border: 5px solid blue;border-radius: 25px;padding: 10px 20px;margin: 5px;margin-top: 50px;"><h2 style="margin: 5px;">Total Accidents: <span style="color: blue; font-weight: bold;">{total_accidents}</span></h2></div>
 <div style="display: inline-block;border: 5px solid red;border-radius: 25px;padding: 10px 20px;margin: 5px;margin-top: 50px;"><h2 style="margin: 5px;">Total Deaths:     <span style="color: red; font-weight: bold;">{total_deaths}</span></h2></div>
+<div style="display: inline-block;border: 5px solid orange;border-radius: 25px;padding: 10px 20px;margin: 5px;margin-top: 50px;"><h2 style="margin: 5px;">Total Injured:     <span style="color: orange; font-weight: bold;">{total_injured}</span></h2></div>
 """,
     unsafe_allow_html=True,
 )
@@ -81,3 +79,5 @@ st.write(
 )
 
 st.write("Made by Cléophas Fournier - DATAVZ2023EFREI")
+
+finish_run()
@@ -0,0 +1,228 @@
+# Résumés annuels persistés (quelques centaines d'octets par année) pour la page
+# d'évolution : comptes par gravité et par mois x gravité des usagers accidentés.
+# Chaque résumé garde l'empreinte SHA-1 de ses CSV sources ; seule une année dont
+# les fichiers ont changé est recalculée.
+import functools
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from filters import NO_FILTERS, filter_key, row_masks
+from joins import accident_positions
+from perf import timed
+from utils import iter_chunks, load_data, load_years, source_path, source_signature
+
+AGGREGATES_DIR = os.environ.get("ACCIDENTS_AGGREGATES_DIR", "assets/.aggregates")
+
+# Incrémenté quand le contenu des résumés change
+AGGREGATES_VERSION = 1
+
+SOURCE_TABLES = ("caracteristiques", "usagers")
+
+# Calcul des résumés en flux, pour les archives qui ne tiennent pas en mémoire
+STREAMING = os.environ.get("ACCIDENTS_STREAMING", "0") == "1"
+
+
+def summary_path(year):
+    return os.path.join(AGGREGATES_DIR, f"{year}.json")
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(year, previous=None):
+    # On ne relit un fichier pour le hacher que si sa date ou sa taille a changé
+    previous = previous or {}
+    fingerprint = {}
+    for table in SOURCE_TABLES:
+        path = source_path(year, table)
+        stat = os.stat(path)
+        known = previous.get(table, {})
+        if (known.get("mtime_ns"), known.get("size")) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            sha1 = known["sha1"]
+        else:
+            sha1 = file_sha1(path)
+        fingerprint[table] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha1": sha1,
+        }
+    return fingerprint
+
+
+def _counts(*columns):
+    # {"code": effectif}, ou {"code1:code2": effectif} pour plusieurs colonnes
+    combos, counts = np.unique(np.column_stack(columns), axis=0, return_counts=True)
+    return {
+        ":".join(str(code) for code in combo): int(count)
+        for combo, count in zip(combos, counts)
+    }
+
+
+def compute_summary(characteristics, users):
+    # Usagers dont l'accident figure dans les caractéristiques (jointure interne)
+    positions = accident_positions(characteristics, users["Num_Acc"].to_numpy())
+    keep = positions >= 0
+    grav = users["grav"].to_numpy(dtype=np.int64, na_value=-1)[keep]
+    month = characteristics["mois"].to_numpy(dtype=np.int64, na_value=-1)
+    return {
+        "accidents": int(characteristics["Num_Acc"].nunique()),
+        "users": int(keep.sum()),
+        "by_grav": _counts(grav),
+        "by_month_grav": _counts(month[positions[keep]], grav),
+    }
+
+
+def _add_summaries(total, part):
+    for name, value in part.items():
+        if isinstance(value, dict):
+            counts = total.setdefault(name, {})
+            for code, count in value.items():
+                counts[code] = counts.get(code, 0) + count
+        elif name != "accidents":
+            total[name] = total.get(name, 0) + value
+    return total
+
+
+def compute_summary_streaming(year, memory_mb=None):
+    # Même résultat que compute_summary sans jamais charger une table entière :
+    # seules les colonnes Num_Acc et mois des caractéristiques sont gardées,
+    # les usagers défilent par morceaux
+    characteristics = pd.concat(
+        iter_chunks(year, "caracteristiques", ["Num_Acc", "mois"], memory_mb),
+        ignore_index=True,
+    )
+    summary = {"accidents": int(characteristics["Num_Acc"].nunique()), "users": 0}
+    for users in iter_chunks(year, "usagers", ["Num_Acc", "grav"], memory_mb):
+        _add_summaries(summary, compute_summary(characteristics, users))
+    # Ordre des clés identique au calcul en mémoire
+    for name in ("by_grav", "by_month_grav"):
+        summary[name] = dict(
+            sorted(summary.get(name, {}).items(), key=lambda item: _code_key(item[0]))
+        )
+    return summary
+
+
+def _code_key(code):
+    return tuple(int(part) for part in code.split(":"))
+
+
+def _load(year):
+    try:
+        with open(summary_path(year)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _store(year, summary):
+    path = summary_path(year)
+    try:
+        os.makedirs(AGGREGATES_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(summary, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # dossier en lecture seule : le résumé sera recalculé la prochaine fois
+
+
+def _hashes(fingerprint):
+    return {table: source["sha1"] for table, source in fingerprint.items()}
+
+
+def _stored_summary(year):
+    # (résumé stocké encore valable ou None, empreinte actuelle des sources)
+    stored = _load(year)
+    previous = stored["sources"] if stored else None
+    fingerprint = source_fingerprint(year, previous)
+    if stored and stored.get("version") == AGGREGATES_VERSION:
+        if _hashes(fingerprint) == _hashes(previous):
+            if fingerprint != previous:
+                # Fichier touché mais contenu identique : on met juste à jour les dates
+                stored = {**stored, "sources": fingerprint}
+                _store(year, stored)
+            return stored, fingerprint
+    return None, fingerprint
+
+
+def _year_rows(df, year):
+    # load_years concatène les années dans l'ordre : tranche contiguë de l'année
+    years = df["year"].to_numpy()
+    start, stop = np.searchsorted(years, [year, year + 1])
+    return df.iloc[start:stop]
+
+
+def _compute_summaries(years):
+    if STREAMING:
+        return {year: compute_summary_streaming(year) for year in years}
+    # Années à recalculer lues ensemble, chaque (année, table) dans son thread
+    tables = load_years(years, SOURCE_TABLES)
+    return {
+        year: compute_summary(
+            *(_year_rows(tables[table], year) for table in SOURCE_TABLES)
+        )
+        for year in years
+    }
+
+
+def year_summaries(years):
+    # Empreintes vérifiées en parallèle (hachage des seuls fichiers modifiés)
+    with ThreadPoolExecutor() as executor:
+        stored = dict(zip(years, executor.map(_stored_summary, years)))
+    stale = [year for year, (summary, _) in stored.items() if summary is None]
+    computed = _compute_summaries(stale) if stale else {}
+
+    summaries = {}
+    for year, (summary, fingerprint) in stored.items():
+        if summary is None:
+            summary = {
+                "version": AGGREGATES_VERSION,
+                "sources": fingerprint,
+                **computed[year],
+            }
+            _store(year, summary)
+        summaries[year] = summary
+    return summaries
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_filtered_summary(year, signature, filters):
+    # Même grain que les résumés persistés (usagers joints à leur accident), sur
+    # les lignes retenues par les filtres globaux
+    characteristics, _, users, _ = load_data(year)
+    masks = row_masks(year, filters)
+    return compute_summary(
+        characteristics[masks["caracteristiques"]], users[masks["usagers"]]
+    )
+
+
+@timed
+def yearly_severity_counts(years, filters=NO_FILTERS):
+    # Une ligne par (an, grav) ; sans filtre, lue dans les résumés persistés
+    filters = filter_key(filters)
+    if filters:
+        summaries = {
+            year: _cached_filtered_summary(year, source_signature(year), filters)
+            for year in years
+        }
+    else:
+        summaries = year_summaries(years)
+    rows = [
+        (year, int(grav), count)
+        for year, summary in summaries.items()
+        for grav, count in summary["by_grav"].items()
+    ]
+    return pd.DataFrame(rows, columns=["an", "grav", "number_of_accidents"])
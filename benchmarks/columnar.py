@@ -0,0 +1,64 @@
+# Compare le chargement à froid depuis les CSV et depuis les copies Parquet.
+# Lancer depuis la racine du dépôt : python -m benchmarks.columnar
+import json
+import os
+import subprocess
+import sys
+
+import utils
+
+# Chaque mesure tourne dans un processus neuf : temps à froid et pic RSS non biaisés
+CHILD = """
+import json, resource, sys, time
+import utils
+years, columnar = json.loads(sys.argv[1]), sys.argv[2] == "1"
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+for year in years:
+    for table in utils.TABLES:
+        utils.read_table(year, table, columnar=columnar)
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "peak_rss_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base) / 1024}))
+"""
+
+
+def available_years():
+    return [
+        year
+        for year in range(2005, 2030)
+        if all(os.path.exists(utils.source_path(year, table)) for table in utils.TABLES)
+    ]
+
+
+def measure(years, columnar):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, json.dumps(years), "1" if columnar else "0"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    years = available_years()
+    if not years:
+        sys.exit("No complete year found under assets/")
+
+    # Construit les copies colonnaires avant de mesurer leur lecture
+    for year in years:
+        for table in utils.TABLES:
+            utils.read_table(year, table)
+
+    print(f"{'years':<12}{'source':<10}{'seconds':>10}{'peak RSS +MB':>16}")
+    for label, subset in ((str(years[-1]), years[-1:]), ("all", years)):
+        for source, columnar in (("csv", False), ("parquet", True)):
+            result = measure(subset, columnar)
+            print(
+                f"{label:<12}{source:<10}{result['seconds']:>10.3f}"
+                f"{result['peak_rss_mb']:>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
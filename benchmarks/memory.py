@@ -0,0 +1,37 @@
+# Mémoire occupée par chaque table avec et sans le schéma compact de schema.py.
+# Lancer depuis la racine du dépôt : python -m benchmarks.memory [année]
+import sys
+
+import pandas as pd
+
+import schema
+import utils
+
+
+def untyped_table(year, table):
+    df = pd.read_csv(utils.source_path(year, table), **utils.csv_options(year))
+    if table == "caracteristiques" and year > 2018:
+        df = utils.clean_characteristics(df)
+    return df
+
+
+def main():
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2021
+    print(f"{'table':<20}{'before (MB)':>14}{'after (MB)':>14}{'ratio':>8}")
+    total_before = total_after = 0
+    for table in utils.TABLES:
+        before = schema.memory_usage(untyped_table(year, table))
+        after = schema.memory_usage(utils.read_table(year, table, columnar=False))
+        total_before += before
+        total_after += after
+        print(
+            f"{table:<20}{before / 1e6:>14.2f}{after / 1e6:>14.2f}{before / after:>8.1f}"
+        )
+    print(
+        f"{'total':<20}{total_before / 1e6:>14.2f}{total_after / 1e6:>14.2f}"
+        f"{total_before / total_after:>8.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
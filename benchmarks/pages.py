@@ -0,0 +1,551 @@
+# Mesure, sans navigateur, le chemin de données de chaque page : chargement et
+# nettoyage des tables, jointures et cube, agrégats, construction de chaque figure
+# create_*, puis rendu complet du script. Les données réelles sont répliquées à
+# 1×, 5× et 20× (assets/.bench/<n>x, environ n fois la place des CSV) et chaque
+# échelle tourne dans un processus neuf, à froid. Résultats en JSON, comparables
+# d'un commit à l'autre. Sans les CSV réels, --synthetic mesure sur un jeu généré
+# par benchmarks.synthetic (n fois le nombre d'accidents publié de chaque année).
+# Mémoire de chaque étape : pic RSS du processus ; sous tracemalloc, pic alloué,
+# blocs encore vivants à la fin parmi ceux alloués pendant l'étape
+# (traced_live_blocks) et variation nette des blocs vivants de tout l'interpréteur
+# (net_live_blocks). CPython ne fournit pas le nombre total d'allocations.
+# Lancer depuis la racine du dépôt :
+#   python -m benchmarks.pages [--scales 1 5 20] [--year 2021] [--synthetic]
+#                              [--output f.json]
+#   python -m benchmarks.pages --compare avant.json après.json
+import argparse
+import ast
+import gc
+import glob
+import json
+import os
+import platform
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+import utils
+from aggregates import AGGREGATES_DIR
+from benchmarks import synthetic
+from benchmarks.columnar import available_years
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_DIR = os.environ.get("ACCIDENTS_BENCH_DIR", "assets/.bench")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+SCALES = (1, 5, 20)
+
+# Années générées avec --synthetic : celles lues par les pages (Year evolution)
+SYNTHETIC_YEARS = list(range(2017, 2022))
+
+# Zone des cartes de la page Locations : 10 km autour de Paris
+PARIS = (48.8566, 2.3522)
+AREA = ("radius", *PARIS, 10_000)
+
+# Écart relatif au-delà duquel --compare signale une étape
+THRESHOLD = 0.2
+
+
+def _offset_ids(values, copy, span):
+    # "138 306 524" -> 138306524 + copy * span ; la copie 0 garde le texte d'origine
+    if copy == 0:
+        return values
+    numbers = pd.to_numeric(values.str.replace(r"\s", "", regex=True))
+    return (numbers + copy * span).astype(str)
+
+
+def _span(values):
+    numbers = pd.to_numeric(values.str.replace(r"\s", "", regex=True))
+    return int(numbers.max() - numbers.min()) + 1
+
+
+def scale_year(year, scale, target):
+    # Recopie chaque table "scale" fois en décalant Num_Acc (et id_vehicule), pour
+    # que les copies restent des accidents distincts ; texte des CSV inchangé
+    options = utils.csv_options(year)
+    os.makedirs(os.path.join(target, "assets", str(year)), exist_ok=True)
+    frames = {
+        table: pd.read_csv(
+            utils.source_path(year, table), dtype=str, keep_default_na=False, **options
+        )
+        for table in utils.TABLES
+    }
+    spans = {"Num_Acc": _span(frames["caracteristiques"]["Num_Acc"])}
+    if "id_vehicule" in frames["vehicules"]:
+        spans["id_vehicule"] = _span(frames["vehicules"]["id_vehicule"])
+    for table, df in frames.items():
+        path = os.path.join(target, utils.source_path(year, table))
+        for copy in range(scale):
+            scaled = df.assign(
+                **{
+                    column: _offset_ids(df[column], copy, span)
+                    for column, span in spans.items()
+                    if column in df
+                }
+            )
+            scaled.to_csv(
+                path,
+                mode="w" if copy == 0 else "a",
+                header=copy == 0,
+                index=False,
+                **options,
+            )
+
+
+def scaled_dataset(scale, years, generated=False):
+    # Jeu répliqué (ou généré), reconstruit seulement si les CSV d'origine (ou le
+    # générateur) ont changé
+    target = os.path.join(BENCH_DIR, f"{'synthetic-' if generated else ''}{scale}x")
+    manifest_path = os.path.join(target, "manifest.json")
+    if generated:
+        sources = {"generator": os.stat(synthetic.__file__).st_mtime_ns}
+    else:
+        sources = {
+            str(year): [list(entry) for entry in utils.source_signature(year)]
+            for year in years
+        }
+    manifest = {"scale": scale, "years": years, "sources": sources}
+    try:
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                return target
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(target, ignore_errors=True)
+    for year in years:
+        if generated:
+            accidents = synthetic.ACCIDENTS_BY_YEAR.get(
+                year, synthetic.DEFAULT_ACCIDENTS
+            )
+            synthetic.generate_year(year, accidents * scale, target)
+        else:
+            scale_year(year, scale, target)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    return target
+
+
+def page_functions(name):
+    # Fonctions d'une page sans l'afficher : les appels de premier niveau
+    # (st.set_page_config, display_*()) sont retirés avant exécution
+    path = page_path(name)
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    tree.body = [
+        node
+        for node in tree.body
+        if not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call))
+    ]
+    namespace = {"__name__": "benchmark", "__file__": path}
+    exec(compile(tree, path, "exec"), namespace)
+    return namespace
+
+
+def page_path(name):
+    return glob.glob(os.path.join(ROOT, "pages", f"*{name}*.py"))[0]
+
+
+def steps(year):
+    # (page, étape, fonction, étapes dont les résultats sont les arguments), dans
+    # l'ordre d'une session qui visite toutes les pages ; les caches se remplissent
+    # comme dans l'application
+    from cube import query, year_cube
+    from figures import clear_figure_cache
+    from hotspots import hotspots
+    from joins import user_vehicle_view
+    from kpis import year_kpis
+    from maps import cluster_levels, heatmap_levels, nearby_accidents
+
+    evolution = page_functions("Year evolution")
+    time_page = page_functions("Time")
+    vehicles = page_functions("Vehicles")
+    roads = page_functions("Roads")
+    users = page_functions("Users")
+
+    def raw_characteristics():
+        return pd.read_csv(
+            utils.source_path(year, "caracteristiques"), **utils.csv_options(year)
+        )
+
+    def parquet_load():
+        utils.clear_cache()
+        return utils.load_data(year)
+
+    def counts(dimension):
+        grouped = query(year, [dimension, "grav"], decode=True)
+        grouped = grouped.rename(columns={"count": "counts"})
+        return grouped.dropna().sort_values([dimension, "grav"])
+
+    def render(name):
+        def run():
+            clear_figure_cache()
+            runpy.run_path(page_path(name), run_name="__main__")
+
+        return run
+
+    return [
+        ("data", "read_csv caracteristiques", raw_characteristics, ()),
+        (
+            "data",
+            "clean_characteristics",
+            utils.clean_characteristics,
+            ("data.read_csv caracteristiques",),
+        ),
+        ("data", "load_data", lambda: utils.load_data(year), ()),
+        ("data", "load_data (parquet)", parquet_load, ()),
+        ("data", "user_vehicle_view", lambda: user_vehicle_view(year), ()),
+        # Construit tous les petits cubes de l'année
+        ("data", "year_cube", lambda: year_cube(year, ["grav"]), ()),
+        ("home", "year_kpis", lambda: year_kpis(year), ()),
+        ("locations", "heatmap_levels", lambda: heatmap_levels(year, AREA), ()),
+        ("locations", "cluster_levels", lambda: cluster_levels(year, AREA), ()),
+        (
+            "locations",
+            "nearby_accidents",
+            lambda: nearby_accidents(year, *PARIS, 1000),
+            (),
+        ),
+        ("locations", "hotspots", lambda: hotspots(year), ()),
+        (
+            "year_evolution",
+            "aggregate_accidents_by_year",
+            evolution["aggregate_accidents_by_year"],
+            (),
+        ),
+        (
+            "year_evolution",
+            "create_yearly_graph",
+            evolution["create_yearly_graph"],
+            ("year_evolution.aggregate_accidents_by_year",),
+        ),
+        (
+            "year_evolution",
+            "create_yearly_severity_graph",
+            evolution["create_yearly_severity_graph"],
+            ("year_evolution.aggregate_accidents_by_year",),
+        ),
+        ("time", "counts hour", lambda: counts("hour"), ()),
+        ("time", "counts mois", lambda: counts("mois"), ()),
+        (
+            "time",
+            "create_fig_hour",
+            time_page["create_fig_hour"],
+            ("time.counts hour",),
+        ),
+        (
+            "time",
+            "create_fig_month",
+            time_page["create_fig_month"],
+            ("time.counts mois",),
+        ),
+        (
+            "vehicles",
+            "rollup choc grav",
+            lambda: query(year, ["choc", "grav"], exclude={"choc": -1}, decode=True),
+            (),
+        ),
+        (
+            "vehicles",
+            "rollup obs",
+            lambda: query(year, ["obs"], decode=True),
+            (),
+        ),
+        (
+            "vehicles",
+            "create_fig",
+            vehicles["create_fig"],
+            ("vehicles.rollup choc grav",),
+        ),
+        (
+            "vehicles",
+            "create_pie_chart",
+            lambda counts: vehicles["create_pie_chart"](counts, "obs"),
+            ("vehicles.rollup obs",),
+        ),
+        (
+            "roads",
+            "rollup surf grav",
+            lambda: query(year, ["surf", "grav"], decode=True),
+            (),
+        ),
+        (
+            "roads",
+            "rollup surf",
+            lambda: query(year, ["surf"], decode=True),
+            (),
+        ),
+        (
+            "roads",
+            "rollup vma grav",
+            lambda: query(
+                year, ["vma", "grav"], where={"vma": lambda vma: vma < 130}, decode=True
+            ),
+            (),
+        ),
+        (
+            "roads",
+            "rollup lum",
+            lambda: query(year, ["lum"], decode=True),
+            (),
+        ),
+        (
+            "roads",
+            "rollup lum grav",
+            lambda: query(year, ["lum", "grav"], decode=True),
+            (),
+        ),
+        ("roads", "create_fig", roads["create_fig"], ("roads.rollup surf grav",)),
+        (
+            "roads",
+            "create_pie_chart",
+            roads["create_pie_chart"],
+            ("roads.rollup surf",),
+        ),
+        (
+            "roads",
+            "create_normalized_histogram",
+            roads["create_normalized_histogram"],
+            ("roads.rollup surf grav",),
+        ),
+        (
+            "roads",
+            "create_vma_fig",
+            roads["create_vma_fig"],
+            ("roads.rollup vma grav",),
+        ),
+        (
+            "roads",
+            "create_lum_pie_chart",
+            roads["create_lum_pie_chart"],
+            ("roads.rollup lum",),
+        ),
+        (
+            "roads",
+            "create_lum_histogram",
+            roads["create_lum_histogram"],
+            ("roads.rollup lum grav",),
+        ),
+        (
+            "users",
+            "rollup sexe",
+            lambda: query(year, ["sexe"], exclude={"sexe": -1}, decode=True),
+            (),
+        ),
+        (
+            "users",
+            "rollup sexe grav",
+            lambda: query(year, ["sexe", "grav"], decode=True),
+            (),
+        ),
+        (
+            "users",
+            "rollup trajet",
+            lambda: query(year, ["trajet"], decode=True),
+            (),
+        ),
+        (
+            "users",
+            "rollup trajet grav",
+            lambda: query(year, ["trajet", "grav"], decode=True),
+            (),
+        ),
+        ("users", "create_fig", users["create_fig"], ("users.rollup trajet grav",)),
+        ("users", "create_fig_sex", users["create_fig_sex"], ("users.rollup sexe",)),
+        (
+            "users",
+            "create_normalized_accident_chart",
+            users["create_normalized_accident_chart"],
+            ("users.rollup sexe grav",),
+        ),
+        (
+            "users",
+            "create_journey_reason_pie_chart",
+            users["create_journey_reason_pie_chart"],
+            ("users.rollup trajet",),
+        ),
+        (
+            "users",
+            "create_normalized_journey_reason_histogram",
+            users["create_normalized_journey_reason_histogram"],
+            ("users.rollup trajet grav",),
+        ),
+    ] + [
+        ("render", name, render(name), ())
+        for name in (
+            "Locations",
+            "Year evolution",
+            "Time",
+            "Vehicles",
+            "Roads",
+            "Users",
+        )
+    ]
+
+
+def peak_rss_mb():
+    # Pic RSS du processus depuis son lancement (Ko sous Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(function, arguments, trace):
+    # trace : passe séparée sous tracemalloc (qui ralentit l'exécution) pour le
+    # pic de mémoire allouée et les blocs vivants ; sinon temps écoulé et pic RSS
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*arguments)
+    seconds = time.perf_counter() - start
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        return result, {
+            "traced_peak_mb": peak / 1024 / 1024,
+            "traced_live_blocks": sum(
+                statistic.count for statistic in snapshot.statistics("filename")
+            ),
+            "net_live_blocks": sys.getallocatedblocks() - blocks,
+        }
+    return result, {"seconds": seconds, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_child(year, trace):
+    import logging
+    import warnings
+
+    # Streamlit sans serveur : avertissements "bare mode" ignorés
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.CRITICAL)
+
+    # Données et caches à froid : copies Parquet et résumés annuels reconstruits
+    for directory in (utils.COLUMNAR_DIR, AGGREGATES_DIR):
+        shutil.rmtree(directory, ignore_errors=True)
+
+    results, records = {}, []
+    for page, step, function, arguments in steps(year):
+        name = f"{page}.{step}"
+        results[name], metrics = measure(
+            function, [results[argument] for argument in arguments], trace
+        )
+        records.append({"page": page, "step": step, **metrics})
+    print(json.dumps(records))
+
+
+def measure_scale(scale, year, years, trace, generated=False):
+    # Une passe par processus neuf, lancé dans le dossier du jeu répliqué
+    directory = scaled_dataset(scale, years, generated)
+    passes = [False, True] if trace else [False]
+    merged = {}
+    for traced in passes:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.pages", "--child", str(year)]
+            + (["--trace"] if traced else []),
+            cwd=directory,
+            env={**os.environ, "PYTHONPATH": ROOT},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for record in json.loads(output.strip().splitlines()[-1]):
+            merged.setdefault((record["page"], record["step"]), {}).update(record)
+    return list(merged.values())
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def index(report):
+        return {
+            (scale, record["page"], record["step"]): record
+            for scale, records in report["scales"].items()
+            for record in records
+        }
+
+    old, new = index(before), index(after)
+    print(f"{before['commit']} -> {after['commit']}")
+    print(f"{'scale':<7}{'step':<58}{'before s':>10}{'after s':>10}{'ratio':>8}")
+    for key in (key for key in new if key in old):
+        ratio = new[key]["seconds"] / max(old[key]["seconds"], 1e-9)
+        flag = " !" if abs(ratio - 1) > THRESHOLD else ""
+        print(
+            f"{key[0] + 'x':<7}{key[1] + '.' + key[2]:<58}"
+            f"{old[key]['seconds']:>10.3f}{new[key]['seconds']:>10.3f}"
+            f"{ratio:>8.2f}{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--year", type=int, default=2021)
+    parser.add_argument("--output")
+    parser.add_argument("--no-trace", action="store_true")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(args.child, args.trace)
+    if args.compare:
+        return compare(*args.compare)
+
+    years = SYNTHETIC_YEARS if args.synthetic else available_years()
+    if args.year not in years:
+        sys.exit(f"No complete data for {args.year} under assets/ (try --synthetic)")
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "year": args.year,
+        "years": years,
+        "synthetic": args.synthetic,
+        "scales": {},
+    }
+    for scale in args.scales:
+        records = measure_scale(
+            scale, args.year, years, not args.no_trace, args.synthetic
+        )
+        report["scales"][str(scale)] = records
+        total = sum(record["seconds"] for record in records)
+        peak = max(record["peak_rss_mb"] for record in records)
+        print(f"{scale}x: {total:.2f} s, peak RSS {peak:.0f} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,656 @@
+# Jeu BAAC synthétique (caracteristiques, lieux, usagers, vehicules) pour les tests
+# de charge : une année quelconque, au format d'avant 2019 (virgules, latin1, année
+# sur deux chiffres, coordonnées en 1e-5 degré) ou d'après (points-virgules, champs
+# entre guillemets, id_vehicule). Les distributions marginales suivent les fichiers
+# réels (lieux et vehicules 2017, bilans nationaux pour le reste). Les accidents
+# sont générés et écrits par lots : la mémoire ne dépend pas du nombre de lignes.
+# Lancer depuis la racine du dépôt (fichiers écrits sous assets/.synthetic/assets/
+# par défaut ; les CSV déjà présents ne sont remplacés qu'avec --force) :
+#   python -m benchmarks.synthetic --years 2017 2021 --accidents 60000 [--output DIR]
+import argparse
+import calendar
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+import utils
+
+# Accidents par lot (environ 3,5 lignes écrites par accident)
+CHUNK_ACCIDENTS = 100_000
+
+# Nombre d'accidents corporels des années publiées, 57 000 pour les autres
+ACCIDENTS_BY_YEAR = {
+    2017: 60_701,
+    2018: 57_783,
+    2019: 58_840,
+    2020: 47_744,
+    2021: 56_518,
+}
+DEFAULT_ACCIDENTS = 57_000
+
+# Dossier de travail par défaut : jamais les CSV réels de assets/<année>/
+DEFAULT_OUTPUT = os.path.join("assets", ".synthetic")
+
+# Premier id_vehicule d'une année (format "138 306 524" des fichiers 2019+)
+VEHICLE_ID_BASE = 100_000_000
+
+# Département, commune (INSEE), centre, dispersion (degrés), part des accidents
+PLACES = (
+    ("75", "75056", 48.8566, 2.3522, 0.03, 5.5),
+    ("13", "13055", 43.2965, 5.3698, 0.15, 4.5),
+    ("69", "69123", 45.7640, 4.8357, 0.12, 3.5),
+    ("92", "92050", 48.8924, 2.2071, 0.04, 3.5),
+    ("93", "93008", 48.9086, 2.4397, 0.04, 3.5),
+    ("94", "94028", 48.7904, 2.4556, 0.04, 3.0),
+    ("06", "06088", 43.7102, 7.2620, 0.12, 3.5),
+    ("33", "33063", 44.8378, -0.5792, 0.20, 3.0),
+    ("31", "31555", 43.6047, 1.4442, 0.15, 2.5),
+    ("34", "34172", 43.6108, 3.8767, 0.15, 2.5),
+    ("59", "59350", 50.6292, 3.0573, 0.15, 2.5),
+    ("83", "83137", 43.1242, 5.9280, 0.15, 2.0),
+    ("44", "44109", 47.2184, -1.5536, 0.15, 2.0),
+    ("38", "38185", 45.1885, 5.7245, 0.15, 1.8),
+    ("77", "77288", 48.5421, 2.6554, 0.15, 1.8),
+    ("67", "67482", 48.5734, 7.7521, 0.15, 1.5),
+    ("78", "78646", 48.8049, 2.1204, 0.10, 1.5),
+    ("91", "91228", 48.6290, 2.4410, 0.10, 1.5),
+    ("95", "95127", 49.0364, 2.0761, 0.10, 1.3),
+    ("35", "35238", 48.1173, -1.6778, 0.15, 1.2),
+    ("30", "30189", 43.8367, 4.3601, 0.15, 1.2),
+    ("64", "64445", 43.2951, -0.3708, 0.20, 1.0),
+    ("76", "76540", 49.4432, 1.0999, 0.15, 1.0),
+    ("62", "62041", 50.2910, 2.7775, 0.15, 1.0),
+    ("57", "57463", 49.1193, 6.1757, 0.15, 0.9),
+    ("74", "74010", 45.8992, 6.1294, 0.12, 0.9),
+    ("45", "45234", 47.9030, 1.9093, 0.15, 0.8),
+    ("63", "63113", 45.7772, 3.0870, 0.15, 0.8),
+    ("29", "29232", 47.9960, -4.0970, 0.20, 0.8),
+    ("21", "21231", 47.3220, 5.0415, 0.15, 0.6),
+    ("2A", "2A004", 41.9192, 8.7386, 0.10, 0.3),
+    ("2B", "2B033", 42.6977, 9.4509, 0.10, 0.3),
+    ("971", "97105", 16.2411, -61.5331, 0.05, 0.5),
+    ("974", "97411", -20.8821, 55.4507, 0.08, 0.8),
+)
+
+# Distributions marginales {code: poids} ; -1 ("non renseigné") n'existe qu'à partir de 2019
+MONTHS = {
+    1: 7.4,
+    2: 6.9,
+    3: 7.6,
+    4: 7.9,
+    5: 8.6,
+    6: 9.2,
+    7: 9.4,
+    8: 7.8,
+    9: 9.0,
+    10: 9.1,
+    11: 8.4,
+    12: 8.7,
+}
+HOURS = {
+    0: 1.6,
+    1: 1.3,
+    2: 1.1,
+    3: 0.9,
+    4: 0.8,
+    5: 1.3,
+    6: 2.4,
+    7: 4.6,
+    8: 5.8,
+    9: 4.3,
+    10: 4.2,
+    11: 4.9,
+    12: 5.2,
+    13: 5.0,
+    14: 5.3,
+    15: 5.9,
+    16: 6.7,
+    17: 7.9,
+    18: 7.9,
+    19: 6.1,
+    20: 4.2,
+    21: 3.2,
+    22: 2.7,
+    23: 2.1,
+}
+ATM = {
+    1: 80.0,
+    2: 10.5,
+    3: 1.8,
+    4: 0.3,
+    5: 0.4,
+    6: 0.6,
+    7: 1.4,
+    8: 4.2,
+    9: 0.8,
+    -1: 0.1,
+}
+INT = {1: 67.0, 2: 11.0, 3: 14.0, 4: 2.0, 5: 1.5, 6: 2.5, 7: 0.5, 8: 0.2, 9: 1.3}
+AGG = {1: 36.0, 2: 64.0}
+VEHICLES_PER_ACCIDENT = {1: 39.5, 2: 52.9, 3: 5.9, 4: 1.2, 5: 0.3, 6: 0.2}
+OCCUPANTS = {1: 80.0, 2: 13.0, 3: 4.0, 4: 2.0, 5: 1.0}
+CATR = {4: 45.9, 3: 36.1, 1: 9.4, 2: 6.5, 9: 1.2, 6: 0.8, 5: 0.1}
+CATR_2019 = {4: 43.0, 3: 35.0, 1: 9.0, 2: 6.0, 7: 5.0, 9: 1.2, 6: 0.7, 5: 0.1}
+CIRC = {2: 62.3, 1: 18.6, 3: 13.6, 0: 4.3, 4: 0.6}
+NBV = {2: 60.0, 1: 11.9, 4: 10.0, 3: 7.4, 0: 6.1, 6: 2.1, 5: 1.2, 8: 0.4, 7: 0.1}
+VOSP = {0: 92.8, 3: 2.8, 1: 2.1, 2: 1.3}
+PROF = {1: 78.1, 2: 15.5, 0: 2.7, 3: 1.7, 4: 1.2}
+PLAN = {1: 69.9, 0: 12.7, 2: 7.8, 3: 7.1, 4: 1.2}
+SURF = {
+    1: 77.5,
+    2: 16.3,
+    0: 2.9,
+    7: 0.7,
+    3: 0.6,
+    9: 0.6,
+    5: 0.2,
+    4: 0.2,
+    8: 0.1,
+    6: 0.1,
+}
+INFRA = {0: 84.4, 5: 4.6, 3: 1.5, 2: 1.4, 1: 0.9, 6: 0.8, 4: 0.3, 7: 0.1}
+SITU = {1: 77.5, 3: 7.9, 0: 5.6, 4: 1.9, 5: 0.7, 2: 0.6}
+ENV1 = {99: 60.1, 0: 28.8, 3: 4.9}
+SENC = {1: 48.9, 2: 33.0, 0: 18.0}
+CATV = {
+    7: 64.0,
+    33: 8.9,
+    10: 5.0,
+    1: 4.7,
+    2: 3.7,
+    31: 3.0,
+    30: 2.6,
+    34: 1.8,
+    32: 1.3,
+    15: 0.9,
+    14: 0.8,
+    17: 0.8,
+    37: 0.7,
+    13: 0.4,
+    3: 0.4,
+    99: 0.3,
+    21: 0.2,
+    38: 0.2,
+}
+CATV_2019 = {**CATV, 50: 2.0, 80: 1.0, 60: 0.3, -1: 0.1}
+OBS = {
+    0: 85.6,
+    1: 2.1,
+    13: 1.9,
+    2: 1.6,
+    3: 1.3,
+    4: 1.3,
+    6: 1.2,
+    8: 1.1,
+    14: 0.8,
+    16: 0.7,
+    15: 0.7,
+    12: 0.6,
+    9: 0.4,
+    7: 0.3,
+    11: 0.2,
+    5: 0.1,
+    10: 0.1,
+}
+OBSM = {2: 69.4, 0: 17.9, 1: 10.7, 9: 1.6, 6: 0.1, 4: 0.1, 5: 0.1}
+CHOC = {
+    1: 35.8,
+    3: 14.6,
+    2: 11.8,
+    4: 10.5,
+    8: 7.0,
+    0: 6.5,
+    7: 6.0,
+    6: 3.5,
+    5: 2.8,
+    9: 1.6,
+}
+MANV = {
+    1: 39.9,
+    2: 13.5,
+    15: 8.3,
+    0: 7.3,
+    13: 4.7,
+    17: 3.5,
+    23: 2.8,
+    9: 2.8,
+    19: 2.6,
+    16: 2.4,
+    14: 2.1,
+    21: 1.8,
+    11: 1.1,
+    12: 1.0,
+    5: 1.0,
+    3: 0.9,
+    10: 0.9,
+    4: 0.7,
+    18: 0.6,
+    7: 0.5,
+    20: 0.5,
+    24: 0.3,
+    22: 0.3,
+    6: 0.2,
+    8: 0.1,
+}
+MOTOR = {1: 85.0, 0: 4.0, 2: 2.5, 3: 2.5, 4: 0.5, 6: 0.5, -1: 5.0}
+GRAV = {1: 41.6, 4: 40.4, 3: 15.4, 2: 2.6}
+GRAV_PEDESTRIAN = {1: 3.0, 4: 55.0, 3: 37.0, 2: 5.0}
+TRAJET = {5: 37.0, 9: 20.0, 1: 13.0, 0: 12.0, 4: 8.0, 3: 4.0, 2: 3.0}
+TRAJET_2019 = {**TRAJET, -1: 3.0}
+SECU = {
+    11: 62.0,
+    21: 12.0,
+    13: 6.0,
+    93: 6.0,
+    12: 4.0,
+    22: 3.0,
+    31: 2.0,
+    23: 2.0,
+    41: 1.0,
+    0: 2.0,
+}
+SECU1 = {1: 60.0, 2: 15.0, 0: 10.0, 8: 10.0, 3: 1.0, 4: 1.0, -1: 3.0}
+VMA = {
+    50: 45.0,
+    80: 20.0,
+    30: 10.0,
+    70: 7.0,
+    90: 5.0,
+    130: 5.0,
+    110: 3.0,
+    40: 2.0,
+    20: 1.0,
+    -1: 2.0,
+}
+VMA_MOTORWAY = {130: 70.0, 110: 20.0, 90: 7.0, 70: 3.0}
+LOCP = {1: 30.0, 2: 20.0, 3: 25.0, 4: 10.0, 5: 5.0, 6: 3.0, 7: 3.0, 8: 2.0, 9: 2.0}
+ACTP = {
+    "1": 60.0,
+    "2": 15.0,
+    "3": 8.0,
+    "4": 3.0,
+    "5": 4.0,
+    "6": 2.0,
+    "9": 6.0,
+    "A": 1.0,
+    "B": 1.0,
+}
+
+# Colonnes des fichiers publiés, dans leur ordre, avant 2019 puis à partir de 2019
+LEGACY_COLUMNS = {
+    "caracteristiques": "Num_Acc an mois jour hrmn lum agg int atm col com adr gps"
+    " lat long dep",
+    "lieux": "Num_Acc catr voie v1 v2 circ nbv pr pr1 vosp prof plan lartpc larrout"
+    " surf infra situ env1",
+    "usagers": "Num_Acc place catu grav sexe trajet secu locp actp etatp an_nais"
+    " num_veh",
+    "vehicules": "Num_Acc senc catv occutc obs obsm choc manv num_veh",
+}
+COLUMNS = {
+    "caracteristiques": "Num_Acc jour mois an hrmn lum dep com agg int atm col adr"
+    " lat long",
+    "lieux": "Num_Acc catr voie v1 v2 circ nbv vosp prof pr pr1 plan lartpc larrout"
+    " surf infra situ vma",
+    "usagers": "Num_Acc id_usager id_vehicule num_veh place catu grav sexe an_nais"
+    " trajet secu1 secu2 secu3 locp actp etatp",
+    "vehicules": "Num_Acc id_vehicule num_veh senc catv obs obsm choc manv motor"
+    " occutc",
+}
+
+ROADS = (
+    "RUE DE PARIS",
+    "AVENUE DE LA REPUBLIQUE",
+    "ROUTE NATIONALE",
+    "BOULEVARD GAMBETTA",
+    "",
+)
+LETTERS = np.array([chr(code) for code in range(ord("A"), ord("Z") + 1)])
+
+
+def _choice(rng, distribution, size):
+    codes = np.array(list(distribution))
+    weights = np.array(list(distribution.values()), dtype=np.float64)
+    return codes[rng.choice(len(codes), size=size, p=weights / weights.sum())]
+
+
+def _within(starts, counts):
+    # Rang de chaque ligne dans son groupe (0, 1, ... pour chaque accident)
+    return np.arange(counts.sum()) - np.repeat(starts, counts)
+
+
+def _spaced(numbers):
+    # 138306524 -> "138 306 524", comme dans les fichiers 2019+
+    groups = [
+        np.char.zfill((numbers // 1000**power % 1000).astype(str), 3)
+        for power in (1, 0)
+    ]
+    spaced = (numbers // 1_000_000).astype(str)
+    for group in groups:
+        spaced = np.char.add(np.char.add(spaced, " "), group)
+    return spaced
+
+
+def accidents_chunk(rng, year, first, count, vehicle_first, user_first):
+    # Un lot de "count" accidents et leurs lieux, véhicules et usagers. first,
+    # vehicle_first et user_first : rangs du premier accident, véhicule et usager du
+    # lot dans l'année, pour des clés uniques et cohérentes entre tables
+    legacy = year <= 2018
+    num_acc = year * 100_000_000 + first + 1 + np.arange(count)
+
+    # Caractéristiques : date, heure, lieu, conditions
+    months = _choice(rng, MONTHS, count)
+    month_days = np.array(
+        [calendar.monthrange(year, month)[1] for month in range(1, 13)]
+    )
+    days = rng.integers(1, month_days[months - 1] + 1)
+    hours = _choice(rng, HOURS, count)
+    minutes = rng.integers(0, 60, count)
+    daylight = (hours >= 8) & (hours < 19)
+    twilight = np.isin(hours, (6, 7, 19, 20))
+    lit = rng.random(count) < 0.55
+    lum = np.where(daylight, 1, np.where(twilight, 2, np.where(lit, 5, 3)))
+    lum[rng.random(count) < 0.02] = 4
+
+    places = rng.choice(
+        len(PLACES),
+        size=count,
+        p=np.array([p[5] for p in PLACES]) / sum(p[5] for p in PLACES),
+    )
+    table = np.array([p[:2] for p in PLACES])
+    dep, com = table[places, 0], table[places, 1]
+    spread = np.array([p[4] for p in PLACES])[places]
+    lat = np.array([p[2] for p in PLACES])[places] + rng.normal(0, 1, count) * spread
+    lon = np.array([p[3] for p in PLACES])[places] + rng.normal(0, 1, count) * spread
+
+    vehicles = _choice(rng, VEHICLES_PER_ACCIDENT, count)
+    single = vehicles == 1
+    col = np.where(
+        single,
+        _choice(rng, {7: 60.0, 6: 40.0}, count),
+        _choice(rng, {3: 35.0, 2: 20.0, 6: 25.0, 1: 10.0, 4: 4.0, 5: 6.0}, count),
+    )
+
+    characteristics = {"Num_Acc": num_acc}
+    if legacy:
+        # Année sur deux chiffres, hrmn entier, dep "750", com sans le département,
+        # coordonnées entières (souvent absentes avant 2019)
+        gps = rng.random(count) < 0.6
+        legacy_dep = np.where(
+            np.isin(dep, ("971", "974")),
+            dep,
+            np.where(
+                dep == "2A", "201", np.where(dep == "2B", "202", np.char.add(dep, "0"))
+            ),
+        )
+        characteristics.update(
+            an=np.full(count, year % 100),
+            mois=months,
+            jour=days,
+            hrmn=hours * 100 + minutes,
+            lum=lum,
+            agg=_choice(rng, AGG, count),
+            int=_choice(rng, INT, count),
+            atm=_choice(rng, {k: v for k, v in ATM.items() if k >= 0}, count),
+            col=col,
+            com=np.array([code[-3:] for code in com]),
+            adr=_choice(rng, {road: 1.0 for road in ROADS}, count),
+            gps=np.where(np.isin(dep, ("971", "974")), "G", "M"),
+            lat=np.where(gps, np.round(lat * 100_000).astype(np.int64).astype(str), ""),
+            long=np.where(
+                gps, np.round(lon * 100_000).astype(np.int64).astype(str), ""
+            ),
+            dep=legacy_dep,
+        )
+    else:
+        characteristics.update(
+            jour=days,
+            mois=months,
+            an=np.full(count, year),
+            hrmn=np.char.add(
+                np.char.add(np.char.zfill(hours.astype(str), 2), ":"),
+                np.char.zfill(minutes.astype(str), 2),
+            ),
+            lum=lum,
+            dep=dep,
+            com=com,
+            agg=_choice(rng, AGG, count),
+            int=_choice(rng, INT, count),
+            atm=_choice(rng, ATM, count),
+            col=col,
+            adr=_choice(rng, {road: 1.0 for road in ROADS}, count),
+            lat=np.char.replace(np.char.mod("%.8f", lat), ".", ","),
+            long=np.char.replace(np.char.mod("%.8f", lon), ".", ","),
+        )
+
+    # Lieux : catégorie de route et vitesse maximale liées (autoroute -> 130/110)
+    catr = _choice(rng, CATR if legacy else CATR_2019, count)
+    locations = {
+        "Num_Acc": num_acc,
+        "catr": catr,
+        "voie": rng.integers(1, 1000, count).astype(str),
+        "v1": np.full(count, ""),
+        "v2": np.full(count, ""),
+        "circ": _choice(rng, CIRC, count),
+        "nbv": _choice(rng, NBV, count),
+        "vosp": _choice(rng, VOSP, count),
+        "prof": _choice(rng, PROF, count),
+        "pr": np.where(
+            rng.random(count) < 0.43, rng.integers(0, 100, count).astype(str), ""
+        ),
+        "pr1": np.where(
+            rng.random(count) < 0.43, rng.integers(0, 1000, count).astype(str), ""
+        ),
+        "plan": _choice(rng, PLAN, count),
+        "lartpc": np.full(count, ""),
+        "larrout": rng.choice((50, 60, 70, 80, 100), count).astype(str),
+        "surf": _choice(rng, SURF, count),
+        "infra": _choice(rng, INFRA, count),
+        "situ": _choice(rng, SITU, count),
+    }
+    if legacy:
+        locations["env1"] = _choice(rng, ENV1, count)
+    else:
+        locations["surf"] = np.where(locations["surf"] == 0, -1, locations["surf"])
+        locations["vma"] = np.where(
+            catr == 1, _choice(rng, VMA_MOTORWAY, count), _choice(rng, VMA, count)
+        )
+
+    # Véhicules : A01, B01, ... dans chaque accident
+    accident_starts = np.cumsum(vehicles) - vehicles
+    vehicle_accident = np.repeat(np.arange(count), vehicles)
+    rank = _within(accident_starts, vehicles)
+    num_veh = np.char.add(LETTERS[rank % 26], "01")
+    n_vehicles = len(vehicle_accident)
+    catv = _choice(rng, CATV if legacy else CATV_2019, n_vehicles)
+    vehicle_table = {"Num_Acc": num_acc[vehicle_accident]}
+    if not legacy:
+        vehicle_ids = _spaced(VEHICLE_ID_BASE + vehicle_first + np.arange(n_vehicles))
+        vehicle_table["id_vehicule"] = vehicle_ids
+    vehicle_table.update(
+        num_veh=num_veh,
+        senc=_choice(rng, SENC, n_vehicles),
+        catv=catv,
+        obs=_choice(rng, OBS, n_vehicles),
+        obsm=_choice(rng, OBSM, n_vehicles),
+        choc=_choice(rng, CHOC, n_vehicles),
+        manv=_choice(rng, MANV, n_vehicles),
+        occutc=np.where(np.isin(catv, (37, 38)), rng.integers(0, 40, n_vehicles), 0),
+    )
+    if not legacy:
+        # Vélos et EDP : motorisation humaine
+        vehicle_table["motor"] = np.where(
+            np.isin(catv, (1, 50, 80)),
+            np.where(catv == 1, 5, 3),
+            _choice(rng, MOTOR, n_vehicles),
+        )
+
+    # Usagers : conducteur puis passagers de chaque véhicule ; piétons rattachés
+    # au premier véhicule, surtout dans les accidents à un seul véhicule
+    occupants = _choice(rng, OCCUPANTS, n_vehicles)
+    pedestrian_rate = np.where(single[vehicle_accident], 0.25, 0.02)
+    pedestrians = ((rank == 0) & (rng.random(n_vehicles) < pedestrian_rate)).astype(int)
+    per_vehicle = occupants + pedestrians
+    user_vehicle = np.repeat(np.arange(n_vehicles), per_vehicle)
+    seat = _within(np.cumsum(per_vehicle) - per_vehicle, per_vehicle)
+    catu = np.where(seat == 0, 1, np.where(seat < occupants[user_vehicle], 2, 3))
+    n_users = len(user_vehicle)
+    pedestrian = catu == 3
+    age = np.where(
+        catu == 1,
+        np.clip(rng.normal(42, 17, n_users), 14, 95),
+        rng.uniform(0, 90, n_users),
+    ).astype(int)
+    sexe = np.where(rng.random(n_users) < np.where(catu == 1, 0.74, 0.48), 1, 2)
+    if not legacy:
+        sexe[rng.random(n_users) < 0.005] = -1
+    users = {"Num_Acc": num_acc[vehicle_accident[user_vehicle]]}
+    if not legacy:
+        if year >= 2021:
+            users["id_usager"] = _spaced(
+                VEHICLE_ID_BASE + user_first + np.arange(n_users)
+            )
+        users["id_vehicule"] = vehicle_ids[user_vehicle]
+        users["num_veh"] = num_veh[user_vehicle]
+    users.update(
+        place=np.where(
+            catu == 1, 1, np.where(pedestrian, 10, rng.integers(2, 10, n_users))
+        ),
+        catu=catu,
+        grav=np.where(
+            pedestrian,
+            _choice(rng, GRAV_PEDESTRIAN, n_users),
+            _choice(rng, GRAV, n_users),
+        ),
+        sexe=sexe,
+    )
+    if legacy:
+        users.update(
+            trajet=_choice(rng, TRAJET, n_users),
+            secu=np.where(pedestrian, 0, _choice(rng, SECU, n_users)),
+        )
+    else:
+        users.update(
+            an_nais=year - age,
+            trajet=_choice(rng, TRAJET_2019, n_users),
+            secu1=np.where(pedestrian, 0, _choice(rng, SECU1, n_users)),
+            secu2=np.where(pedestrian, -1, rng.choice((-1, 0, 8), n_users)),
+            secu3=np.full(n_users, -1),
+        )
+    users.update(
+        locp=np.where(pedestrian, _choice(rng, LOCP, n_users), 0 if legacy else -1),
+        actp=np.where(pedestrian, _choice(rng, ACTP, n_users), "0" if legacy else "-1"),
+        etatp=np.where(pedestrian, rng.integers(1, 4, n_users), 0 if legacy else -1),
+    )
+    if legacy:
+        users.update(an_nais=year - age, num_veh=num_veh[user_vehicle])
+
+    tables = {
+        "caracteristiques": characteristics,
+        "lieux": locations,
+        "usagers": users,
+        "vehicules": vehicle_table,
+    }
+    return {
+        table: pd.DataFrame(
+            {
+                column: columns[column]
+                for column in (LEGACY_COLUMNS if legacy else COLUMNS)[table].split()
+                if column in columns
+            }
+        )
+        for table, columns in tables.items()
+    }
+
+
+def generate_year(
+    year, accidents, output=DEFAULT_OUTPUT, seed=0, chunk=CHUNK_ACCIDENTS
+):
+    # Écrit output/assets/<année>/<table>-<année>.csv lot par lot ; renvoie le
+    # nombre de lignes de chaque table
+    options = utils.csv_options(year)
+    # Fichiers 2019+ : tous les champs entre guillemets, comme les fichiers publiés
+    quoting = csv.QUOTE_MINIMAL if year <= 2018 else csv.QUOTE_ALL
+    rng = np.random.default_rng([seed, year])
+    os.makedirs(os.path.join(output, "assets", str(year)), exist_ok=True)
+    files = {
+        table: open(
+            os.path.join(output, utils.source_path(year, table)),
+            "w",
+            encoding=options.get("encoding", "utf-8"),
+            newline="",
+        )
+        for table in utils.TABLES
+    }
+    rows = dict.fromkeys(utils.TABLES, 0)
+    try:
+        for first in range(0, accidents, chunk):
+            tables = accidents_chunk(
+                rng,
+                year,
+                first,
+                min(chunk, accidents - first),
+                rows["vehicules"],
+                rows["usagers"],
+            )
+            for table, df in tables.items():
+                df.to_csv(
+                    files[table],
+                    sep=options["sep"],
+                    header=first == 0,
+                    index=False,
+                    quoting=quoting,
+                )
+                rows[table] += len(df)
+    finally:
+        for f in files.values():
+            f.close()
+    return rows
+
+
+def generate(years, accidents=None, output=DEFAULT_OUTPUT, seed=0):
+    # accidents : nombre par année, sinon le nombre publié de chaque année
+    return {
+        year: generate_year(
+            year,
+            accidents or ACCIDENTS_BY_YEAR.get(year, DEFAULT_ACCIDENTS),
+            output,
+            seed,
+        )
+        for year in years
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, nargs="+", default=[2021])
+    parser.add_argument("--accidents", type=int, help="accidents per year")
+    parser.add_argument(
+        "--output", default=DEFAULT_OUTPUT, help="writes OUTPUT/assets/<year>/"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--force", action="store_true", help="overwrite existing CSV files"
+    )
+    args = parser.parse_args()
+
+    paths = [
+        os.path.join(args.output, utils.source_path(year, table))
+        for year in args.years
+        for table in utils.TABLES
+    ]
+    existing = [path for path in paths if os.path.exists(path)]
+    if existing and not args.force:
+        parser.error(
+            "refusing to overwrite existing files (use --force): " + ", ".join(existing)
+        )
+
+    for year, rows in generate(
+        args.years, args.accidents, args.output, args.seed
+    ).items():
+        print(year, ", ".join(f"{table}: {count}" for table, count in rows.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Tableaux croisés vectorisés pour les graphiques "proportion par catégorie" :
+# comptes (pondérés) sur deux ou trois dimensions en un seul np.bincount, puis part
+# de chaque case dans son groupe. Aucun appel Python par groupe : les groupes sont
+# des indices entiers (np.ravel_multi_index).
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+MAX_DIMENSIONS = 3
+
+
+def _codes(values):
+    # Codes 0..n-1 et catégories d'une colonne ; valeur absente -> -1. Les
+    # catégories ordonnées (labels.decode) gardent leur ordre
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(np.int64), values.cat.categories
+    codes, categories = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), pd.Index(categories)
+
+
+def _groups(table, by):
+    # Indice de groupe de chaque ligne (-1 si une des dimensions est absente) et
+    # nombre de groupes possibles
+    codes, levels = zip(*(_codes(table[column]) for column in by))
+    shape = tuple(len(level) for level in levels)
+    known = np.logical_and.reduce([code >= 0 for code in codes])
+    groups = np.full(len(table), -1, dtype=np.int64)
+    groups[known] = np.ravel_multi_index(tuple(code[known] for code in codes), shape)
+    return groups, levels, shape
+
+
+def _values(values, codes, categories):
+    # Catégories d'une colonne à partir de leurs codes, dans le type de la colonne
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(codes, dtype=values.dtype)
+    return categories.take(codes)
+
+
+def crosstab(table, dimensions, weights=None):
+    # Tableau de contingence dense (numpy, un axe par dimension) et catégories de
+    # chaque axe ; les lignes dont une dimension est absente sont ignorées.
+    # weights : colonne de poids (ex. "count" d'un cube), sinon une ligne compte 1
+    dimensions = list(dimensions)
+    if not 2 <= len(dimensions) <= MAX_DIMENSIONS:
+        raise ValueError(f"crosstab takes 2 to {MAX_DIMENSIONS} dimensions")
+    groups, levels, shape = _groups(table, dimensions)
+    known = groups >= 0
+    values = None if weights is None else table[weights].to_numpy()[known]
+    counts = np.bincount(groups[known], weights=values, minlength=int(np.prod(shape)))
+    if values is not None and np.issubdtype(values.dtype, np.integer):
+        # Poids entiers (comptes) : la somme reste entière
+        counts = counts.astype(np.int64)
+    return counts.reshape(shape), levels
+
+
+def _totals(counts, axes):
+    # Total des cases qui partagent leurs coordonnées sur "axes", diffusable sur counts
+    summed = tuple(axis for axis in range(counts.ndim) if axis not in axes)
+    return counts.sum(axis=summed, keepdims=True)
+
+
+@timed
+def proportions(table, dimensions, by, weights="count", name="count_normalized"):
+    # Table longue des combinaisons non vides de "dimensions" : comptes "count" et
+    # part dans le groupe "by", dans l'ordre des catégories ; point d'entrée des
+    # histogrammes normalisés des pages
+    dimensions = list(dimensions)
+    counts, levels = crosstab(table, dimensions, weights)
+    axes = tuple(dimensions.index(column) for column in by)
+    totals = np.broadcast_to(_totals(counts, axes), counts.shape).ravel()
+    cells = np.flatnonzero(counts)
+    coordinates = np.unravel_index(cells, counts.shape)
+    result = pd.DataFrame(
+        {
+            column: _values(table[column], coordinate, level)
+            for column, coordinate, level in zip(dimensions, coordinates, levels)
+        }
+    )
+    result["count"] = counts.ravel()[cells]
+    result[name] = result["count"].to_numpy() / totals[cells]
+    return result
@@ -0,0 +1,119 @@
+# Cubes de comptes précalculés par année, au grain de l'usager (chaque usager avec
+# son véhicule et son accident, cf. joins.user_vehicle_view). Les pages interrogent
+# ces cubes (tranche, agrégation) au lieu de regrouper les lignes brutes ; les parts
+# par catégorie sont calculées par crosstab.
+import functools
+
+import numpy as np
+import pandas as pd
+
+from filters import NO_FILTERS, filter_key, row_masks
+from joins import user_vehicle_rows, user_vehicle_view
+from labels import decode_frame
+from perf import timed
+from utils import freeze, source_signature
+
+# Petits cubes précalculés : un par combinaison de dimensions interrogée par les
+# pages. Chacun n'a que quelques centaines de lignes quelle que soit la taille de
+# l'année ; les filtres globaux (département...) sont appliqués avant le calcul.
+CUBES = (
+    ("hour", "grav"),
+    ("mois", "grav"),
+    ("choc", "grav"),
+    ("obs", "obsm"),
+    ("surf", "grav"),
+    ("vma", "grav"),
+    ("lum", "grav"),
+    ("sexe", "grav"),
+    ("trajet", "grav"),
+)
+
+DIMENSIONS = tuple(dict.fromkeys(dimension for cube in CUBES for dimension in cube))
+
+# Valeur des dimensions absentes ou vides, comme le "non renseigné" des fichiers
+MISSING = -1
+
+
+def _codes(view, dimension):
+    if dimension not in view:
+        return np.full(len(view), MISSING, dtype=np.int16)
+    values = view[dimension].to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.nan_to_num(values, nan=MISSING).astype(np.int16)
+
+
+@timed
+def build_cubes(view):
+    # {dimensions: comptes} ; les codes de chaque dimension sont convertis une fois
+    codes = {dimension: _codes(view, dimension) for dimension in DIMENSIONS}
+    cubes = {}
+    for dimensions in CUBES:
+        cube = (
+            pd.DataFrame({dimension: codes[dimension] for dimension in dimensions})
+            .groupby(list(dimensions))
+            .size()
+            .reset_index(name="count")
+        )
+        cube["count"] = cube["count"].astype(np.int32)
+        cubes[dimensions] = freeze(cube)
+    return cubes
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_cubes(year, signature, filters):
+    view = user_vehicle_view(year)
+    if filters:
+        # Usagers retenus par les filtres globaux (index bitmap de l'année)
+        users = row_masks(year, filters)["usagers"]
+        view = view[users[user_vehicle_rows(year)]]
+    return build_cubes(view)
+
+
+def cube_dimensions(dimensions):
+    # Plus petit cube précalculé qui contient toutes les dimensions demandées
+    wanted = set(dimensions)
+    for cube in sorted(CUBES, key=len):
+        if wanted <= set(cube):
+            return cube
+    raise ValueError(f"no precomputed cube covers {sorted(wanted)}")
+
+
+@timed
+def year_cube(year, dimensions, filters=NO_FILTERS):
+    filters = filter_key(filters)
+    cubes = _cached_cubes(year, source_signature(year), filters)
+    return cubes[cube_dimensions(dimensions)].copy(deep=False)
+
+
+def _mask(values, condition):
+    if callable(condition):
+        return np.asarray(condition(values), dtype=bool)
+    if np.ndim(condition) == 0:
+        return values == condition
+    return np.isin(values, list(condition))
+
+
+def slice_cube(cube, where=None, exclude=None):
+    # where / exclude : {dimension: valeur, liste de valeurs ou fonction booléenne}
+    keep = np.ones(len(cube), dtype=bool)
+    for dimension, condition in (where or {}).items():
+        keep &= _mask(cube[dimension].to_numpy(), condition)
+    for dimension, condition in (exclude or {}).items():
+        keep &= ~_mask(cube[dimension].to_numpy(), condition)
+    return cube[keep]
+
+
+@timed
+def rollup(cube, dimensions, decode=False):
+    # decode : codes remplacés par leurs libellés (catégories ordonnées)
+    dimensions = list(dimensions)
+    if not dimensions:
+        return pd.DataFrame({"count": [int(cube["count"].sum())]})
+    table = cube.groupby(dimensions)["count"].sum().reset_index()
+    return decode_frame(table) if decode else table
+
+
+def query(year, dimensions, where=None, exclude=None, filters=NO_FILTERS, decode=False):
+    # Le cube choisi couvre les dimensions gardées et celles des conditions
+    needed = [*dimensions, *(where or {}), *(exclude or {})]
+    cube = slice_cube(year_cube(year, needed, filters), where, exclude)
+    return rollup(cube, dimensions, decode)
@@ -0,0 +1,109 @@
+# Cache des figures Plotly construites (objets Figure, pas leur JSON), commun à
+# toutes les pages et sessions. Clé : (page, graphique, année, filtres, options
+# d'affichage). Une figure dont les entrées n'ont pas changé n'est ni reconstruite
+# ni revalidée (objet Figure déjà validé, contrairement à un dict). st.plotly_chart
+# la resérialise à chaque exécution (json.dumps, 0,3 à 0,9 ms par figure des pages) :
+# relire un JSON en cache avec pio.from_json coûterait 5 à 14 ms et serait
+# resérialisé quand même.
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from filters import NO_FILTERS, filter_key
+from perf import stage
+from utils import source_signature
+
+# Budget mémoire du cache de figures (en Mo), configurable par variable d'environnement
+FIGURE_CACHE_MAX_MB = int(os.environ.get("ACCIDENTS_FIGURE_CACHE_MAX_MB", "64"))
+
+_figures = OrderedDict()
+_figures_lock = threading.Lock()
+_figure_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_page_stats = {}
+
+
+def figure_key(page, chart, years, filters=NO_FILTERS, **options):
+    # years : une année ou plusieurs ; la signature de leurs CSV fait partie de
+    # la clé, une figure tirée d'un fichier modifié est donc reconstruite
+    years = (years,) if isinstance(years, int) else tuple(years)
+    return (
+        page,
+        chart,
+        years,
+        tuple(source_signature(year) for year in years),
+        filter_key(filters),
+        tuple(sorted(options.items())),
+    )
+
+
+def _nbytes():
+    return sum(nbytes for _, nbytes in _figures.values())
+
+
+def _evict(max_bytes):
+    while _figures and _nbytes() > max_bytes:
+        _figures.popitem(last=False)
+        _figure_stats["evictions"] += 1
+
+
+def cached_figure(key, build):
+    # build() n'est appelé qu'en cas d'absence. Les figures en cache sont
+    # partagées entre sessions : elles ne doivent plus être modifiées
+    with _figures_lock:
+        entry = _figures.get(key)
+        hit = entry is not None
+        if hit:
+            _figures.move_to_end(key)
+        _figure_stats["hits" if hit else "misses"] += 1
+        page = _page_stats.setdefault(key[0], {"hits": 0, "misses": 0})
+        page["hits" if hit else "misses"] += 1
+    if hit:
+        return entry[0]
+
+    # Construction (create_*) et taille sérialisée (budget du cache) mesurées
+    # séparément
+    with stage(f"figure {key[0]}/{key[1]}: build"):
+        fig = build()
+    with stage(f"figure {key[0]}/{key[1]}: to_json"):
+        nbytes = len(fig.to_json())
+    with _figures_lock:
+        _figures[key] = (fig, nbytes)
+        _evict(FIGURE_CACHE_MAX_MB * 1024 * 1024)
+    return fig
+
+
+def plotly_chart(key, build, container=None, use_container_width=False):
+    # Équivalent de st.plotly_chart(build()), la figure étant lue dans le cache
+    return (container or st).plotly_chart(
+        cached_figure(key, build), use_container_width=use_container_width
+    )
+
+
+def _ratio(stats):
+    total = stats["hits"] + stats["misses"]
+    return stats["hits"] / total if total else 0.0
+
+
+def figure_cache_info():
+    with _figures_lock:
+        return {
+            **_figure_stats,
+            "hit_ratio": _ratio(_figure_stats),
+            "pages": {
+                page: {**stats, "hit_ratio": _ratio(stats)}
+                for page, stats in _page_stats.items()
+            },
+            "entries": len(_figures),
+            "nbytes": _nbytes(),
+            "max_bytes": FIGURE_CACHE_MAX_MB * 1024 * 1024,
+        }
+
+
+def clear_figure_cache():
+    with _figures_lock:
+        _figures.clear()
+        _page_stats.clear()
+        for name in _figure_stats:
+            _figure_stats[name] = 0
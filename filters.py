@@ -0,0 +1,197 @@
+# Filtres globaux (département, gravité, heure, surface, luminosité, catégorie de
+# route et d'usager) communs à toutes les pages. Chaque colonne filtrable a, par
+# année, un index bitmap : un tableau de bits compacté (np.packbits) par code.
+# Une combinaison de filtres se résout en OU / ET bit à bit, puis en masques de
+# lignes pour chaque table.
+import functools
+
+import numpy as np
+import streamlit as st
+
+from joins import accident_index, lookup
+from labels import LABELS
+from perf import timed
+from utils import TABLES, load_data, source_signature
+
+# Nom du filtre -> (table, colonne)
+FILTERS = {
+    "dep": ("caracteristiques", "dep"),
+    "hour": ("caracteristiques", "hour"),
+    "lum": ("caracteristiques", "lum"),
+    "surf": ("lieux", "surf"),
+    "catr": ("lieux", "catr"),
+    "grav": ("usagers", "grav"),
+    "catu": ("usagers", "catu"),
+}
+
+FILTER_TITLES = {
+    "dep": "Department",
+    "grav": "Injury severity",
+    "hour": "Hour of the day",
+    "surf": "Road surface",
+    "lum": "Lighting",
+    "catr": "Road category",
+    "catu": "User category",
+}
+
+FILTER_LABELS = {name: LABELS[name] for name in FILTERS if name in LABELS}
+
+# Valeur des codes absents (NA) dans les bitmaps
+MISSING = -1
+
+NO_FILTERS = ()
+
+
+def build_bitmaps(values):
+    # {code: bits compactés des lignes portant ce code}
+    values = np.asarray(values)
+    codes, inverse = np.unique(values, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.searchsorted(inverse[order], np.arange(len(codes) + 1))
+    bitmaps = {}
+    for i, code in enumerate(codes.tolist()):
+        bits = np.zeros(len(values), dtype=bool)
+        bits[order[bounds[i] : bounds[i + 1]]] = True
+        bitmaps[code] = np.packbits(bits)
+        bitmaps[code].flags.writeable = False
+    return bitmaps
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_bitmaps(year, signature, table, column):
+    values = load_data(year)[TABLES.index(table)][column]
+    return build_bitmaps(values.to_numpy(dtype=np.int64, na_value=MISSING))
+
+
+def bitmap_index(year, name):
+    table, column = FILTERS[name]
+    return _cached_bitmaps(year, source_signature(year), table, column)
+
+
+def select(bitmaps, codes, length):
+    # Lignes portant l'un des codes (OU bit à bit), compactées
+    selected = np.zeros((length + 7) // 8, dtype=np.uint8)
+    for code in codes:
+        if code in bitmaps:
+            np.bitwise_or(selected, bitmaps[code], out=selected)
+    return selected
+
+
+def filter_key(filters):
+    # {nom: codes} -> tuple trié utilisable comme clé de cache ; un filtre vide
+    # (aucun code choisi) ne filtre pas
+    return tuple(
+        (name, tuple(sorted(int(code) for code in codes)))
+        for name, codes in sorted(dict(filters).items())
+        if len(codes)
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_masks(year, signature, filters):
+    frames = dict(zip(TABLES, load_data(year)))
+    lengths = {table: len(frame) for table, frame in frames.items()}
+
+    # ET bit à bit des filtres d'une même table
+    packed = {}
+    for name, codes in filters:
+        table = FILTERS[name][0]
+        selected = select(bitmap_index(year, name), codes, lengths[table])
+        if table in packed:
+            np.bitwise_and(packed[table], selected, out=packed[table])
+        else:
+            packed[table] = selected
+    masks = {
+        table: np.unpackbits(bits, count=lengths[table]).astype(bool)
+        for table, bits in packed.items()
+    }
+
+    # Un accident passe si sa ligne de caractéristiques, sa (première) ligne de
+    # lieux et au moins un de ses usagers passent
+    characteristics = frames["caracteristiques"]
+    accidents = masks.get(
+        "caracteristiques", np.ones(lengths["caracteristiques"], dtype=bool)
+    )
+    num_acc = characteristics["Num_Acc"].to_numpy(np.int64)
+    if "lieux" in masks:
+        positions = lookup(accident_index(year, "lieux"), num_acc)
+        accidents &= (positions >= 0) & masks["lieux"][positions.clip(min=0)]
+    if "usagers" in masks:
+        positions = lookup(
+            accident_index(year, "caracteristiques"),
+            frames["usagers"]["Num_Acc"].to_numpy(np.int64),
+        )
+        found = positions >= 0
+        with_user = np.zeros(len(accidents), dtype=bool)
+        with_user[positions[found & masks["usagers"]]] = True
+        accidents &= with_user
+
+    # Chaque table garde les lignes des accidents retenus (et, pour les usagers,
+    # ceux qui passent leurs propres filtres)
+    result = {"caracteristiques": accidents}
+    for table in ("lieux", "usagers", "vehicules"):
+        positions = lookup(
+            accident_index(year, "caracteristiques"),
+            frames[table]["Num_Acc"].to_numpy(np.int64),
+        )
+        keep = (positions >= 0) & accidents[positions.clip(min=0)]
+        if table == "usagers" and "usagers" in masks:
+            keep &= masks["usagers"]
+        result[table] = keep
+    for mask in result.values():
+        mask.flags.writeable = False
+    return result
+
+
+@timed
+def row_masks(year, filters):
+    # {table: masque booléen des lignes de load_data(year)}, None sans filtre
+    filters = filter_key(filters)
+    if not filters:
+        return None
+    return _cached_masks(year, source_signature(year), filters)
+
+
+def _seed(key, value):
+    # Valeur initiale d'un widget, posée une seule fois : le widget n'a ni
+    # default= ni value=, son identifiant reste donc stable d'une modification à
+    # l'autre. Renvoie la valeur courante, ou value hors d'une session Streamlit
+    # (exécution nue, benchmarks) où l'état n'est pas conservé
+    if key not in st.session_state:
+        st.session_state[key] = value
+    return st.session_state.get(key, value)
+
+
+def sidebar_filters(year):
+    # Widgets communs à toutes les pages. Les choix sont recopiés dans
+    # "global_filters", qui survit au changement de page (l'état d'un widget
+    # absent d'une page est effacé) et sert à réinitialiser les widgets
+    stored = st.session_state.setdefault("global_filters", {})
+    with st.sidebar.expander("Filters", expanded=bool(filter_key(stored))):
+        for name, title in FILTER_TITLES.items():
+            key = f"filter_{name}"
+            if name == "hour":
+                codes = stored.get(name) or range(24)
+                first, last = _seed(key, (min(codes), max(codes)))
+                selected = st.slider(title, min_value=0, max_value=23, key=key)
+                if isinstance(selected, tuple):  # sinon exécution nue : min_value
+                    first, last = selected
+                hours = range(first, last + 1)
+                stored[name] = [] if len(hours) == 24 else list(hours)
+                continue
+            labels = FILTER_LABELS.get(name, {})
+            options = [code for code in bitmap_index(year, name) if code != MISSING]
+            if labels:
+                options = [code for code in labels if code in options]
+            current = _seed(key, stored.get(name, []))
+            # Codes absents des options de cette année (changement d'année)
+            chosen = [code for code in current if code in options]
+            if chosen != current:
+                st.session_state[key] = chosen
+            stored[name] = st.multiselect(
+                title,
+                options,
+                key=key,
+                format_func=lambda code, labels=labels: labels.get(code, str(code)),
+            )
+    return filter_key(stored)
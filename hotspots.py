@@ -0,0 +1,174 @@
+# Points noirs : densité d'accidents lissée (noyau gaussien appliqué par FFT sur
+# une grille régulière), maxima locaux classés, avec pour chacun le nombre
+# d'accidents et la part d'accidents mortels dans un rayon donné.
+# Les résultats sont mis en cache par (année, zone, nombre de points noirs).
+import functools
+
+import numpy as np
+import pandas as pd
+
+from filters import NO_FILTERS, filter_key, row_masks
+from joins import accident_positions
+from maps import area_rows
+from perf import timed
+from spatial import build_grid_index, radius_query
+from tiles import FRANCE_BOUNDS
+from utils import load_data, source_signature, valid_coordinates
+
+# Maille de la grille et écart-type du noyau, en mètres
+CELL_M = 500
+BANDWIDTH_M = 750
+
+# Rayon dans lequel on compte les accidents d'un point noir
+HOTSPOT_RADIUS_M = 1_000
+
+TOP_K = 20
+
+METERS_PER_DEGREE = 111_195
+
+
+def _crop(full, kernel, grid_shape):
+    # Partie "same" d'une convolution calculée sur la grille complétée de zéros
+    top, left = kernel.shape[0] // 2, kernel.shape[1] // 2
+    return full[top : top + grid_shape[0], left : left + grid_shape[1]]
+
+
+def _offsets(radius_cells):
+    steps = np.arange(-radius_cells, radius_cells + 1)
+    return np.hypot(*np.meshgrid(steps, steps, indexing="ij"))
+
+
+def local_maxima(density):
+    # Cellules au moins égales à leurs 8 voisines et non nulles
+    padded = np.pad(density, 1, constant_values=-np.inf)
+    rows, cols = density.shape
+    neighbours = np.full(density.shape, -np.inf)
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            if dr or dc:
+                shifted = padded[1 + dr : 1 + dr + rows, 1 + dc : 1 + dc + cols]
+                np.maximum(neighbours, shifted, out=neighbours)
+    return np.flatnonzero((density >= neighbours) & (density > 1e-9))
+
+
+def _separated(lat, lon, candidates, top_k, radius_m):
+    # Du plus dense au moins dense, on écarte un maximum situé à moins de
+    # radius_m d'un point noir déjà retenu (plateaux, pics secondaires)
+    kept = []
+    for candidate in candidates:
+        if kept:
+            dlat = (lat[candidate] - lat[kept]) * METERS_PER_DEGREE
+            dlon = (lon[candidate] - lon[kept]) * METERS_PER_DEGREE
+            dlon *= np.cos(np.radians(lat[candidate]))
+            if (np.hypot(dlat, dlon) <= radius_m).any():
+                continue
+        kept.append(candidate)
+        if len(kept) == top_k:
+            break
+    return np.array(kept, dtype=np.int64)
+
+
+def find_hotspots(
+    lat,
+    lon,
+    fatal,
+    top_k=TOP_K,
+    cell_m=CELL_M,
+    bandwidth_m=BANDWIDTH_M,
+    radius_m=HOTSPOT_RADIUS_M,
+):
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    fatal = np.asarray(fatal, dtype=bool)
+    columns = ["lat", "lon", "density", "accidents", "fatal_accidents"]
+    if not len(lat):
+        return pd.DataFrame(columns=columns + ["fatality_share"])
+
+    # Mailles carrées en mètres : la largeur en degrés dépend de la latitude
+    cell_lat = cell_m / METERS_PER_DEGREE
+    cell_lon = cell_lat / np.cos(np.radians((lat.min() + lat.max()) / 2))
+    rows = ((lat - lat.min()) / cell_lat).astype(np.int64)
+    cols = ((lon - lon.min()) / cell_lon).astype(np.int64)
+    grid_shape = (int(rows.max()) + 1, int(cols.max()) + 1)
+    cells = rows * grid_shape[1] + cols
+    counts = np.bincount(cells, minlength=grid_shape[0] * grid_shape[1])
+    counts = counts.reshape(grid_shape).astype(np.float64)
+
+    # Noyau gaussien tronqué à 3 écarts-types ; grille complétée de zéros pour
+    # éviter le repliement circulaire de la FFT
+    sigma = bandwidth_m / cell_m
+    gaussian = np.exp(-((_offsets(int(np.ceil(3 * sigma))) / sigma) ** 2) / 2)
+    gaussian /= gaussian.sum()
+    shape = (
+        grid_shape[0] + gaussian.shape[0] - 1,
+        grid_shape[1] + gaussian.shape[1] - 1,
+    )
+    density = np.fft.irfft2(
+        np.fft.rfft2(counts, s=shape) * np.fft.rfft2(gaussian, s=shape), s=shape
+    )
+    density = _crop(density, gaussian, grid_shape).ravel()
+
+    candidates = local_maxima(density.reshape(grid_shape))
+    candidates = candidates[np.argsort(density[candidates], kind="stable")[::-1]]
+    peak_rows, peak_cols = np.divmod(candidates, grid_shape[1])
+    peak_lat = lat.min() + (peak_rows + 0.5) * cell_lat
+    peak_lon = lon.min() + (peak_cols + 0.5) * cell_lon
+    kept = _separated(peak_lat, peak_lon, np.arange(len(candidates)), top_k, radius_m)
+
+    # Comptes exacts (haversine) autour de chaque point noir retenu
+    index = build_grid_index(lat, lon)
+    around = [radius_query(index, peak_lat[i], peak_lon[i], radius_m) for i in kept]
+    hotspots = pd.DataFrame(
+        {
+            "lat": peak_lat[kept],
+            "lon": peak_lon[kept],
+            "density": density[candidates[kept]],
+            "accidents": [len(rows) for rows in around],
+            "fatal_accidents": [int(fatal[rows].sum()) for rows in around],
+        }
+    )
+    hotspots["fatality_share"] = hotspots["fatal_accidents"] / hotspots[
+        "accidents"
+    ].clip(lower=1)
+    return hotspots
+
+
+def fatal_accidents(characteristics, users):
+    # Pour chaque ligne des caractéristiques : au moins un usager tué (grav 2)
+    positions = accident_positions(characteristics, users["Num_Acc"].to_numpy())
+    killed = (users["grav"].to_numpy(dtype=np.int64, na_value=0) == 2) & (
+        positions >= 0
+    )
+    fatal = np.zeros(len(characteristics), dtype=bool)
+    fatal[positions[killed]] = True
+    return fatal
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_hotspots(year, signature, area, top_k, filters):
+    characteristics, _, users, _ = load_data(year)
+    lat = characteristics["lat"].to_numpy(dtype=np.float64, na_value=np.nan)
+    lon = characteristics["long"].to_numpy(dtype=np.float64, na_value=np.nan)
+    keep = valid_coordinates(lat, lon)
+    if area is None:
+        # Toute la France métropolitaine (l'outre-mer étirerait la grille)
+        south, west, north, east = FRANCE_BOUNDS
+        keep &= (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        masks = row_masks(year, filters)
+        if masks is not None:
+            keep &= masks["caracteristiques"]
+    else:
+        selected = np.zeros(len(keep), dtype=bool)
+        selected[area_rows(year, area, filters)] = True
+        keep &= selected
+    fatal = fatal_accidents(characteristics, users)
+    return find_hotspots(lat[keep], lon[keep], fatal[keep], top_k)
+
+
+@timed
+def hotspots(year, area=None, top_k=TOP_K, filters=NO_FILTERS):
+    # area comme pour maps.area_rows, None pour tout le pays ; mis en cache
+    area = tuple(area) if area is not None else None
+    return _cached_hotspots(
+        year, source_signature(year), area, top_k, filter_key(filters)
+    ).copy()
@@ -0,0 +1,164 @@
+# Jointures au bon grain : chaque usager est relié à SON véhicule (id_vehicule à
+# partir de 2019, sinon le couple Num_Acc + num_veh) et à son accident.
+# Les clés de la table de droite sont triées une fois ; une jointure se réduit
+# ensuite à un searchsorted suivi d'un take.
+import functools
+
+import numpy as np
+import pandas as pd
+
+from perf import timed
+from utils import TABLES, freeze, load_data, source_signature
+
+# Nombre maximal de valeurs distinctes de num_veh dans une année (A01...Z99, AA01...)
+NUM_VEH_SLOTS = 10_000
+
+
+def _id_vehicule_keys(frame):
+    # "138 306 524" -> 138306524, en ne convertissant que les catégories
+    ids = frame["id_vehicule"].astype("category")
+    categories = ids.cat.categories.astype(str).str.replace(r"\s", "", regex=True)
+    numeric = pd.to_numeric(categories, errors="coerce")
+    if numeric.isna().any():
+        return None
+    codes = ids.cat.codes.to_numpy()
+    return np.where(codes >= 0, numeric.to_numpy(np.int64)[codes], -1)
+
+
+def _num_veh_keys(frame, categories):
+    # Clé Num_Acc * NUM_VEH_SLOTS + code, sans collision tant que les codes (-1 si
+    # num_veh manque) restent sous NUM_VEH_SLOTS et que le produit tient en int64
+    if len(categories) >= NUM_VEH_SLOTS:
+        raise ValueError(
+            f"{len(categories)} distinct num_veh values, "
+            f"at most {NUM_VEH_SLOTS - 1} fit in the join key"
+        )
+    num_acc = frame["Num_Acc"].to_numpy(np.int64)
+    limit = np.iinfo(np.int64).max // NUM_VEH_SLOTS - 1
+    if len(num_acc) and (num_acc.max() > limit or num_acc.min() < -limit):
+        raise ValueError(f"Num_Acc outside ±{limit} overflows the join key")
+    codes = pd.Categorical(frame["num_veh"], categories=categories).codes
+    return num_acc * NUM_VEH_SLOTS + codes
+
+
+def build_index(keys):
+    order = np.argsort(keys, kind="stable")
+    return {"keys": keys[order], "order": order}
+
+
+def lookup(index, keys):
+    # Position de chaque clé dans la table indexée, -1 si absente
+    sorted_keys = index["keys"]
+    if not len(sorted_keys):
+        return np.full(len(keys), -1)
+    found = np.searchsorted(sorted_keys, keys).clip(max=len(sorted_keys) - 1)
+    return np.where(sorted_keys[found] == keys, index["order"][found], -1)
+
+
+def matching_rows(index, keys):
+    # Toutes les lignes de la table indexée pour chaque clé (plusieurs usagers par
+    # accident) : (positions, rang de la clé demandée pour chaque position)
+    starts = np.searchsorted(index["keys"], keys, side="left")
+    lengths = np.searchsorted(index["keys"], keys, side="right") - starts
+    owners = np.repeat(np.arange(len(keys)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(
+        np.cumsum(lengths) - lengths, lengths
+    )
+    return index["order"][np.repeat(starts, lengths) + offsets], owners
+
+
+def vehicle_keys(vehicles, users):
+    # Clés comparables des deux tables, selon la colonne disponible dans le millésime
+    if "id_vehicule" in vehicles and "id_vehicule" in users:
+        vehicle_ids, user_ids = _id_vehicule_keys(vehicles), _id_vehicule_keys(users)
+        if vehicle_ids is not None and user_ids is not None:
+            return vehicle_ids, user_ids
+    categories = pd.Index(
+        np.union1d(
+            vehicles["num_veh"].dropna().astype(str).unique(),
+            users["num_veh"].dropna().astype(str).unique(),
+        )
+    )
+    return _num_veh_keys(vehicles, categories), _num_veh_keys(users, categories)
+
+
+def accident_positions(table, num_acc):
+    # Première ligne de la table pour chaque Num_Acc demandé, -1 si absent
+    return lookup(build_index(table["Num_Acc"].to_numpy(np.int64)), num_acc)
+
+
+@timed
+def join_positions(users, vehicles, characteristics=None, locations=None):
+    # Usagers gardés par la jointure interne et ligne de chaque table reliée
+    vehicle_ids, user_ids = vehicle_keys(vehicles, users)
+    positions = {"vehicles": lookup(build_index(vehicle_ids), user_ids)}
+    num_acc = users["Num_Acc"].to_numpy(np.int64)
+    context = {"characteristics": characteristics, "locations": locations}
+    for name, table in context.items():
+        if table is not None:
+            positions[name] = accident_positions(table, num_acc)
+
+    # Jointure interne, comme merge : on garde les usagers reliés partout
+    keep = np.logical_and.reduce([p >= 0 for p in positions.values()])
+    return keep, positions
+
+
+@timed
+def _assemble(users, keep, positions, tables):
+    parts = [users[keep].reset_index(drop=True)]
+    for name, rows in positions.items():
+        table = tables[name]
+        columns = [c for c in table.columns if c not in parts[0].columns]
+        parts.append(table[columns].take(rows[keep]).reset_index(drop=True))
+    return pd.concat(parts, axis=1)
+
+
+def join_users_vehicles(users, vehicles, characteristics=None, locations=None):
+    keep, positions = join_positions(users, vehicles, characteristics, locations)
+    tables = {
+        "vehicles": vehicles,
+        "characteristics": characteristics,
+        "locations": locations,
+    }
+    return _assemble(users, keep, positions, tables)
+
+
+@functools.lru_cache(maxsize=16)
+def _cached_accident_index(year, signature, table):
+    index = build_index(
+        load_data(year)[TABLES.index(table)]["Num_Acc"].to_numpy(np.int64)
+    )
+    for array in index.values():
+        array.flags.writeable = False
+    return index
+
+
+def accident_index(year, table):
+    # Index Num_Acc d'une table, construit une fois par année
+    return _cached_accident_index(year, source_signature(year), table)
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_view(year, signature):
+    characteristics, locations, users, vehicles = load_data(year)
+    keep, positions = join_positions(users, vehicles, characteristics, locations)
+    tables = {
+        "vehicles": vehicles,
+        "characteristics": characteristics,
+        "locations": locations,
+    }
+    view = _assemble(users, keep, positions, tables)
+    rows = np.flatnonzero(keep)
+    rows.flags.writeable = False
+    return freeze(view), rows
+
+
+@timed
+def user_vehicle_view(year):
+    # Usagers avec leur véhicule et le contexte de l'accident, partagé entre pages
+    return _cached_view(year, source_signature(year))[0].copy(deep=False)
+
+
+def user_vehicle_rows(year):
+    # Ligne de la table des usagers de chaque ligne de user_vehicle_view(year)
+    return _cached_view(year, source_signature(year))[1]
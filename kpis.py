@@ -0,0 +1,51 @@
+# Chiffres clés d'une année, calculés chacun à partir de la bonne table
+# (un accident = une ligne de caractéristiques, une victime = une ligne d'usagers)
+# au lieu de fusionner les quatre tables.
+import functools
+
+import numpy as np
+
+from filters import NO_FILTERS, filter_key, row_masks
+from perf import timed
+from utils import TABLES, load_data, source_signature
+
+KILLED = 2
+HOSPITALIZED = 3
+SLIGHTLY_INJURED = 4
+
+
+def compute_kpis(characteristics, locations, users, vehicles):
+    # Comme l'ancienne fusion interne : un accident compte s'il apparaît dans les 4 tables
+    accidents = characteristics["Num_Acc"].unique()
+    for table in (users, locations, vehicles):
+        accidents = np.intersect1d(accidents, table["Num_Acc"].unique())
+
+    users = users[np.isin(users["Num_Acc"].to_numpy(), accidents)]
+    grav = users["grav"].to_numpy()
+    killed = grav == KILLED
+    return {
+        "accidents": len(accidents),
+        "fatal_accidents": len(np.unique(users["Num_Acc"].to_numpy()[killed])),
+        "users": len(users),
+        "killed": int(killed.sum()),
+        "hospitalized": int((grav == HOSPITALIZED).sum()),
+        "slightly_injured": int((grav == SLIGHTLY_INJURED).sum()),
+        "injured": int(np.isin(grav, (HOSPITALIZED, SLIGHTLY_INJURED)).sum()),
+        "vehicles": int(np.isin(vehicles["Num_Acc"].to_numpy(), accidents).sum()),
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_kpis(year, signature, filters):
+    frames = load_data(year)
+    if filters:
+        masks = row_masks(year, filters)
+        frames = [frame[masks[table]] for table, frame in zip(TABLES, frames)]
+    return compute_kpis(*frames)
+
+
+@timed
+def year_kpis(year, filters=NO_FILTERS):
+    # La signature des CSV fait partie de la clé : un fichier modifié est recalculé
+    filters = filter_key(filters)
+    return dict(_cached_kpis(year, source_signature(year), filters))
@@ -0,0 +1,158 @@
+# Libellés des codes BAAC, communs à toutes les pages. Les codes sont décodés en
+# catégories ordonnées (ordre des dictionnaires ci-dessous) dans un nouveau
+# tableau : les tableaux partagés ne sont jamais modifiés ni copiés.
+import numpy as np
+import pandas as pd
+
+GRAV = {
+    1: "Unharmed",
+    4: "Slight injury",
+    3: "Hospitalized injury",
+    2: "Killed",
+}
+
+MONTHS = {
+    1: "January",
+    2: "February",
+    3: "March",
+    4: "April",
+    5: "May",
+    6: "June",
+    7: "July",
+    8: "August",
+    9: "September",
+    10: "October",
+    11: "November",
+    12: "December",
+}
+
+SURF = {
+    -1: "Not specified",
+    1: "Normal",
+    2: "Wet",
+    3: "Puddles",
+    4: "Flooded",
+    5: "Snow-covered",
+    6: "Mud",
+    7: "Icy",
+    8: "Greasy substance – oil",
+    9: "Other",
+}
+
+LUM = {
+    1: "Daylight",
+    2: "Twilight or dawn",
+    3: "Night without public lighting",
+    4: "Night with public lighting off",
+    5: "Night with public lighting on",
+}
+
+CHOC = {
+    -1: "Not specified",
+    0: "None",
+    1: "Front",
+    2: "Front right",
+    3: "Front left",
+    4: "Rear",
+    5: "Rear right",
+    6: "Rear left",
+    7: "Right side",
+    8: "Left side",
+    9: "Multiple impacts (rollover)",
+}
+
+OBS = {
+    -1: "Not specified",
+    0: "Not applicable",
+    1: "Parked vehicle",
+    2: "Tree",
+    3: "Metal guardrail",
+    4: "Concrete guardrail",
+    5: "Other guardrail",
+    6: "Building, wall, bridge pier",
+    7: "Vertical signal support or emergency call post",
+    8: "Post",
+    9: "Urban furniture",
+    10: "Parapet",
+    11: "Island, refuge, high marker",
+    12: "Curb",
+    13: "Ditch, embankment, rock wall",
+    14: "Other fixed obstacle on roadway",
+    15: "Other fixed obstacle on sidewalk or shoulder",
+    16: "Off-road without obstacle",
+    17: "Pipe - aqueduct head",
+}
+
+OBSM = {
+    -1: "Not specified",
+    0: "None",
+    1: "Pedestrian",
+    2: "Vehicle",
+    4: "Rail vehicle",
+    5: "Domestic animal",
+    6: "Wild animal",
+    9: "Other",
+}
+
+JOURNEY = {
+    1: "Home – Work",
+    2: "Home – School",
+    3: "Shopping",
+    4: "Professional",
+    5: "Drive",
+    9: "Other",
+}
+
+SEX = {1: "Male", 2: "Female"}
+
+ROAD_CATEGORY = {
+    1: "Highway",
+    2: "National road",
+    3: "Departmental road",
+    4: "Communal road",
+    5: "Off public network",
+    6: "Parking lot",
+    7: "Urban metropolis road",
+    9: "Other",
+}
+
+USER_CATEGORY = {1: "Driver", 2: "Passenger", 3: "Pedestrian"}
+
+# Colonne -> libellés de ses codes
+LABELS = {
+    "grav": GRAV,
+    "mois": MONTHS,
+    "surf": SURF,
+    "lum": LUM,
+    "choc": CHOC,
+    "obs": OBS,
+    "obsm": OBSM,
+    "trajet": JOURNEY,
+    "sexe": SEX,
+    "catr": ROAD_CATEGORY,
+    "catu": USER_CATEGORY,
+}
+
+
+def label_dtype(column):
+    return pd.CategoricalDtype(list(LABELS[column].values()), ordered=True)
+
+
+def decode(values, column):
+    # Codes -> catégories ordonnées ; un code sans libellé (ou NA) donne NaN
+    mapping = LABELS[column]
+    codes = pd.Series(values).to_numpy(dtype=np.float64, na_value=np.nan)
+    positions = np.full(len(codes), -1)
+    for position, code in enumerate(mapping):
+        positions[codes == code] = position
+    return pd.Categorical.from_codes(positions, dtype=label_dtype(column))
+
+
+def decode_frame(df, columns=None):
+    # Nouveau tableau dont les colonnes codées portent leurs libellés ; les
+    # autres colonnes sont partagées, sans copie
+    columns = [c for c in (columns or df.columns) if c in LABELS]
+    decoded = df.copy(deep=False)
+    for column in columns:
+        decoded[column] = decode(df[column], column)
+    return decoded
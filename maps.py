@@ -0,0 +1,333 @@
+# Données préparées côté serveur pour les cartes de la page Locations : on envoie
+# au navigateur des cellules agrégées plutôt que chaque accident.
+import functools
+import json
+
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement
+from folium.elements import JSCSSMixin
+from folium.plugins import HeatMap, MarkerCluster
+from folium.utilities import parse_options
+from jinja2 import Template
+
+from filters import NO_FILTERS, filter_key, row_masks
+from joins import accident_index, accident_positions, lookup, matching_rows
+from perf import timed
+from spatial import nearest, radius_query, year_grid_index
+from utils import load_data, location_index, location_rows, source_signature
+
+# Poids d'un accident selon la blessure la plus grave de ses usagers
+SEVERITY_WEIGHTS = {1: 1.0, 4: 1.0, 3: 3.0, 2: 10.0}  # indemne, léger, hospitalisé, tué
+
+# Taille d'une cellule de la carte de chaleur, en pixels à l'écran, et niveaux de
+# zoom précalculés (jusqu'au zoom maximal des cartes folium)
+HEATMAP_CELL_PIXELS = 4
+HEATMAP_ZOOMS = range(5, 19)
+# Part des positions distinctes ayant leur propre cellule à partir de laquelle on
+# envoie les positions exactes plutôt que des niveaux de plus en plus fins
+HEATMAP_EXACT_SHARE = 0.95
+
+# Regroupement des marqueurs : une grappe par carré de 64 px (quatre par côté de
+# tuile de 256 px), niveaux de zoom précalculés. À partir de DETAIL_ZOOM, chaque
+# tuile d'au plus MAX_TILE_MARKERS accidents les envoie un par un ; le navigateur
+# ne dessine que les tuiles visibles
+TILE_PIXELS = 256
+CLUSTER_CELL_PIXELS = 64
+CLUSTER_ZOOMS = range(8, 17)
+DETAIL_ZOOM = 16
+MAX_TILE_MARKERS = 100
+
+# Accidents listés au plus autour d'un point cliqué
+NEARBY_LIMIT = 500
+
+# Rang de gravité des codes grav (indemne < léger < hospitalisé < tué)
+SEVERITY_RANKS = {1: 0, 4: 1, 3: 2, 2: 3}
+
+# Arrondi des coordonnées envoyées au navigateur (1e-5 degré, environ 1 m)
+COORDINATE_DECIMALS = 5
+
+
+def resolution_for_zoom(zoom, pixels=HEATMAP_CELL_PIXELS):
+    # Une tuile de 256 px couvre 360 / 2**zoom degrés de longitude
+    return 360 / (256 * 2**zoom) * pixels
+
+
+def bin_points(lat, lon, resolution, weights=None):
+    # [[lat, lon, poids], ...] : une entrée par cellule non vide, poids ramenés à [0, 1]
+    rows = np.floor(np.asarray(lat, dtype=np.float64) / resolution).astype(np.int64)
+    cols = np.floor(np.asarray(lon, dtype=np.float64) / resolution).astype(np.int64)
+    cells, inverse = np.unique(np.stack([rows, cols]), axis=1, return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=weights, minlength=cells.shape[1])
+    if not len(totals):
+        return []
+    centers = (cells + 0.5) * resolution
+    return np.column_stack([centers[0], centers[1], totals / totals.max()]).tolist()
+
+
+def accident_severity_weights(characteristics, users):
+    # Poids par ligne des caractéristiques : celui de l'usager le plus gravement
+    # atteint (les poids croissent avec la gravité)
+    by_grav = np.ones(5)
+    for grav, weight in SEVERITY_WEIGHTS.items():
+        by_grav[grav] = weight
+    grav = users["grav"].to_numpy(dtype=np.int64, na_value=0).clip(0, 4)
+    positions = accident_positions(characteristics, users["Num_Acc"].to_numpy())
+    found = positions >= 0
+    weights = np.ones(len(characteristics))
+    np.maximum.at(weights, positions[found], by_grav[grav[found]])
+    return weights
+
+
+@timed
+def area_rows(year, area, filters=NO_FILTERS):
+    # Zone affichée : ("radius", lat, lon, rayon en m) ou (colonne, code), par
+    # exemple ("dep", 75) ou ("com", "75056") ; restreinte aux accidents retenus
+    # par les filtres globaux
+    if area[0] == "radius":
+        rows = radius_query(year_grid_index(year), *area[1:])
+    else:
+        rows = location_rows(location_index(year, area[0]), area[1])
+    masks = row_masks(year, filters)
+    if masks is not None:
+        rows = rows[masks["caracteristiques"][rows]]
+    return rows
+
+
+def bin_levels(lat, lon, weights=None, zooms=HEATMAP_ZOOMS):
+    # {zoom: [[lat, lon, poids], ...]} : cellules de HEATMAP_CELL_PIXELS à l'écran
+    # pour chaque zoom. Dès que presque chaque position distincte a sa propre
+    # cellule, le niveau porte les positions exactes et sert aussi aux zooms
+    # suivants (le navigateur garde le dernier niveau inférieur disponible)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if not len(lat):
+        return {zooms[0]: []}
+    positions, inverse = np.unique(np.stack([lat, lon]), axis=1, return_inverse=True)
+    levels = {}
+    for zoom in zooms:
+        points = bin_points(lat, lon, resolution_for_zoom(zoom), weights)
+        if len(points) >= HEATMAP_EXACT_SHARE * positions.shape[1]:
+            totals = np.bincount(
+                inverse.ravel(), weights=weights, minlength=positions.shape[1]
+            )
+            points = np.column_stack(
+                [positions[0], positions[1], totals / totals.max()]
+            ).tolist()
+            levels[zoom] = _heat_points(points)
+            break
+        levels[zoom] = _heat_points(points)
+    return levels
+
+
+def _heat_points(points):
+    # Coordonnées arrondies comme les marqueurs, poids à 1e-4 près
+    return [
+        [round(lat, COORDINATE_DECIMALS), round(lon, COORDINATE_DECIMALS), round(w, 4)]
+        for lat, lon, w in points
+    ]
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_heatmap(year, signature, area, by_severity, filters):
+    characteristics, _, users, _ = load_data(year)
+    rows = area_rows(year, area, filters)
+    lat = characteristics["lat"].to_numpy()[rows]
+    lon = characteristics["long"].to_numpy()[rows]
+    weights = None
+    if by_severity:
+        weights = accident_severity_weights(characteristics, users)[rows]
+    return json.dumps(bin_levels(lat, lon, weights))
+
+
+@timed
+def heatmap_levels(year, area, by_severity=False, filters=NO_FILTERS):
+    # JSON {zoom: [[lat, lon, poids], ...]} prêt à être inséré dans la carte ; mis
+    # en cache par (année, zone, pondération, filtres)
+    return _cached_heatmap(
+        year, source_signature(year), tuple(area), by_severity, filter_key(filters)
+    )
+
+
+def _cells(lat, lon, resolution):
+    # Cellules non vides d'une grille et cellule de chaque point
+    rows = np.floor(lat / resolution).astype(np.int64)
+    cols = np.floor(lon / resolution).astype(np.int64)
+    cells, inverse = np.unique(np.stack([rows, cols]), axis=1, return_inverse=True)
+    return cells.shape[1], inverse.ravel()
+
+
+def cluster_points(lat, lon, zoom, max_markers=MAX_TILE_MARKERS):
+    # Grappes [lat, lon, effectif] d'un niveau de zoom. Les grilles s'emboîtent
+    # d'un niveau à l'autre (taille divisée par deux) et dans les tuiles ; une
+    # tuile porte au plus (256 / 64)² grappes, ou max_markers accidents isolés
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    single = np.zeros(len(lat), dtype=bool)
+    if zoom >= DETAIL_ZOOM and len(lat):
+        _, tiles = _cells(lat, lon, resolution_for_zoom(zoom, TILE_PIXELS))
+        single = np.bincount(tiles)[tiles] <= max_markers
+    markers = _markers(lat[single], lon[single], np.ones(single.sum(), dtype=np.int64))
+
+    lat, lon = lat[~single], lon[~single]
+    if not len(lat):
+        return markers
+    count, inverse = _cells(lat, lon, resolution_for_zoom(zoom, CLUSTER_CELL_PIXELS))
+    counts = np.bincount(inverse, minlength=count)
+    # Grappe placée au barycentre de ses accidents
+    centers_lat = np.bincount(inverse, weights=lat, minlength=count) / counts
+    centers_lon = np.bincount(inverse, weights=lon, minlength=count) / counts
+    return markers + _markers(centers_lat, centers_lon, counts)
+
+
+def _markers(lat, lon, counts):
+    lat = np.round(lat, COORDINATE_DECIMALS).tolist()
+    lon = np.round(lon, COORDINATE_DECIMALS).tolist()
+    return [list(marker) for marker in zip(lat, lon, counts.tolist())]
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_clusters(year, signature, area, filters):
+    characteristics = load_data(year)[0]
+    rows = area_rows(year, area, filters)
+    lat = characteristics["lat"].to_numpy()[rows]
+    lon = characteristics["long"].to_numpy()[rows]
+    levels = {}
+    for zoom in CLUSTER_ZOOMS:
+        clusters = cluster_points(lat, lon, zoom)
+        # Un niveau identique au précédent n'est pas renvoyé : le navigateur
+        # réutilise le dernier niveau inférieur disponible
+        if not levels or clusters != list(levels.values())[-1]:
+            levels[zoom] = clusters
+    return json.dumps(levels)
+
+
+@timed
+def cluster_levels(year, area, filters=NO_FILTERS):
+    # JSON {zoom: [[lat, lon, effectif], ...]} prêt à être inséré dans la carte
+    return _cached_clusters(
+        year, source_signature(year), tuple(area), filter_key(filters)
+    )
+
+
+@timed
+def nearby_accidents(year, lat, lon, radius_m, limit=NEARBY_LIMIT, filters=NO_FILTERS):
+    # Accidents autour d'un point, du plus proche au plus lointain, avec la route
+    # (lieux) et la gravité la plus lourde de leurs usagers ; plus les comptes
+    # par gravité de tous les usagers concernés. Lieux et usagers sont lus par
+    # positions (index Num_Acc de l'année), sans fusion de tables.
+    characteristics, locations, users, _ = load_data(year)
+    rows, distances = nearest(year_grid_index(year), lat, lon, radius_m)
+    masks = row_masks(year, filters)
+    if masks is not None:
+        kept = masks["caracteristiques"][rows]
+        rows, distances = rows[kept], distances[kept]
+    rows, distances = rows[:limit], distances[:limit]
+    columns = ["Num_Acc", "jour", "mois", "an", "hour", "minute"]
+    accidents = characteristics[columns].take(rows).reset_index(drop=True)
+    accidents.insert(1, "distance_m", np.round(distances).astype(np.int64))
+    num_acc = accidents["Num_Acc"].to_numpy(np.int64)
+
+    positions = lookup(accident_index(year, "lieux"), num_acc)
+    found = positions >= 0
+    for column in ("catr", "surf"):
+        values = locations[column].take(positions.clip(min=0)).reset_index(drop=True)
+        accidents[column] = values.where(found)
+
+    user_rows, owners = matching_rows(accident_index(year, "usagers"), num_acc)
+    grav = users["grav"].to_numpy(dtype=np.int64, na_value=-1)[user_rows]
+    by_rank = np.array([-1] + sorted(SEVERITY_RANKS, key=SEVERITY_RANKS.get))
+    ranks = np.array([SEVERITY_RANKS.get(code, -1) for code in range(5)])
+    worst = np.full(len(accidents), -1)
+    np.maximum.at(worst, owners, ranks[grav.clip(0, 4)])
+    accidents["users"] = np.bincount(owners, minlength=len(accidents))
+    accidents["grav"] = by_rank[worst + 1]
+    severity = pd.Series(grav[grav >= 0]).value_counts().sort_index()
+    return accidents, severity
+
+
+class ZoomClusters(JSCSSMixin, MacroElement):
+    # Affiche, à chaque zoom, le niveau de grappes précalculé correspondant, limité
+    # à la vue (plus une marge) pour que le nombre de marqueurs dessinés dépende de
+    # l'écran et non de la zone
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var levels = {{ this.levels }};
+            var map = {{ this._parent.get_name() }};
+            var layer = L.layerGroup().addTo(map);
+            var zooms = Object.keys(levels).map(Number).sort(function(a, b) { return a - b; });
+            function draw() {
+                var zoom = zooms[0];
+                zooms.forEach(function(z) { if (z <= map.getZoom()) { zoom = z; } });
+                var bounds = map.getBounds().pad(0.25);
+                layer.clearLayers();
+                levels[zoom].forEach(function(p) {
+                    if (!bounds.contains([p[0], p[1]])) { return; }
+                    if (p[2] == 1) {
+                        L.circleMarker([p[0], p[1]], {radius: 4, weight: 1}).addTo(layer);
+                        return;
+                    }
+                    var size = 26 + 6 * Math.round(Math.log10(p[2]));
+                    L.marker([p[0], p[1]], {icon: L.divIcon({
+                        html: '<div><span>' + p[2] + '</span></div>',
+                        className: 'marker-cluster marker-cluster-' +
+                            (p[2] < 10 ? 'small' : p[2] < 100 ? 'medium' : 'large'),
+                        iconSize: L.point(size, size)
+                    })}).on('click', function() {
+                        map.setView([p[0], p[1]], Math.min(map.getZoom() + 2, map.getMaxZoom()));
+                    }).addTo(layer);
+                });
+            }
+            map.on('moveend', draw);
+            draw();
+        })();
+        {% endmacro %}
+        """)
+
+    # Même apparence que les grappes de Leaflet.markercluster
+    default_css = MarkerCluster.default_css
+
+    def __init__(self, levels):
+        super().__init__()
+        self._name = "ZoomClusters"
+        self.levels = levels
+
+
+class ZoomHeatMap(JSCSSMixin, MacroElement):
+    # Carte de chaleur dont les cellules suivent le zoom de la carte : à chaque
+    # changement de zoom, le niveau précalculé correspondant remplace les points
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var levels = {{ this.levels }};
+            var map = {{ this._parent.get_name() }};
+            var zooms = Object.keys(levels).map(Number).sort(function(a, b) { return a - b; });
+            function level() {
+                var zoom = zooms[0];
+                zooms.forEach(function(z) { if (z <= map.getZoom()) { zoom = z; } });
+                return zoom;
+            }
+            var current = level();
+            var heat = L.heatLayer(levels[current], {{ this.options|tojson }}).addTo(map);
+            map.on('zoomend', function() {
+                var zoom = level();
+                if (zoom !== current) {
+                    current = zoom;
+                    heat.setLatLngs(levels[zoom]);
+                }
+            });
+        })();
+        {% endmacro %}
+        """)
+
+    # Même bibliothèque (Leaflet.heat) que folium.plugins.HeatMap
+    default_js = HeatMap.default_js
+
+    def __init__(self, levels, min_opacity=0.5, max_zoom=18, radius=25, blur=15):
+        super().__init__()
+        self._name = "ZoomHeatMap"
+        self.levels = levels
+        self.options = parse_options(
+            min_opacity=min_opacity, max_zoom=max_zoom, radius=radius, blur=blur
+        )
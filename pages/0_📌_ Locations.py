@@ -1,35 +1,166 @@
 import streamlit as st
-from utils import load_data, alignement
+from utils import alignement, location_index
+from maps import (
+    ZoomClusters,
+    ZoomHeatMap,
+    area_rows,
+    cluster_levels,
+    heatmap_levels,
+    nearby_accidents,
+)
+from hotspots import hotspots
+from filters import sidebar_filters
+from labels import GRAV, decode, decode_frame
+from tiles import FRANCE_BOUNDS, MOSAIC_ZOOMS, tile_mosaic
 import folium
-from folium.plugins import FastMarkerCluster, HeatMap
-from streamlit_folium import folium_static
+from streamlit_folium import folium_static, st_folium
 import numpy as np
+import pandas as pd
+import time
+from perf import finish_run, start_run
 
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Location")
+start_run("locations")
 
+ZOOM_START = 12
+DEPARTMENT_ZOOM = 9
 
-def display_fast_marker_cluster(city_data, city_coordinates):
-    lats = city_data["lat"]
-    lons = city_data["long"]
-    m = folium.Map(location=city_coordinates, tiles="Cartodb Positron", zoom_start=12)
-    FastMarkerCluster(data=list(zip(lats, lons))).add_to(m)
 
-    folium_static(m, width=900, height=600)
+def display_fast_marker_cluster(
+    cluster_levels, city_coordinates, zoom=ZOOM_START, clickable=False
+):
+    start = time.perf_counter()
+    m = folium.Map(location=city_coordinates, tiles="Cartodb Positron", zoom_start=zoom)
+    # Grappes précalculées par niveau de zoom : les accidents un par un ne sont
+    # envoyés que pour les zooms les plus proches
+    ZoomClusters(cluster_levels).add_to(m)
 
+    clicked = None
+    if clickable:
+        # Seul le dernier clic est renvoyé : déplacer la carte ne relance pas la page
+        output = st_folium(m, width=900, height=600, returned_objects=["last_clicked"])
+        clicked = (output or {}).get("last_clicked")
+    else:
+        folium_static(m, width=900, height=600)
+    st.caption(
+        "Cluster payload: {:.1f} kB - render time: {:.0f} ms".format(
+            len(cluster_levels) / 1024, (time.perf_counter() - start) * 1000
+        )
+    )
+    return clicked
+
+
+def display_nearby_accidents(year, clicked, radius_m, filters):
+    if not clicked:
+        st.info("Click on the map to list the accidents around that point.")
+        return
+    start = time.perf_counter()
+    accidents, severity = nearby_accidents(
+        year, clicked["lat"], clicked["lng"], radius_m, filters=filters
+    )
+    st.subheader(
+        "{} accidents within {} m of ({:.5f}, {:.5f})".format(
+            len(accidents), radius_m, clicked["lat"], clicked["lng"]
+        )
+    )
+    st.caption("Query time: {:.0f} ms".format((time.perf_counter() - start) * 1000))
+    if accidents.empty:
+        return
 
-def display_heatmap(city_data, city_coordinates):
-    city_map = folium.Map(location=city_coordinates, zoom_start=12)
-    heat_data = [[row["lat"], row["long"]] for index, row in city_data.iterrows()]
-    # for each row in city_data, we create a list with the latitude and longitude
-    city_map.add_child(HeatMap(heat_data, radius=15))
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Users by injury severity**")
+        st.bar_chart(severity.rename(index=GRAV))
+    with col2:
+        st.markdown("**Accidents by road category**")
+        roads = pd.Series(decode(accidents["catr"], "catr")).value_counts(sort=False)
+        st.bar_chart(roads[roads > 0].rename(index=str))
+
+    st.dataframe(
+        decode_frame(accidents, ["grav", "catr", "surf"]),
+        hide_index=True,
+    )
+
+
+def display_heatmap(heat_levels, city_coordinates, zoom=ZOOM_START):
+    city_map = folium.Map(location=city_coordinates, zoom_start=zoom)
+    # heat_levels : cellules [lat, long, poids] agrégées côté serveur pour chaque
+    # zoom ; le navigateur change de niveau quand on zoome sur la carte
+    city_map.add_child(ZoomHeatMap(heat_levels, radius=15))
     folium_static(city_map, width=900, height=600)
 
 
+def display_density_tiles(year):
+    # Tuiles de densité précalculées (python -m tiles <années>), assemblées sur la
+    # France métropolitaine ; construites à la demande si elles manquent
+    zoom = st.sidebar.select_slider(
+        "Density detail (zoom)", options=list(MOSAIC_ZOOMS), value=6
+    )
+    image, bounds = tile_mosaic(year, zoom)
+    south, west, north, east = FRANCE_BOUNDS
+    france_map = folium.Map(
+        location=((south + north) / 2, (west + east) / 2),
+        tiles="Cartodb Positron",
+        zoom_start=6,
+    )
+    folium.raster_layers.ImageOverlay(
+        image, bounds=bounds, mercator_project=False, opacity=0.8
+    ).add_to(france_map)
+    folium_static(france_map, width=900, height=600)
+
+
+def display_hotspots(year, area, city, city_coordinates, zoom, filters):
+    # Points noirs : maxima de la densité lissée, les plus denses d'abord
+    top_k = st.sidebar.slider(
+        "Number of hotspots", min_value=5, max_value=50, value=20, step=5
+    )
+    nationwide = st.toggle("Rank hotspots across the whole country", value=False)
+    start = time.perf_counter()
+    if nationwide:
+        ranked = hotspots(year, top_k=top_k, filters=filters)
+        city_coordinates, zoom = (46.6, 2.4), 6
+    else:
+        ranked = hotspots(year, area, top_k, filters)
+    st.caption(
+        "Hotspots of {} - computed in {:.0f} ms".format(
+            "France" if nationwide else city, (time.perf_counter() - start) * 1000
+        )
+    )
+
+    hotspot_map = folium.Map(
+        location=city_coordinates, tiles="Cartodb Positron", zoom_start=zoom
+    )
+    for rank, hotspot in enumerate(ranked.itertuples(), start=1):
+        folium.CircleMarker(
+            (hotspot.lat, hotspot.lon),
+            radius=6 + 14 * hotspot.density / max(ranked["density"].max(), 1e-9),
+            color="darkred" if hotspot.fatal_accidents else "orangered",
+            fill=True,
+            tooltip="#{} - {} accidents, {:.0%} fatal".format(
+                rank, hotspot.accidents, hotspot.fatality_share
+            ),
+        ).add_to(hotspot_map)
+    folium_static(hotspot_map, width=900, height=600)
+
+    st.dataframe(
+        ranked.drop(columns="density").rename(
+            columns={
+                "accidents": "Accidents within 1 km",
+                "fatal_accidents": "Fatal accidents",
+                "fatality_share": "Fatality share",
+            }
+        ),
+        hide_index=True,
+    )
+
+
 def display_location():
-    # Sélection de la ville
+    # Sélection du lieu : ville et rayon, ou n'importe quel département / commune
     st.title("📌 Analysis of Location's Accidents")
     alignement(2)
-    city = st.radio("Choose a city", ("Paris", "Lyon", "Marseille", "Bordeaux", "Nice"))
+    place_type = st.radio(
+        "Choose a place", ("City", "Department", "Commune"), horizontal=True
+    )
 
     city_coords = {
         "Paris": (48.8566, 2.3522, 75),
@@ -41,13 +172,48 @@ def display_location():
     selected_year = st.sidebar.slider(
         "Select a year", min_value=2019, max_value=2021, value=2021, step=1
     )
-    caracteristiques, _, _, _ = load_data(selected_year)
-    city_data = caracteristiques[caracteristiques["dep"] == city_coords[city][2]]
-    city_coordinates = city_coords[city][:2]  # (lat, long)
+    active_filters = sidebar_filters(selected_year)
+    view = st.sidebar.radio("View", ("Area maps", "Nationwide density map", "Hotspots"))
+    if view == "Nationwide density map":
+        st.title("📌 Accident density across France")
+        display_density_tiles(selected_year)
+        if active_filters:
+            st.caption("Density tiles are prebuilt per year and ignore the filters.")
+        return
+
+    if place_type == "City":
+        city = st.radio(
+            "Choose a city", ("Paris", "Lyon", "Marseille", "Bordeaux", "Nice")
+        )
+        radius_km = st.sidebar.slider(
+            "Radius around the city (km)", min_value=1, max_value=50, value=10, step=1
+        )
+        city_coordinates = city_coords[city][:2]  # (lat, long)
+        # Accidents dans le rayon choisi, via l'index spatial de l'année
+        area = ("radius", *city_coordinates, radius_km * 1000)
+        place, zoom = f"within {radius_km} km of {city}", ZOOM_START
+    else:
+        column = "dep" if place_type == "Department" else "com"
+        # Index (code -> lignes, centre, emprise) construit une fois par année
+        places = location_index(selected_year, column)["codes"]
+        codes = sorted(
+            (code for code, entry in places.items() if entry["centroid"]),
+            key=lambda code: -places[code]["count"],
+        )
+        code = st.selectbox(
+            f"Choose a {place_type.lower()}",
+            codes,
+            format_func=lambda code: f"{code} ({places[code]['count']} accidents)",
+        )
+        city = f"{place_type.lower()} {code}"
+        city_coordinates = places[code]["centroid"]
+        area = (column, code)
+        place = f"in {city}"
+        zoom = DEPARTMENT_ZOOM if column == "dep" else ZOOM_START
 
     st.title(f" Zoom on {city} ")
 
-    accident_count = len(city_data)
+    accident_count = len(area_rows(selected_year, area, active_filters))
     st.markdown(
         """
         <style>
@@ -66,19 +232,45 @@ def display_location():
     )
 
     st.markdown(
-        "<span class='big-text'>Number of accidents in {} : </span><span class='red-text'>{}</span>".format(
-            city, accident_count
+        "<span class='big-text'>Number of accidents {} : </span><span class='red-text'>{}</span>".format(
+            place, accident_count
         ),
         unsafe_allow_html=True,
     )
 
+    if view == "Hotspots":
+        display_hotspots(
+            selected_year, area, city, city_coordinates, zoom, active_filters
+        )
+        return
+
     # Un bouton switch pour choisir entre Fast Marker Cluster et Heatmap
     is_heatmap = st.toggle("Try another map !", value=False)
 
     if is_heatmap:
-        display_heatmap(city_data, city_coordinates)
+        by_severity = st.toggle("Weight by severity", value=False)
+        heat_levels = heatmap_levels(selected_year, area, by_severity, active_filters)
+        display_heatmap(heat_levels, city_coordinates, zoom)
     else:
-        display_fast_marker_cluster(city_data, city_coordinates)
+        find_nearby = st.toggle("Find accidents around a clicked point", value=False)
+        if find_nearby:
+            search_radius_m = st.sidebar.slider(
+                "Search radius around the click (m)",
+                min_value=50,
+                max_value=2000,
+                value=200,
+                step=50,
+            )
+        clicked = display_fast_marker_cluster(
+            cluster_levels(selected_year, area, active_filters),
+            city_coordinates,
+            zoom,
+            clickable=find_nearby,
+        )
+        if find_nearby:
+            display_nearby_accidents(
+                selected_year, clicked, search_radius_m, active_filters
+            )
 
     st.markdown(
         """
@@ -101,3 +293,5 @@ def display_location():
 
 
 display_location()
+
+finish_run()
@@ -2,8 +2,10 @@
 import streamlit as st
 import pandas as pd
 from utils import load_data
+from perf import finish_run, start_run
 
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Data info")
+start_run("data_info")
 
 
 characteristics, locations, users, vehicles = load_data(2021)
@@ -128,3 +130,5 @@ with st.expander("Show all"):
     st.dataframe(vehicles.isna().sum())
 
 # Section pour afficher le PDF
+
+finish_run()
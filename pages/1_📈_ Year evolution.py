@@ -1,53 +1,29 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
+from aggregates import yearly_severity_counts
+from filters import NO_FILTERS, sidebar_filters
+from figures import figure_key, plotly_chart
+from labels import decode
+from perf import finish_run, start_run
 
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Yearly Evolution")
+start_run("year_evolution")
 
-GRAVITY_MAPPING = {
-    1: "Uninjured",
-    2: "Killed",
-    3: "Injured and hospitalized",
-    4: "Minor injuries",
-}
+YEARS = range(2017, 2022)
 
 
-def convert_year(year):
-    year = int(str(year).replace(",", ""))
-    if 0 <= year < 100:
-        return 2000 + year
-    return year
-
-
-def aggregate_accidents_by_year():
-    all_data = []
-
-    for year in range(2017, 2022):
-        df_characteristics = pd.read_csv(
-            f"assets/{year}/caracteristiques-{year}.csv",
-            sep=";" if year > 2018 else ",",
-            encoding="latin1",
-        )
-        df_users = pd.read_csv(
-            f"assets/{year}/usagers-{year}.csv",
-            sep=";" if year > 2018 else ",",
-            encoding="latin1",
-        )
-
-        df_merged = pd.merge(df_characteristics, df_users, on="Num_Acc", how="inner")
-        df_merged["an"] = df_merged["an"].apply(convert_year)
-        all_data.append(df_merged)
-
-    df_combined = pd.concat(all_data, ignore_index=True)
-    return df_combined
+def aggregate_accidents_by_year(filters=NO_FILTERS):
+    # Résumés annuels persistés (seules les années dont les CSV ont changé sont
+    # relues) ; avec des filtres, mêmes comptes sur les lignes retenues
+    return yearly_severity_counts(YEARS, filters)
 
 
 def create_yearly_severity_graph(df):
-    df["severity_text"] = df["grav"].map(GRAVITY_MAPPING)
     yearly_severity_counts = (
-        df.groupby(["an", "severity_text"])
-        .size()
-        .reset_index(name="number_of_accidents")
+        df.assign(severity_text=decode(df["grav"], "grav"))
+        .groupby(["an", "severity_text"], observed=True)["number_of_accidents"]
+        .sum()
+        .reset_index()
     )
 
     fig = px.line(
@@ -62,7 +38,7 @@ def create_yearly_severity_graph(df):
 
 
 def create_yearly_graph(df):
-    yearly_counts = df.groupby("an").size().reset_index(name="number_of_accidents")
+    yearly_counts = df.groupby("an")["number_of_accidents"].sum().reset_index()
 
     fig = px.line(
         yearly_counts,
@@ -88,18 +64,24 @@ def display_year():
         "Choose a graph type:", ["Count of Accidents", "Severity of Accidents"]
     )
 
-    df = aggregate_accidents_by_year()
+    # Les options des filtres sont celles de la dernière année
+    active_filters = sidebar_filters(YEARS[-1])
 
     if graph_choice == "Count of Accidents":
-        fig = create_yearly_graph(df)
+        create_graph = create_yearly_graph
         st.markdown("## Graph showcasing the evolution of accident counts by year")
     else:
-        fig = create_yearly_severity_graph(df)
+        create_graph = create_yearly_severity_graph
         st.markdown("## Graph showcasing the evolution of accident severity by year")
 
-    st.plotly_chart(
-        fig, use_container_width=True
+    # Figure mise en cache par type de graphique, années et filtres
+    plotly_chart(
+        figure_key("year_evolution", graph_choice, YEARS, active_filters),
+        lambda: create_graph(aggregate_accidents_by_year(active_filters)),
+        use_container_width=True,
     )  # Ensuring both figures are of the same size
 
 
 display_year()
+
+finish_run()
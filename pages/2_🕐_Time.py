@@ -1,39 +1,16 @@
 import streamlit as st
-import utils
 import plotly.express as px
-from utils import load_data, alignement
-import pandas as pd
+from utils import alignement
+from cube import query
+from filters import sidebar_filters
+from figures import figure_key, plotly_chart
+from perf import finish_run, start_run
 
-# comment every line below to explain what's happening
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Time")
+start_run("time")
 
-# map each month number to its name
-month_mapping = {
-    1: "January",
-    2: "February",
-    3: "March",
-    4: "April",
-    5: "May",
-    6: "June",
-    7: "July",
-    8: "August",
-    9: "Septembre",
-    10: "October",
-    11: "November",
-    12: "December",
-}
-# map each injury severity number to its name
-grav_mapping = {
-    1: "Unharmed",
-    2: "Killed",
-    3: "Hospitalized injury",
-    4: "Slight injury",
-}
-
-
-def create_fig_hour(df):
-    hourly_counts = df.groupby(["hour", "grav"]).size().reset_index(name="counts")
 
+def create_fig_hour(hourly_counts):
     fig = px.line(
         hourly_counts,
         x="hour",
@@ -60,26 +37,8 @@ def create_fig_hour(df):
     return fig
 
 
-def create_fig_month(df):
-    df["mois"] = df["mois"].map(month_mapping)
-    month_order = [
-        "January",
-        "February",
-        "March",
-        "April",
-        "May",
-        "June",
-        "July",
-        "August",
-        "Septembre",
-        "October",
-        "November",
-        "December",
-    ]
-    monthly_counts = df.groupby(["mois", "grav"]).size().reset_index(name="counts")
-    monthly_counts["mois"] = pd.Categorical(
-        monthly_counts["mois"], categories=month_order, ordered=True
-    )
+def create_fig_month(monthly_counts):
+    # Mois décodés en catégories ordonnées : le tri suit l'ordre de l'année
     monthly_counts = monthly_counts.sort_values(by="mois")
     fig = px.line(
         monthly_counts,
@@ -112,23 +71,31 @@ def display_time():
     selected_year = st.sidebar.slider(
         "Select a year", min_value=2019, max_value=2021, value=2021, step=1
     )
-    caracteristiques, _, users, _ = load_data(selected_year)
+    active_filters = sidebar_filters(selected_year)
 
-    # Merge the dataframes
-    merged_df = caracteristiques.merge(users, on="Num_Acc")
-    merged_df["grav"] = merged_df["grav"].map(grav_mapping)
+    # Comptes lus dans le cube de l'année au lieu de regrouper les lignes brutes
+    def counts(dimension):
+        grouped = query(
+            selected_year, [dimension, "grav"], filters=active_filters, decode=True
+        ).rename(columns={"count": "counts"})
+        return grouped.dropna().sort_values([dimension, "grav"])
 
     alignement(5)
 
+    # Figures mises en cache : reconstruites seulement si l'année ou les filtres changent
     st.markdown("### Number of accidents by hour")
-    fig1 = create_fig_hour(merged_df)
-    st.plotly_chart(fig1)
-
-    # in merged_df order by asc column mois
+    plotly_chart(
+        figure_key("time", "hour", selected_year, active_filters),
+        lambda: create_fig_hour(counts("hour")),
+    )
 
     st.markdown("### Number of accidents by time of the year")
-    fig2 = create_fig_month(merged_df)
-    st.plotly_chart(fig2)
+    plotly_chart(
+        figure_key("time", "month", selected_year, active_filters),
+        lambda: create_fig_month(counts("mois")),
+    )
 
 
 display_time()
+
+finish_run()
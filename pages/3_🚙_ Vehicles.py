@@ -1,47 +1,21 @@
 import streamlit as st
-import utils
 
-from utils import load_data, alignement
+from utils import alignement
+from cube import query
+from crosstab import proportions
+from filters import sidebar_filters
+from figures import figure_key, plotly_chart
 import plotly.express as px
+from perf import finish_run, start_run
 
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Vehicles")
+start_run("vehicles")
 
-choc_description = {
-    -1: "Not specified",
-    0: "None",
-    1: "Front",
-    2: "Front right",
-    3: "Front left",
-    4: "Rear",
-    5: "Rear right",
-    6: "Rear left",
-    7: "Right side",
-    8: "Left side",
-    9: "Multiple impacts (rollover)",
-}
-
-grav_mapping = {
-    1: "Unharmed",
-    2: "Killed",
-    3: "Hospitalized injury",
-    4: "Slight injury",
-}
-
-
-def create_fig(df):
-    df["choc"] = df["choc"].map(choc_description)
-    df["grav"] = df["grav"].map(grav_mapping)
-
-    # Grouper par 'choc' et 'grav' et calculer la taille de chaque groupe
-    grouped = df.groupby(["choc", "grav"]).size().reset_index(name="count")
 
+def create_fig(grouped):
+    # grouped : comptes par 'choc' et 'grav' issus du cube, déjà décodés
     # Normaliser le comptage pour chaque point d'impact (choc)
-    count_normalized_series = (
-        grouped.groupby("choc")["count"]
-        .apply(lambda x: x / x.sum())
-        .reset_index(level=0, drop=True)
-    )
-    grouped["count_normalized"] = count_normalized_series
+    grouped = proportions(grouped, ["choc", "grav"], by=["choc"])
 
     fig = px.histogram(
         grouped,
@@ -63,44 +37,9 @@ def create_fig(df):
     return fig
 
 
-obs_mapping = {
-    -1: "Not specified",
-    0: "Not applicable",
-    1: "Parked vehicle",
-    2: "Tree",
-    3: "Metal guardrail",
-    4: "Concrete guardrail",
-    5: "Other guardrail",
-    6: "Building, wall, bridge pier",
-    7: "Vertical signal support or emergency call post",
-    8: "Post",
-    9: "Urban furniture",
-    10: "Parapet",
-    11: "Island, refuge, high marker",
-    12: "Curb",
-    13: "Ditch, embankment, rock wall",
-    14: "Other fixed obstacle on roadway",
-    15: "Other fixed obstacle on sidewalk or shoulder",
-    16: "Off-road without obstacle",
-    17: "Pipe - aqueduct head",
-}
-
-obsm_mapping = {
-    -1: "Not specified",
-    0: "None",
-    1: "Pedestrian",
-    2: "Vehicle",
-    4: "Rail vehicle",
-    5: "Domestic animal",
-    6: "Wild animal",
-    9: "Other",
-}
-
-
 # Fonction pour créer un pie chart
-def create_pie_chart(df, column, mapping):
-    df[column] = df[column].map(mapping)
-    fig = px.pie(df, names=column, hole=0.3)
+def create_pie_chart(counts, column):
+    fig = px.pie(counts, names=column, values="count", hole=0.3)
     return fig
 
 
@@ -110,36 +49,42 @@ def display_vehicles():
     selected_year = st.sidebar.slider(
         "Select a year", min_value=2019, max_value=2021, value=2021, step=1
     )
-    caracteristiques, lieux, users, vehicles = utils.load_data(selected_year)
-    df = vehicles.merge(users, on="Num_Acc")
-    df1 = df.copy()
-    df2 = df.copy()
+    active_filters = sidebar_filters(selected_year)
+
+    # Comptes lus dans les petits cubes précalculés de l'année (filtres appliqués)
+    def counts(dimensions, **conditions):
+        return query(
+            selected_year, dimensions, filters=active_filters, decode=True, **conditions
+        )
+
+    # Figures mises en cache : reconstruites seulement si l'année ou les filtres changent
+    def key(chart):
+        return figure_key("vehicles", chart, selected_year, active_filters)
 
     # Pour afficher l'histogramme
     alignement(3)
-    df1 = df1[df1.choc != -1]
-    fig = create_fig(df1)
-
     st.markdown("### Accident severity by point of impact")
-    st.plotly_chart(fig)
+    plotly_chart(
+        key("choc_grav"),
+        lambda: create_fig(counts(["choc", "grav"], exclude={"choc": -1})),
+    )
 
     alignement(3)
     # enlever 0 et -1 pour les colonnes obs et obsm
-    df2 = df2[df2.obs != -1]
-    df2 = df2[df2.obs != 0]
-    df2 = df2[df2.obsm != -1]
-    df2 = df2[df2.obsm != 0]
-    df2 = df2[df2.obsm != 9]
-
-    pie_chart_obs = create_pie_chart(df2, "obs", obs_mapping)
+    obstacles = {"obs": (-1, 0), "obsm": (-1, 0, 9)}
 
     st.markdown("### Fixed obstacle hit")
-    st.plotly_chart(pie_chart_obs)
+    plotly_chart(
+        key("obs"),
+        lambda: create_pie_chart(counts(["obs"], exclude=obstacles), "obs"),
+    )
     alignement(2)
 
     st.markdown("### Mobile obstacle hit")
-    pie_chart_obsm = create_pie_chart(df2, "obsm", obsm_mapping)
-    st.plotly_chart(pie_chart_obsm)
+    plotly_chart(
+        key("obsm"),
+        lambda: create_pie_chart(counts(["obsm"], exclude=obstacles), "obsm"),
+    )
     alignement(5)
     st.markdown(
         """
@@ -160,3 +105,5 @@ def display_vehicles():
 
 
 display_vehicles()
+
+finish_run()
@@ -1,50 +1,27 @@
 import streamlit as st
-from utils import load_data, alignement
+from utils import alignement
+from cube import query
+from crosstab import proportions
+from filters import sidebar_filters
+from figures import figure_key, plotly_chart
 import plotly.express as px
 import plotly.graph_objects as go
+from perf import finish_run, start_run
 
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Roads & ⛈️Conditions")
+start_run("roads")
 
 
-surf_mapping = {
-    -1: "Not specified",
-    1: "Normal",
-    2: "Wet",
-    3: "Puddles",
-    4: "Flooded",
-    5: "Snow-covered",
-    6: "Mud",
-    7: "Icy",
-    8: "Greasy substance – oil",
-    9: "Other",
-}
-
-grav_mapping = {
-    1: "Unharmed",
-    2: "Killed",
-    3: "Hospitalized injury",
-    4: "Slight injury",
-}
-
-lum_mapping = {
-    1: "Daylight",
-    2: "Twilight or dawn",
-    3: "Night without public lighting",
-    4: "Night with public lighting off",
-    5: "Night with public lighting on",
-}
-
-
-def create_fig(df):
-    df["surf"] = df["surf"].map(surf_mapping)
-    df["grav"] = df["grav"].map(grav_mapping)
-
+def create_fig(grouped):
+    # grouped : comptes par 'surf' et 'grav' issus du cube, déjà décodés
     # Filter out unwanted categories
-    df = df[~df["surf"].isin(["Other", "Not specified"])]
+    grouped = grouped[~grouped["surf"].isin(["Other", "Not specified"])].dropna()
 
     fig = px.histogram(
-        df,
+        grouped,
         x="surf",
+        y="count",
+        histfunc="sum",
         color="grav",
         labels={
             "surf": "Road Surface Condition",
@@ -62,15 +39,11 @@ def create_fig(df):
     return fig
 
 
-def create_pie_chart(df):
-    # Apply the mapping to the 'surf' column
-    df["surf"] = df["surf"].map(surf_mapping)
-
+def create_pie_chart(surf_counts):
     # Filter out unwanted categories
-    df = df[~df["surf"].isin(["Other", "Not specified"])]
+    surf_counts = surf_counts[~surf_counts["surf"].isin(["Other", "Not specified"])]
+    surf_counts = surf_counts.dropna().sort_values("count", ascending=False)
 
-    surf_counts = df["surf"].value_counts().reset_index()
-    surf_counts.columns = ["surf", "count"]
     fig = px.pie(surf_counts, names="surf", values="count")
 
     fig.update_traces(textinfo="percent")
@@ -78,22 +51,10 @@ def create_pie_chart(df):
     return fig
 
 
-def create_normalized_histogram(df):
-    df["surf"] = df["surf"].map(surf_mapping)
-    df["grav"] = df["grav"].map(grav_mapping)
-
+def create_normalized_histogram(grouped):
     # Filter out unwanted categories
-    df = df[~df["surf"].isin(["Other", "Not specified"])]
-
-    grouped = df.groupby(["surf", "grav"]).size().reset_index(name="count")
-
-    # Modification ici
-    count_normalized_series = (
-        grouped.groupby("surf")["count"]
-        .apply(lambda x: x / x.sum())
-        .reset_index(level=0, drop=True)
-    )
-    grouped["count_normalized"] = count_normalized_series
+    grouped = grouped[~grouped["surf"].isin(["Other", "Not specified"])]
+    grouped = proportions(grouped, ["surf", "grav"], by=["surf"])
 
     fig = px.histogram(
         grouped,
@@ -111,22 +72,12 @@ def create_normalized_histogram(df):
     return fig
 
 
-def create_vma_fig(df):
-    df["grav"] = df["grav"].map(grav_mapping)
-    grouped = (
-        df[df["vma"] < 130].groupby(["vma", "grav"]).size().reset_index(name="count")
-    )
-
-    # Modification ici
-    count_normalized_series = (
-        grouped.groupby("vma")["count"]
-        .apply(lambda x: x / x.sum())
-        .reset_index(level=0, drop=True)
-    )
-    grouped["count_normalized"] = count_normalized_series
+def create_vma_fig(grouped):
+    # grouped : comptes par 'vma' (< 130) et 'grav' issus du cube
+    grouped = proportions(grouped, ["vma", "grav"], by=["vma"])
 
     fig = go.Figure()
-    for grav in grouped["grav"].unique():
+    for grav in grouped["grav"].unique().dropna():
         subset = grouped[grouped["grav"] == grav]
         fig.add_trace(
             go.Scatter(
@@ -147,30 +98,17 @@ def create_vma_fig(df):
     return fig
 
 
-def create_lum_pie_chart(df):
-    df["lum"] = df["lum"].map(lum_mapping)
-    lum_counts = df["lum"].value_counts().reset_index()
-    lum_counts.columns = ["lum", "count"]
+def create_lum_pie_chart(lum_counts):
+    lum_counts = lum_counts.dropna().sort_values("count", ascending=False)
     fig = px.pie(lum_counts, names="lum", values="count")
     fig.update_traces(textinfo="percent")
     fig.update_layout(width=400, height=400)
     return fig
 
 
-def create_lum_histogram(df):
-    df["lum"] = df["lum"].map(lum_mapping)
-    df["grav"] = df["grav"].map(grav_mapping)
-
-    # Grouper par 'lum' et 'grav' et calculer la taille de chaque groupe
-    grouped = df.groupby(["lum", "grav"]).size().reset_index(name="count")
-
+def create_lum_histogram(grouped):
     # Normaliser le comptage pour chaque condition d'éclairage (lum)
-    count_normalized_series = (
-        grouped.groupby("lum")["count"]
-        .apply(lambda x: x / x.sum())
-        .reset_index(level=0, drop=True)
-    )
-    grouped["count_normalized"] = count_normalized_series
+    grouped = proportions(grouped, ["lum", "grav"], by=["lum"])
 
     fig = px.histogram(
         grouped,
@@ -193,12 +131,18 @@ def display_road():
     selected_year = st.sidebar.slider(
         "Select a year", min_value=2019, max_value=2021, value=2021, step=1
     )
-    carac, locations, users, _ = load_data(selected_year)
-    df = users.merge(locations, on="Num_Acc")
-    df = df.merge(carac, on="Num_Acc")
-    df1 = df.copy()
-    df2 = df.copy()
-    df3 = df.copy()
+    active_filters = sidebar_filters(selected_year)
+
+    # Comptes lus dans les petits cubes précalculés de l'année (filtres appliqués)
+    def counts(dimensions, **conditions):
+        return query(
+            selected_year, dimensions, filters=active_filters, decode=True, **conditions
+        )
+
+    # Figures mises en cache : reconstruites seulement si l'année ou les filtres changent
+    def key(chart, **options):
+        return figure_key("roads", chart, selected_year, active_filters, **options)
+
     alignement(5)
     st.markdown("## Number of accidents by road surface condition")
     alignement(4)
@@ -209,8 +153,10 @@ def display_road():
         st.markdown(
             "### Accident distribution by road condition"
         )  # Title for the fig chart
-        fig = create_fig(df1)
-        st.plotly_chart(fig)
+        plotly_chart(
+            key("surf_grav", normalized_view=True),
+            lambda: create_fig(counts(["surf", "grav"])),
+        )
     else:
         col1, col2 = st.columns(2)  # Create two columns
 
@@ -220,14 +166,20 @@ def display_road():
             col1.write("\n")
 
         # Title for the pie chart
-        pie_chart = create_pie_chart(df1)
-        col1.plotly_chart(pie_chart)  # Display pie chart in the first column
+        plotly_chart(
+            key("surf", normalized_view=False),
+            lambda: create_pie_chart(counts(["surf"])),
+            col1,
+        )  # Display pie chart in the first column
 
         col2.markdown(
             "### Normalized accident distribution by road condition"
         )  # Title for the histogram chart
-        normalized_hist = create_normalized_histogram(df3)
-        col2.plotly_chart(normalized_hist)  # Display histogram in the second column
+        plotly_chart(
+            key("surf_grav_normalized", normalized_view=False),
+            lambda: create_normalized_histogram(counts(["surf", "grav"])),
+            col2,
+        )  # Display histogram in the second column
 
     alignement(4)
 
@@ -237,8 +189,12 @@ def display_road():
     st.markdown(
         "### Distribution of Accidents by Vehicle Maximum Authorized Speed (VMA)"
     )  # Title for the VMA chart
-    vma_fig = create_vma_fig(df2)
-    st.plotly_chart(vma_fig)
+    plotly_chart(
+        key("vma_grav"),
+        lambda: create_vma_fig(
+            counts(["vma", "grav"], where={"vma": lambda vma: vma < 130})
+        ),
+    )
 
     alignement(4)
     st.markdown("## Distribution of accidents by lighting conditions")
@@ -248,16 +204,19 @@ def display_road():
     # Pie Chart pour la colonne lum
 
     col1.markdown("### pie chart of accidents by lighting conditions")
-    df4 = df.copy()
-    lum_pie_chart = create_lum_pie_chart(df4)
-    col1.plotly_chart(lum_pie_chart)
+    plotly_chart(
+        key("lum"),
+        lambda: create_lum_pie_chart(counts(["lum"])),
+        col1,
+    )
 
     # Histogramme pour grav en fonction de lum
     col2.markdown("### Sevrity of accident severity by lighting Conditions")
-
-    df5 = df.copy()
-    lum_hist = create_lum_histogram(df5)
-    col2.plotly_chart(lum_hist)
+    plotly_chart(
+        key("lum_grav"),
+        lambda: create_lum_histogram(counts(["lum", "grav"])),
+        col2,
+    )
     alignement(5)
     st.markdown(
         """
@@ -279,3 +238,5 @@ def display_road():
 
 
 display_road()
+
+finish_run()
@@ -4,35 +4,27 @@
 
 import plotly.express as px
 import streamlit as st
-from utils import load_data, alignement
+from utils import alignement
+from cube import query
+from crosstab import proportions
+from filters import sidebar_filters
+from figures import figure_key, plotly_chart
+from perf import finish_run, start_run
 
 st.set_page_config(layout="wide", page_icon="🚗", page_title="Users")
+start_run("users")
 
-journey_mapping = {
-    1: "Home – Work",
-    2: "Home – School",
-    3: "Shopping",
-    4: "Professional",
-    5: "Drive",
-    9: "Other",
-}
-injury_mapping = {
-    1: "Unharmed",
-    2: "Killed",
-    3: "Hospitalized injury",
-    4: "Slight injury",
-}
-
-
-def create_fig(df):
-    # Apply the mapping to the DataFrame
-    df["trajet"] = df["trajet"].map(journey_mapping)
-    df["grav"] = df["grav"].map(injury_mapping)
+
+def create_fig(grouped):
+    # grouped : comptes par 'trajet' et 'grav' issus du cube, déjà décodés
+    grouped = grouped.dropna().sort_values(["trajet", "grav"])
 
     # Creation of the histogram
     fig = px.histogram(
-        df,
+        grouped,
         x="trajet",
+        y="count",
+        histfunc="sum",
         color="grav",
         labels={
             "trajet": "Reason for Journey",
@@ -48,16 +40,9 @@ def create_fig(df):
     return fig
 
 
-def create_fig_sex(df):
-    # Groupement des données par sexe et comptage du nombre d'occurrences
-
-    # drop line where value = -1
-    df_copy = df[df["sexe"] != -1]
-    sex_counts = df_copy["sexe"].value_counts().reset_index()
-
-    # Mapping des codes de sexe à des chaînes de caractères pour une meilleure lisibilité
-    sex_mapping = {1: "Male", 2: "Female"}
-    sex_counts["sexe"] = sex_counts["sexe"].map(sex_mapping)
+def create_fig_sex(sex_counts):
+    # sex_counts : nombre d'occurrences par sexe (sans les -1) issu du cube
+    sex_counts = sex_counts.sort_values("count", ascending=False)
 
     fig = px.pie(
         sex_counts,
@@ -82,29 +67,16 @@ def create_fig_sex(df):
     return fig
 
 
-def create_normalized_accident_chart(df):
-    # Suppression des lignes où le sexe ou la gravité est null
-    df = df[df["sexe"].notnull() & df["grav"].notnull()]
-
-    # Mapping des codes de sexe et de gravité
-    sex_mapping = {1: "Male", 2: "Female"}
-    grav_mapping = {
-        1: "Unharmed",
-        2: "Killed",
-        3: "Hospitalized injury",
-        4: "Slight injury",
-    }
+def create_normalized_accident_chart(grouped):
+    # grouped : comptes par 'sexe' et 'grav' issus du cube, déjà décodés
 
-    df["sexe"] = df["sexe"].map(sex_mapping)
-    df["grav"] = df["grav"].map(grav_mapping)
-
-    # Calcul des totaux pour chaque combinaison de sexe et de gravité
-    grouped = df.groupby(["sexe", "grav"]).size().reset_index(name="count")
-
-    total_entries = len(df)
-    female_count = (df["sexe"] == "Female").sum()
+    total_entries = grouped["count"].sum()
+    female_count = grouped.loc[grouped["sexe"] == "Female", "count"].sum()
     female_percentage = female_count / total_entries
 
+    # Combinaisons de sexe et de gravité connues
+    grouped = grouped.dropna().sort_values(["sexe", "grav"])
+
     grouped.loc[grouped["sexe"] == "Male", "count_normalized"] = grouped["count"] / (
         1 - female_percentage
     )
@@ -136,31 +108,17 @@ def create_normalized_accident_chart(df):
 # Utilisation de la fonction
 
 
-def create_journey_reason_pie_chart(df):
-    # Apply the mapping
-    df["trajet"] = df["trajet"].map(journey_mapping)
+def create_journey_reason_pie_chart(journey_counts):
+    journey_counts = journey_counts.dropna().sort_values("count", ascending=False)
 
-    journey_counts = df["trajet"].value_counts().reset_index()
-    journey_counts.columns = ["trajet", "count"]
     fig = px.pie(journey_counts, names="trajet", values="count")
     fig.update_traces(textinfo="percent")
     fig.update_layout(width=400, height=400)
     return fig
 
 
-def create_normalized_journey_reason_histogram(df):
-    df["grav"] = df["grav"].map(injury_mapping)
-    df["trajet"] = df["trajet"].map(journey_mapping)  # Apply the mapping here
-
-    grouped = df.groupby(["trajet", "grav"]).size().reset_index(name="count")
-
-    # Corrigez l'erreur en réinitialisant l'index
-    count_normalized = (
-        grouped.groupby("trajet")["count"]
-        .apply(lambda x: x / x.sum())
-        .reset_index(drop=True)
-    )
-    grouped["count_normalized"] = count_normalized
+def create_normalized_journey_reason_histogram(grouped):
+    grouped = proportions(grouped, ["trajet", "grav"], by=["trajet"])
 
     fig = px.histogram(
         grouped,
@@ -186,15 +144,19 @@ def display_users():
     selected_year = st.sidebar.slider(
         "Select a year", min_value=2019, max_value=2021, value=2021, step=1
     )
-    _, locations, users, _ = load_data(selected_year)
+    active_filters = sidebar_filters(selected_year)
+
+    # Comptes lus dans les petits cubes précalculés de l'année (filtres appliqués)
+    def counts(dimensions, **conditions):
+        return query(
+            selected_year, dimensions, filters=active_filters, decode=True, **conditions
+        )
+
+    # Figures mises en cache : reconstruites seulement si l'année ou les filtres changent
+    def key(chart, **options):
+        return figure_key("users", chart, selected_year, active_filters, **options)
+
     alignement(3)
-    # Merge DataFrames on the 'Num_Acc' column
-    df = users.merge(locations, on="Num_Acc")
-    df1 = df.copy()
-    df2 = df.copy()
-    df3 = df.copy()
-    df4 = df.copy()
-    df5 = df.copy()
 
     st.markdown("## Accident Distribution by Gender")
     alignement(4)
@@ -203,15 +165,17 @@ def display_users():
     with col1:  # Use the first column
         st.markdown("### Percentage of Men and Women in the Dataset")
 
-        fig_sx = create_fig_sex(df1)
-        st.plotly_chart(fig_sx)
+        plotly_chart(
+            key("sexe"),
+            lambda: create_fig_sex(counts(["sexe"], exclude={"sexe": -1})),
+        )
 
     with col2:  # Use the second column
         st.markdown("### Normalized Distribution of Accidents by Severity")
-        fig_sx2 = create_normalized_accident_chart(df2)
-        st.plotly_chart(fig_sx2)
-
-    fig = create_fig(df3)
+        plotly_chart(
+            key("sexe_grav"),
+            lambda: create_normalized_accident_chart(counts(["sexe", "grav"])),
+        )
 
     st.markdown("## Distribution of Journey Reasons with Injury Severity")
     alignement(4)
@@ -223,18 +187,28 @@ def display_users():
         for _ in range(5):  # Adjust the alignment if needed
             col1.write("\n")
 
-        pie_chart = create_journey_reason_pie_chart(df4)
+        plotly_chart(
+            key("trajet", normalized_view=True),
+            lambda: create_journey_reason_pie_chart(counts(["trajet"])),
+            col1,
+        )  # Display pie chart in the first column
 
-        col1.plotly_chart(pie_chart)  # Display pie chart in the first column
-
-        normalized_hist = create_normalized_journey_reason_histogram(df5)
         col2.markdown(
             "### Normalized Distribution by Injury Severity"
         )  # Title for the histogram chart
-        col2.plotly_chart(normalized_hist)  # Display histogram in the second column
+        plotly_chart(
+            key("trajet_grav_normalized", normalized_view=True),
+            lambda: create_normalized_journey_reason_histogram(
+                counts(["trajet", "grav"])
+            ),
+            col2,
+        )  # Display histogram in the second column
     else:
         st.markdown("### Distribution of accident by Journey Reason")
-        st.plotly_chart(fig)
+        plotly_chart(
+            key("trajet_grav", normalized_view=False),
+            lambda: create_fig(counts(["trajet", "grav"])),
+        )
 
     st.markdown(
         """
@@ -255,3 +229,5 @@ def display_users():
 
 
 display_users()
+
+finish_run()
@@ -0,0 +1,357 @@
+# Mesures par exécution de page : temps écoulé, temps CPU et pic tracemalloc de
+# chaque étape (lecture, nettoyage, jointures, agrégats, figures). Chaque page
+# appelle start_run() après st.set_page_config et finish_run() à la fin ; entre
+# les deux, les fonctions décorées par @timed et les blocs "with stage(...)"
+# sont enregistrés. Hors d'une exécution de page (benchmarks, CLI), ils ne
+# coûtent qu'un test. Les mesures s'affichent dans un panneau optionnel de la
+# barre latérale et sont ajoutées à un journal JSON lines.
+# tracemalloc est global au processus (reset_peak remet à zéro le pic de tous les
+# threads) : une seule exécution à la fois mesure la mémoire, les exécutions
+# concurrentes des autres sessions s'en passent. Ses pics restent ceux du
+# processus et comptent aussi les allocations faites pendant ce temps ailleurs.
+# Profilage à la demande, si l'exploitant l'a activé (ACCIDENTS_PROFILE_ENABLED=1) :
+# ?profile=1 dans l'URL d'une page profile l'exécution suivante avec cProfile
+# (?profile=memory ajoute tracemalloc) ; les statistiques sont écrites dans
+# PROFILE_DIR et leur résumé est téléchargeable. Sinon le paramètre est ignoré.
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import streamlit as st
+
+# Journal des exécutions (une ligne JSON par exécution) ; "" pour le désactiver
+PERF_LOG = os.environ.get("ACCIDENTS_PERF_LOG", "assets/.perf/runs.jsonl")
+PERF_LOG_MAX_MB = int(os.environ.get("ACCIDENTS_PERF_LOG_MAX_MB", "16"))
+
+# tracemalloc demandé pour toutes les exécutions (sinon seulement à la demande du
+# panneau), toujours une seule exécution mesurée à la fois
+TRACEMALLOC = os.environ.get("ACCIDENTS_PERF_TRACEMALLOC", "0") == "1"
+
+PANEL_KEY = "perf_panel"
+TRACEMALLOC_KEY = "perf_tracemalloc"
+
+# Profils à la demande (.prof pour pstats/snakeviz et résumé .txt) : désactivés
+# par défaut, tout visiteur pouvant ajouter le paramètre à l'URL
+PROFILE_ENABLED = os.environ.get("ACCIDENTS_PROFILE_ENABLED", "0") == "1"
+PROFILE_DIR = os.environ.get("ACCIDENTS_PROFILE_DIR", "assets/.perf/profiles")
+PROFILE_KEEP = 50  # derniers profils conservés
+PROFILE_PARAM = "profile"
+PROFILE_KEY = "perf_profile"
+PROFILE_TOP = 30
+
+# Exécution en cours par thread de script (identifiant du thread -> mesures)
+_runs = {}
+_runs_lock = threading.Lock()
+_tracing_owner = None  # thread de l'exécution qui mesure la mémoire
+_logger = None
+
+
+def _current():
+    return _runs.get(threading.get_ident())
+
+
+@contextmanager
+def stage(name):
+    run = _current()
+    if run is None:
+        yield
+        return
+    record = {"stage": name, "depth": len(run["stack"])}
+    run["stages"].append(record)
+    tracing = run["tracemalloc"]
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if run["stack"]:
+            # Le pic global est remis à zéro : on le reporte d'abord sur le parent
+            parent = run["stack"][-1]
+            parent["peak"] = max(parent["peak"], peak)
+        tracemalloc.reset_peak()
+        frame = {"start": current, "peak": current}
+    else:
+        frame = {}
+    run["stack"].append(frame)
+    start, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        # Temps CPU du thread de la page : le travail des threads auxiliaires
+        # (lectures concurrentes de load_years) n'y figure pas
+        record["wall_s"] = time.perf_counter() - start
+        record["cpu_s"] = time.thread_time() - cpu
+        run["stack"].pop()
+        if tracing:
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            record["peak_mb"] = (peak - frame["start"]) / 1024 / 1024
+            if run["stack"]:
+                parent = run["stack"][-1]
+                parent["peak"] = max(parent["peak"], peak)
+
+
+def timed(function):
+    # Étape nommée d'après la fonction ("utils.load_data")
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _current() is None:
+            return function(*args, **kwargs)
+        with stage(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def _end(ident):
+    # tracemalloc reste actif tant que l'exécution mesurée est en cours
+    global _tracing_owner
+    run = _runs.pop(ident, None)
+    if run is not None and run["profiler"] is not None:
+        run["profiler"].disable()
+    if run is not None and run["tracemalloc"]:
+        _tracing_owner = None
+        if not TRACEMALLOC:
+            tracemalloc.stop()
+    return run
+
+
+def _query_param(name):
+    # st.query_params n'existe qu'à partir de streamlit 1.30
+    if hasattr(st, "query_params"):
+        return st.query_params.get(name)
+    values = st.experimental_get_query_params().get(name)
+    return values[-1] if values else None
+
+
+def _clear_query_param(name):
+    # Le profilage ne vaut que pour une exécution : le paramètre est retiré de l'URL
+    if hasattr(st, "query_params"):
+        del st.query_params[name]
+        return
+    params = st.experimental_get_query_params()
+    params.pop(name, None)
+    st.experimental_set_query_params(**params)
+
+
+def _profile_mode():
+    # None (pas de profilage), "cpu" ou "memory" (cProfile et tracemalloc)
+    if not PROFILE_ENABLED:
+        return None
+    value = (_query_param(PROFILE_PARAM) or "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    return "memory" if value in ("memory", "mem", "2") else "cpu"
+
+
+def start_run(page):
+    global _tracing_owner
+    panel = bool(st.session_state.get(PANEL_KEY, False))
+    profile = _profile_mode()
+    wanted = (
+        TRACEMALLOC
+        or profile == "memory"
+        or (panel and st.session_state.get(TRACEMALLOC_KEY, False))
+    )
+    ident = threading.get_ident()
+    with _runs_lock:
+        # Exécutions interrompues (exception, rerun) : thread terminé ou réutilisé
+        alive = {thread.ident for thread in threading.enumerate()}
+        for stale in [key for key in _runs if key not in alive or key == ident]:
+            _end(stale)
+        # Mémoire déjà mesurée pour une autre session : cette exécution s'en passe
+        tracing = wanted and _tracing_owner is None
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _tracing_owner = ident
+        _runs[ident] = {
+            "page": page,
+            "tracemalloc": tracing,
+            "tracemalloc_busy": wanted and not tracing,
+            "stages": [],
+            "stack": [],
+            "profile": profile,
+            "profiler": None,
+            "start": time.perf_counter(),
+            "cpu": time.thread_time(),
+        }
+    if profile is not None:
+        _clear_query_param(PROFILE_PARAM)
+        # cProfile ne suit que le thread du script (sys.setprofile par thread)
+        profiler = cProfile.Profile()
+        _runs[ident]["profiler"] = profiler
+        profiler.enable()
+
+
+def _log():
+    global _logger
+    if _logger is None:
+        os.makedirs(os.path.dirname(PERF_LOG) or ".", exist_ok=True)
+        handler = RotatingFileHandler(
+            PERF_LOG, maxBytes=PERF_LOG_MAX_MB * 1024 * 1024, backupCount=3
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _logger = logging.getLogger("accidents.perf")
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        _logger.addHandler(handler)
+    return _logger
+
+
+def _profile_summary(run, stats, snapshot, wall):
+    stream = io.StringIO()
+    stream.write(f"page {run['page']}, {wall * 1000:.0f} ms\n")
+    stats.stream = stream
+    for order in ("cumulative", "tottime"):
+        stream.write(f"\n=== top {PROFILE_TOP} functions by {order} time ===\n")
+        stats.sort_stats(order).print_stats(PROFILE_TOP)
+    if snapshot is not None:
+        stream.write(f"\n=== top {PROFILE_TOP} allocation sites (live at end) ===\n")
+        for statistic in snapshot.statistics("lineno")[:PROFILE_TOP]:
+            stream.write(f"{statistic}\n")
+    return stream.getvalue()
+
+
+def _prune_profiles():
+    paths = [
+        os.path.join(PROFILE_DIR, name)
+        for name in os.listdir(PROFILE_DIR)
+        if name.endswith((".prof", ".txt"))
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[2 * PROFILE_KEEP :]:
+        os.remove(path)
+
+
+def _save_profile(run, wall):
+    # Appelé avant _end : le profileur et tracemalloc sont encore actifs
+    run["profiler"].disable()
+    memory = run["profile"] == "memory" and run["tracemalloc"]
+    snapshot = tracemalloc.take_snapshot() if memory else None
+    stats = pstats.Stats(run["profiler"])
+    name = f"{run['page']}-{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident()}"
+    summary = _profile_summary(run, stats, snapshot, wall)
+    path = None
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}.prof")
+        stats.dump_stats(path)
+        with open(os.path.join(PROFILE_DIR, f"{name}.txt"), "w") as file:
+            file.write(summary)
+        _prune_profiles()
+    except OSError:
+        path = None  # dossier en lecture seule : résumé téléchargeable seulement
+    run["profiler"] = None
+    return {"page": run["page"], "name": name, "summary": summary, "path": path}
+
+
+def finish_run():
+    ident = threading.get_ident()
+    run = _runs.get(ident)
+    profile = None
+    if run is not None and run["profiler"] is not None:
+        profile = _save_profile(run, time.perf_counter() - run["start"])
+        st.session_state[PROFILE_KEY] = profile
+    with _runs_lock:
+        run = _end(ident)
+    if run is None:
+        return None
+    summary = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "page": run["page"],
+        "wall_s": time.perf_counter() - run["start"],
+        "cpu_s": time.thread_time() - run["cpu"],
+        "tracemalloc": run["tracemalloc"],
+        "tracemalloc_busy": run["tracemalloc_busy"],
+        "stages": [record for record in run["stages"] if "wall_s" in record],
+    }
+    if PERF_LOG:
+        try:
+            _log().info(json.dumps(summary))
+        except OSError:
+            pass  # dossier en lecture seule : mesures affichées seulement
+    performance_panel(summary)
+    profile_panel(run["page"])
+    return summary
+
+
+def _stage_rows(stages):
+    # Une ligne par étape et profondeur, dans l'ordre du premier appel
+    rows = {}
+    for record in stages:
+        key = (record["depth"], record["stage"])
+        row = rows.setdefault(
+            key,
+            {
+                "stage": "  " * record["depth"] + record["stage"],
+                "calls": 0,
+                "wall ms": 0.0,
+                "cpu ms": 0.0,
+                "peak MB": None,
+            },
+        )
+        row["calls"] += 1
+        row["wall ms"] += record["wall_s"] * 1000
+        row["cpu ms"] += record["cpu_s"] * 1000
+        if "peak_mb" in record:
+            row["peak MB"] = max(row["peak MB"] or 0.0, record["peak_mb"])
+    return list(rows.values())
+
+
+def performance_panel(summary):
+    # Interrupteur toujours visible en bas de la barre latérale ; le détail
+    # n'est affiché que s'il est activé
+    if not st.sidebar.toggle("⏱️ Performance", key=PANEL_KEY):
+        return
+    with st.sidebar.expander("Performance of this run", expanded=True):
+        st.checkbox(
+            "Trace memory allocations (slower)",
+            key=TRACEMALLOC_KEY,
+            help="Applies from the next run.",
+        )
+        st.metric("Run time", f"{summary['wall_s'] * 1000:.0f} ms", help="Wall time")
+        st.caption(f"CPU time {summary['cpu_s'] * 1000:.0f} ms")
+        if summary["tracemalloc"]:
+            st.caption(
+                "Peak MB: process-wide peaks, including allocations made by "
+                "other sessions during the stage."
+            )
+        elif summary["tracemalloc_busy"]:
+            st.caption("Memory not traced: another session is being traced.")
+        st.dataframe(_stage_rows(summary["stages"]), hide_index=True)
+
+
+def profile_panel(page):
+    # Dernier profil de la session, sur la page profilée ; conservé dans la session
+    # car le clic sur un bouton de téléchargement relance le script
+    profile = st.session_state.get(PROFILE_KEY)
+    if profile is None or profile["page"] != page:
+        return
+    with st.sidebar.expander("Profile", expanded=True):
+        if profile["path"] is not None:
+            st.caption(f"Saved to {profile['path']}")
+        st.download_button(
+            "Download summary",
+            profile["summary"],
+            file_name=f"{profile['name']}.txt",
+            mime="text/plain",
+        )
+        if profile["path"] is not None and os.path.exists(profile["path"]):
+            with open(profile["path"], "rb") as file:
+                st.download_button(
+                    "Download cProfile stats",
+                    file.read(),
+                    file_name=f"{profile['name']}.prof",
+                    help="Open with pstats or snakeviz",
+                )
+        if st.button("Dismiss", key=f"{PROFILE_KEY}_dismiss"):
+            del st.session_state[PROFILE_KEY]
+            st.rerun()
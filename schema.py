@@ -0,0 +1,163 @@
+# Types compacts des colonnes des quatre tables BAAC (formats avant et après 2019).
+# Les codes entiers sont lus dans les types par défaut de read_csv (int64, ou
+# float64 si une case est vide) : imposer Int8/Int16 à la lecture la rend 3 à 7
+# fois plus lente et laisse déborder les valeurs (300 lu en Int8 devient 44).
+# finalize les ramène ensuite au type compact après avoir vérifié leurs bornes,
+# en type nullable seulement quand la colonne a des valeurs manquantes.
+import numpy as np
+import pandas as pd
+
+# Incrémenté à chaque modification : invalide les copies Parquet existantes
+SCHEMA_VERSION = 3
+
+# Types compacts appliqués après lecture (bornes vérifiées)
+CODE_DTYPES = ("int8", "int16", "Int8", "Int16")
+
+SCHEMA = {
+    "caracteristiques": {
+        "Num_Acc": "int64",
+        "jour": "Int8",
+        "mois": "Int8",
+        "an": "Int16",
+        "hrmn": "category",
+        "lum": "Int8",
+        "dep": "int16",
+        "com": "category",
+        "agg": "Int8",
+        "int": "Int8",
+        "atm": "Int8",
+        "col": "Int8",
+        "gps": "category",
+        # Colonnes produites par clean_characteristics
+        "lat": "float32",
+        "long": "float32",
+        "hour": "int8",
+        "minute": "int8",
+    },
+    "lieux": {
+        "Num_Acc": "int64",
+        "catr": "Int8",
+        "voie": "category",
+        "v1": "category",
+        "v2": "category",
+        "circ": "Int8",
+        "nbv": "category",  # contient "#ERREUR" dans certains millésimes
+        "vosp": "Int8",
+        "prof": "Int8",
+        "pr": "category",
+        "pr1": "category",
+        "plan": "Int8",
+        "lartpc": "category",
+        "larrout": "category",
+        "surf": "Int8",
+        "infra": "Int8",
+        "situ": "Int8",
+        "env1": "Int8",
+        "vma": "Int16",
+    },
+    "usagers": {
+        "Num_Acc": "int64",
+        "id_vehicule": "category",
+        "num_veh": "category",
+        "place": "Int8",
+        "catu": "Int8",
+        "grav": "Int8",
+        "sexe": "Int8",
+        "an_nais": "Int16",
+        "trajet": "Int8",
+        "secu": "Int8",
+        "secu1": "Int8",
+        "secu2": "Int8",
+        "secu3": "Int8",
+        "locp": "Int8",
+        "actp": "category",
+        "etatp": "Int8",
+    },
+    "vehicules": {
+        "Num_Acc": "int64",
+        "id_vehicule": "category",
+        "num_veh": "category",
+        "senc": "Int8",
+        "catv": "Int8",
+        "occutc": "Int16",
+        "obs": "Int8",
+        "obsm": "Int8",
+        "choc": "Int8",
+        "manv": "Int8",
+        "motor": "Int8",
+    },
+}
+
+# Types de lecture des colonnes que clean_characteristics convertit ensuite
+# (None : laisser read_csv les lire en texte)
+PARSE_OVERRIDES = {
+    "caracteristiques": {
+        "dep": "category",
+        "lat": None,
+        "long": None,
+        "hour": None,
+        "minute": None,
+    }
+}
+
+
+def parse_dtypes(table):
+    # Types passés à read_csv ; les colonnes absentes du fichier sont ignorées et
+    # les codes entiers gardent le type par défaut
+    dtypes = {**SCHEMA[table], **PARSE_OVERRIDES.get(table, {})}
+    return {
+        column: dtype
+        for column, dtype in dtypes.items()
+        if dtype is not None and dtype not in CODE_DTYPES
+    }
+
+
+def downcast(values, dtype, table, column):
+    # Code entier ramené au type compact ; une valeur hors bornes lève une erreur
+    # au lieu d'être tronquée
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return values  # texte inattendu dans la colonne : laissé tel quel
+    present = values.dropna()
+    if pd.api.types.is_float_dtype(values) and not (present % 1 == 0).all():
+        return values  # décimales : ce ne sont pas des codes
+    numpy_dtype = np.dtype(dtype.lower())
+    if len(present):
+        info = np.iinfo(numpy_dtype)
+        low, high = present.min(), present.max()
+        if low < info.min or high > info.max:
+            raise ValueError(
+                f"{table}.{column}: values between {low} and {high} "
+                f"do not fit in {numpy_dtype}"
+            )
+    if len(present) < len(values):
+        return values.astype(numpy_dtype.name.capitalize())
+    return values.astype(numpy_dtype)
+
+
+def finalize(df, table):
+    schema = SCHEMA[table]
+    overrides = PARSE_OVERRIDES.get(table, {})
+    for column in df.columns:
+        dtype = schema.get(column)
+        if dtype is None:
+            continue
+        if column in overrides and str(df[column].dtype) != dtype:
+            try:
+                df[column] = df[column].astype(dtype)
+            except (ValueError, TypeError):
+                pass  # colonne pas encore nettoyée (ancien format) : on la laisse
+        elif dtype == "category" and not isinstance(
+            df[column].dtype, pd.CategoricalDtype
+        ):
+            # Colonne entièrement vide : Parquet la relit en objet
+            df[column] = df[column].astype(dtype)
+        elif dtype in CODE_DTYPES:
+            df[column] = downcast(df[column], dtype, table, column)
+        elif pd.api.types.is_extension_array_dtype(df[column].dtype):
+            if pd.api.types.is_integer_dtype(df[column]) and not df[column].hasnans:
+                df[column] = df[column].astype(df[column].dtype.numpy_dtype)
+    return df
+
+
+def memory_usage(df):
+    return int(df.memory_usage(deep=True).sum())
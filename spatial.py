@@ -0,0 +1,110 @@
+# Index spatial en grille régulière sur les coordonnées nettoyées des accidents.
+# Les points sont triés par cellule : une requête rectangle ou rayon ne lit que
+# les cellules qu'elle recouvre (un searchsorted par rangée de cellules).
+import functools
+
+import numpy as np
+
+from utils import load_data, source_signature, valid_coordinates
+
+# Taille d'une cellule en degrés (environ 1 km en latitude)
+CELL_DEGREES = 0.01
+
+EARTH_RADIUS_M = 6_371_000
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def build_grid_index(lat, lon, cell=CELL_DEGREES):
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    ids = np.flatnonzero(valid_coordinates(lat, lon))
+    if len(ids):
+        origin = (lat[ids].min(), lon[ids].min())
+        rows = ((lat[ids] - origin[0]) // cell).astype(np.int64)
+        cols = ((lon[ids] - origin[1]) // cell).astype(np.int64)
+        shape = (int(rows.max()) + 1, int(cols.max()) + 1)
+    else:
+        origin, rows, cols, shape = (0.0, 0.0), ids, ids, (0, 0)
+    cells = rows * shape[1] + cols
+    order = np.argsort(cells, kind="stable")
+    return {
+        "lat": lat,
+        "lon": lon,
+        "cell": cell,
+        "origin": origin,
+        "shape": shape,
+        "cells": cells[order],
+        "ids": ids[order],
+    }
+
+
+def _cell_range(index, low, high, axis):
+    first = int(np.floor((low - index["origin"][axis]) / index["cell"]))
+    last = int(np.floor((high - index["origin"][axis]) / index["cell"]))
+    return max(first, 0), min(last, index["shape"][axis] - 1)
+
+
+def bbox_query(index, south, west, north, east):
+    # Positions (lignes des caractéristiques) des accidents dans le rectangle
+    row_first, row_last = _cell_range(index, south, north, 0)
+    col_first, col_last = _cell_range(index, west, east, 1)
+    if row_first > row_last or col_first > col_last:
+        return np.empty(0, dtype=np.int64)
+
+    width = index["shape"][1]
+    rows = np.arange(row_first, row_last + 1)
+    starts = np.searchsorted(index["cells"], rows * width + col_first, side="left")
+    stops = np.searchsorted(index["cells"], rows * width + col_last, side="right")
+    candidates = np.concatenate(
+        [index["ids"][start:stop] for start, stop in zip(starts, stops)]
+    )
+    lat, lon = index["lat"][candidates], index["lon"][candidates]
+    inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+    return np.sort(candidates[inside])
+
+
+def _within(index, lat, lon, radius_m):
+    # Rectangle englobant le cercle, puis distance exacte (haversine)
+    dlat = np.degrees(radius_m / EARTH_RADIUS_M)
+    dlon = dlat / max(np.cos(np.radians(lat)), 1e-6)
+    candidates = bbox_query(index, lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+    distances = haversine_m(
+        lat, lon, index["lat"][candidates], index["lon"][candidates]
+    )
+    inside = distances <= radius_m
+    return candidates[inside], distances[inside]
+
+
+def radius_query(index, lat, lon, radius_m):
+    return _within(index, lat, lon, radius_m)[0]
+
+
+def nearest(index, lat, lon, radius_m, limit=None):
+    # Accidents à moins de radius_m du point, du plus proche au plus lointain :
+    # (positions, distances en mètres), au plus limit résultats
+    rows, distances = _within(index, lat, lon, radius_m)
+    order = np.argsort(distances, kind="stable")[:limit]
+    return rows[order], distances[order]
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_index(year, signature):
+    characteristics = load_data(year)[0]
+    index = build_grid_index(characteristics["lat"], characteristics["long"])
+    for name in ("lat", "lon", "cells", "ids"):
+        index[name].flags.writeable = False
+    return index
+
+
+def year_grid_index(year):
+    # Index construit une fois par année ; ses positions désignent les lignes
+    # des caractéristiques renvoyées par load_data(year)
+    return _cached_index(year, source_signature(year))
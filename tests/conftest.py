@@ -0,0 +1,48 @@
+# Les modules de l'application sont à la racine du dépôt et lisent leurs données
+# dans assets/ relativement au dossier courant : les tests tournent dans un dossier
+# temporaire rempli par benchmarks.synthetic (un millésime ancien, un récent).
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import synthetic  # noqa: E402
+
+SYNTHETIC_YEARS = (2017, 2021)
+SYNTHETIC_ACCIDENTS = 2_000
+
+
+@pytest.fixture(scope="session")
+def synthetic_dir(tmp_path_factory):
+    output = tmp_path_factory.mktemp("synthetic")
+    # Petits lots : plusieurs écritures par table, comme pour un gros millésime
+    for year in SYNTHETIC_YEARS:
+        synthetic.generate_year(year, SYNTHETIC_ACCIDENTS, str(output), chunk=700)
+    return output
+
+
+@pytest.fixture
+def synthetic_assets(synthetic_dir, monkeypatch):
+    import utils
+
+    monkeypatch.chdir(synthetic_dir)
+    utils.clear_cache()
+    yield synthetic_dir
+    utils.clear_cache()
+
+
+def real_years():
+    # Millésimes réels complets présents dans assets/ (aucun n'est versionné)
+    import utils
+
+    years = []
+    for name in sorted(os.listdir(os.path.join(ROOT, "assets"))):
+        paths = [
+            os.path.join(ROOT, utils.source_path(name, table)) for table in utils.TABLES
+        ]
+        if name.isdigit() and all(os.path.exists(path) for path in paths):
+            years.append(int(name))
+    return years
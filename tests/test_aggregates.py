@@ -0,0 +1,97 @@
+# Résumés annuels : années recalculées ensemble par load_years ou en flux par
+# morceaux, même résultat que le calcul année par année sur read_table.
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import aggregates
+import utils
+
+YEARS = (2017, 2021)
+
+
+def per_year_summary(year):
+    return aggregates.compute_summary(
+        utils.read_table(year, "caracteristiques"), utils.read_table(year, "usagers")
+    )
+
+
+# Colonnes texte relues depuis Parquet : None au lieu de NaN, sans incidence
+@pytest.mark.filterwarnings("ignore:Mismatched null-like values")
+def test_load_years_concatenates_each_year(synthetic_assets):
+    tables = utils.load_years(YEARS, aggregates.SOURCE_TABLES)
+    for table in aggregates.SOURCE_TABLES:
+        combined = tables[table]
+        assert list(pd.unique(combined["year"])) == list(YEARS)
+        for year in YEARS:
+            # Colonnes propres à un millésime : absentes (NaN) dans les autres, d'où
+            # des entiers nullables et des catégories communes après concaténation
+            expected = utils.read_table(year, table)
+            rows = aggregates._year_rows(combined, year)[expected.columns]
+            assert_frame_equal(
+                rows.reset_index(drop=True),
+                expected,
+                check_dtype=False,
+                check_categorical=False,
+            )
+
+
+def test_year_summaries_match_per_year(synthetic_assets, monkeypatch):
+    monkeypatch.setattr(aggregates, "AGGREGATES_DIR", str(synthetic_assets / "agg"))
+    summaries = aggregates.year_summaries(YEARS)
+    for year in YEARS:
+        summary = summaries[year]
+        assert summary["version"] == aggregates.AGGREGATES_VERSION
+        assert {name: summary[name] for name in per_year_summary(year)} == (
+            per_year_summary(year)
+        )
+    # Deuxième appel : résumés relus sur disque, sans recalcul
+    monkeypatch.setattr(aggregates, "load_years", None)
+    assert aggregates.year_summaries(YEARS) == summaries
+
+
+@pytest.mark.parametrize("year", YEARS)
+@pytest.mark.parametrize("memory_mb", [0.01, 1, 64])
+def test_streaming_summary_matches_in_memory(synthetic_assets, year, memory_mb):
+    # 0.01 Mo : morceaux de taille minimale, plusieurs par table
+    chunks = list(utils.iter_chunks(year, "usagers", ["Num_Acc", "grav"], memory_mb))
+    if memory_mb < 1:
+        assert len(chunks) > 1
+    assert aggregates.compute_summary_streaming(year, memory_mb) == (
+        per_year_summary(year)
+    )
+
+
+@pytest.mark.parametrize("year", YEARS)
+@pytest.mark.parametrize("table", utils.TABLES)
+def test_chunks_match_full_read(synthetic_assets, year, table):
+    chunks = list(utils.iter_chunks(year, table, memory_mb=0.01))
+    assert len(chunks) > 1
+    # Catégories propres à chaque morceau : la concaténation repasse en objet
+    combined = pd.concat(chunks, ignore_index=True)
+    assert_frame_equal(
+        combined,
+        utils.read_table(year, table, columnar=False),
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+def test_filtered_counts_use_the_summary_grain(synthetic_assets, monkeypatch):
+    monkeypatch.setattr(aggregates, "AGGREGATES_DIR", str(synthetic_assets / "agg"))
+    unfiltered = aggregates.yearly_severity_counts(YEARS)
+    # Un filtre qui n'exclut rien ne change pas les totaux
+    everything = {"grav": [1, 2, 3, 4]}
+    assert_frame_equal(aggregates.yearly_severity_counts(YEARS, everything), unfiltered)
+
+    filtered = aggregates.yearly_severity_counts(YEARS, {"hour": range(7, 10)})
+    for year in YEARS:
+        characteristics, _, users, _ = utils.load_data(year)
+        morning = characteristics["Num_Acc"][characteristics["hour"].between(7, 9)]
+        expected = (
+            users.loc[users["Num_Acc"].isin(morning), "grav"]
+            .value_counts()
+            .sort_index()
+        )
+        counts = filtered[filtered["an"] == year].set_index("grav")
+        assert counts["number_of_accidents"].to_dict() == expected.to_dict()
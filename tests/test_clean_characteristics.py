@@ -0,0 +1,94 @@
+# clean_characteristics vectorisé : sortie identique à l'implémentation d'origine
+# (str.split et float() ligne par ligne), figée ci-dessous.
+import os
+
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import utils
+from conftest import ROOT, real_years
+
+
+def original_clean_characteristics(df):
+    df["hour"] = df["hrmn"].str.split(":").str[0].astype(int)
+    df["minute"] = df["hrmn"].str.split(":").str[1].astype(int)
+    df.drop(columns=["hrmn"], inplace=True)
+
+    df["dep"] = pd.to_numeric(df["dep"], errors="coerce").fillna(0).astype(int)
+
+    def convert_latitude(latitude):
+        try:
+            latitude_str = str(latitude).replace(",", ".").replace(" ", "")
+            return float(latitude_str)
+        except ValueError:
+            return -1
+
+    df["lat"] = df["lat"].apply(convert_latitude)
+    df["long"] = df["long"].apply(convert_latitude)
+
+    return df
+
+
+def assert_same_cleaning(raw):
+    expected = original_clean_characteristics(raw.copy())
+    result = utils.clean_characteristics(raw.copy())
+    assert_frame_equal(result, expected, check_exact=True)
+
+
+def read_raw(path):
+    # Lecture du code d'origine (sans types imposés) puis lecture typée actuelle
+    yield pd.read_csv(path, sep=";")
+    yield pd.read_csv(
+        path, sep=";", dtype=utils.schema.parse_dtypes("caracteristiques")
+    )
+
+
+# clean_characteristics ne lit que le format 2019+ ; ignoré sans données réelles
+@pytest.mark.parametrize("year", [year for year in real_years() if year > 2018])
+def test_real_year(year):
+    for raw in read_raw(
+        os.path.join(ROOT, utils.source_path(year, "caracteristiques"))
+    ):
+        assert_same_cleaning(raw)
+
+
+def test_synthetic_year(synthetic_assets):
+    for raw in read_raw(utils.source_path(2021, "caracteristiques")):
+        assert len(raw) > 0
+        assert_same_cleaning(raw)
+
+
+def test_edge_cases():
+    # Corse, codes vides ou textuels, coordonnées avec virgule, espaces, "nan",
+    # "1_0" (lu par float() mais pas par to_numeric), infinis, texte, None
+    rows = [
+        ("00:00", "75", "48,8566", "2,3522"),
+        ("23:59", "2A", " 43,2 965", "5,3698"),
+        ("07:05", "2B", "", "7,26"),
+        ("12:30", "971", "nan", "NaN"),
+        ("18:00", "01", "1_0", "-inf"),
+        ("00:01", "", "inf", ""),
+        ("10:10", None, "-21,1151", "55,5364"),
+        ("21:45", "976", None, "1e3"),
+        ("06:00", "2a", "abc", None),
+        ("13:37", "5", "0,0", "0"),
+        ("08:15", "nan", "48.85", "12 345,6"),
+        ("16:40", "13", "-1", "2.35"),
+    ]
+    raw = pd.DataFrame(rows, columns=["hrmn", "dep", "lat", "long"])
+    assert_same_cleaning(raw)
+
+
+def test_numeric_columns():
+    # Colonnes déjà numériques (lecture sans guillemets)
+    rows = [("07:05", 75, 48.1, 2.3), ("17:45", 13, 43.2, 5.4)]
+    raw = pd.DataFrame(rows, columns=["hrmn", "dep", "lat", "long"])
+    assert_same_cleaning(raw)
+
+
+def test_hrmn_fallback():
+    # Heures de longueur variable ou non ASCII : chemin str.split
+    rows = [("7:5", "75"), ("10:30", "13"), ("23:0", "69"), ("０7:05", "31")]
+    raw = pd.DataFrame(rows, columns=["hrmn", "dep"]).assign(lat="48,1", long="2,3")
+    assert_same_cleaning(raw)
@@ -0,0 +1,72 @@
+# proportions : mêmes parts que la normalisation groupby(...).transform("sum") que
+# les pages faisaient avant, sur les combinaisons non vides.
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from crosstab import proportions
+
+
+def transform_proportions(table, dimensions, by):
+    grouped = table.groupby(dimensions, observed=True)["count"].sum().reset_index()
+    grouped = grouped[grouped["count"] > 0].reset_index(drop=True)
+    if by:
+        totals = grouped.groupby(by, observed=True)["count"].transform("sum")
+    else:
+        totals = grouped["count"].sum()
+    grouped["count_normalized"] = grouped["count"] / totals
+    return grouped
+
+
+def cube_rows():
+    # Comptes d'un cube (choc, grav) : lignes répétées, choc absent (NaN), choc 9
+    # sans aucun accident (groupe vide) et grav à compte nul dans un groupe
+    return pd.DataFrame(
+        {
+            "choc": [1, 1, 1, 2, 2, 3, np.nan, 9, 9, 3],
+            "grav": [1, 2, 1, 3, 4, 1, 2, 1, 4, 2],
+            "count": [5, 3, 2, 7, 1, 4, 6, 0, 0, 0],
+        }
+    )
+
+
+@pytest.mark.parametrize("by", [["choc"], ["grav"], []])
+def test_matches_transform(by):
+    table = cube_rows()
+    result = proportions(table, ["choc", "grav"], by=by)
+    expected = transform_proportions(table, ["choc", "grav"], by)
+    assert_frame_equal(result, expected, check_dtype=False)
+    # Groupe vide : aucune ligne, pas de part NaN
+    assert 9 not in result["choc"].tolist()
+    assert result["count_normalized"].notna().all()
+
+
+def test_categorical_dimensions():
+    # Catégories décodées (labels.decode) : ordre des catégories et catégorie
+    # inutilisée sans ligne
+    table = cube_rows().dropna()
+    table["grav"] = pd.Categorical(
+        table["grav"].map({1: "Unhurt", 2: "Killed", 3: "Hospitalized", 4: "Light"}),
+        categories=["Unhurt", "Light", "Hospitalized", "Killed", "Unknown"],
+        ordered=True,
+    )
+    result = proportions(table, ["choc", "grav"], by=["choc"])
+    expected = transform_proportions(table, ["choc", "grav"], ["choc"])
+    assert_frame_equal(result, expected, check_dtype=False)
+    assert "Unknown" not in result["grav"].tolist()
+
+
+def test_three_dimensions():
+    rng = np.random.default_rng(0)
+    table = pd.DataFrame(
+        {
+            "surf": rng.integers(1, 5, 500),
+            "lum": rng.integers(1, 4, 500),
+            "grav": rng.integers(1, 5, 500),
+            "count": rng.integers(0, 20, 500),
+        }
+    )
+    result = proportions(table, ["surf", "lum", "grav"], by=["surf", "lum"])
+    expected = transform_proportions(table, ["surf", "lum", "grav"], ["surf", "lum"])
+    assert_frame_equal(result, expected, check_dtype=False)
@@ -0,0 +1,48 @@
+# Petits cubes précalculés : mêmes comptes qu'un groupby sur la vue usager ×
+# véhicule × accident, et une taille qui ne dépend pas du nombre d'usagers.
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import cube
+from filters import row_masks
+from joins import user_vehicle_rows, user_vehicle_view
+
+YEAR = 2021
+
+
+def view_counts(view, dimensions, exclude=None):
+    codes = pd.DataFrame({name: cube._codes(view, name) for name in cube.DIMENSIONS})
+    for name, values in (exclude or {}).items():
+        codes = codes[~codes[name].isin(np.atleast_1d(values))]
+    return codes.groupby(dimensions).size().reset_index(name="count")
+
+
+@pytest.mark.parametrize("filters", [(), {"grav": [2, 3]}, {"hour": range(7, 10)}])
+@pytest.mark.parametrize("dimensions", [*map(list, cube.CUBES), ["grav"], ["obsm"]])
+def test_query_matches_groupby(synthetic_assets, dimensions, filters):
+    view = user_vehicle_view(YEAR)
+    masks = row_masks(YEAR, filters)
+    if masks is not None:
+        view = view[masks["usagers"][user_vehicle_rows(YEAR)]]
+    result = cube.query(YEAR, dimensions, filters=filters)
+    assert_frame_equal(result, view_counts(view, dimensions), check_dtype=False)
+
+
+def test_query_with_conditions(synthetic_assets):
+    exclude = {"obs": (-1, 0), "obsm": (-1, 0, 9)}
+    result = cube.query(YEAR, ["obs"], exclude=exclude)
+    expected = view_counts(user_vehicle_view(YEAR), ["obs"], exclude)
+    assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_cubes_stay_small(synthetic_assets):
+    users = len(user_vehicle_view(YEAR))
+    for dimensions in cube.CUBES:
+        assert len(cube.year_cube(YEAR, dimensions)) < users / 10
+
+
+def test_uncovered_dimensions():
+    with pytest.raises(ValueError):
+        cube.cube_dimensions(["hour", "mois"])
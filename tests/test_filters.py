@@ -0,0 +1,152 @@
+# Filtres globaux : les masques obtenus par index bitmap sont ceux d'un filtrage
+# pandas équivalent. Le millésime synthétique est retouché pour couvrir les cas
+# limites : second lieu d'un accident (seul le premier compte), accident sans
+# lieu, codes manquants (NA) dans lieux et usagers.
+import csv
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import filters
+import utils
+
+YEARS = (2017, 2021)
+
+CASES = [
+    {"dep": [75, 13]},
+    {"hour": range(7, 10), "lum": [1]},
+    {"surf": [1]},
+    {"surf": [2, 3], "catr": [3, 4]},
+    {"grav": [2]},
+    {"grav": [2, 3], "catu": [3]},
+    {"dep": [75, 77, 13], "surf": [1], "grav": [2, 3]},
+    {"lum": [1, 5], "catr": [4], "catu": [1], "grav": [], "dep": []},
+]
+
+
+def edit_table(year, table, edit):
+    path = utils.source_path(year, table)
+    options = utils.csv_options(year)
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, **options)
+    edit(df).to_csv(path, index=False, quoting=csv.QUOTE_ALL, **options)
+
+
+def edit_locations(df):
+    # Un accident sur trois reçoit un second lieu à la surface différente, un
+    # sur sept perd son lieu, un sur onze a une surface vide
+    first = df.iloc[::3].copy()
+    first["surf"] = np.where(first["surf"] == "1", "2", "1")
+    df.loc[df.index[5::11], "surf"] = ""
+    return pd.concat([df, first]).drop(index=df.index[1::7])
+
+
+def edit_users(df):
+    df.loc[df.index[2::13], "grav"] = ""
+    df.loc[df.index[4::17], "catu"] = ""
+    return df
+
+
+@pytest.fixture
+def edited_assets(synthetic_dir, tmp_path, monkeypatch):
+    for year in YEARS:
+        os.makedirs(tmp_path / "assets" / str(year))
+        for table in utils.TABLES:
+            path = utils.source_path(year, table)
+            shutil.copy(synthetic_dir / path, tmp_path / path)
+    monkeypatch.chdir(tmp_path)
+    for year in YEARS:
+        edit_table(year, "lieux", edit_locations)
+        edit_table(year, "usagers", edit_users)
+    utils.clear_cache()
+    yield tmp_path
+    utils.clear_cache()
+
+
+def pandas_masks(frames, case):
+    # Même règle que _cached_masks, écrite en filtres pandas
+    characteristics, locations, users, vehicles = frames
+
+    def passes(frame, table):
+        keep = np.ones(len(frame), dtype=bool)
+        for name, codes in case.items():
+            if filters.FILTERS[name][0] == table and len(codes):
+                column = frame[filters.FILTERS[name][1]].isin(list(codes))
+                keep &= column.to_numpy(dtype=bool, na_value=False)
+        return keep
+
+    def filtered(table):
+        return any(
+            filters.FILTERS[name][0] == table and len(codes)
+            for name, codes in case.items()
+        )
+
+    accidents = characteristics["Num_Acc"][passes(characteristics, "caracteristiques")]
+    if filtered("lieux"):
+        first = locations.drop_duplicates("Num_Acc")
+        accidents = accidents[accidents.isin(first["Num_Acc"][passes(first, "lieux")])]
+    user_rows = passes(users, "usagers")
+    if filtered("usagers"):
+        accidents = accidents[accidents.isin(users["Num_Acc"][user_rows])]
+
+    masks = {
+        table: frame["Num_Acc"].isin(accidents).to_numpy()
+        for table, frame in zip(utils.TABLES, frames)
+    }
+    masks["usagers"] &= user_rows
+    return masks
+
+
+@pytest.mark.parametrize("year", YEARS)
+@pytest.mark.parametrize("case", CASES)
+def test_row_masks_match_pandas(edited_assets, year, case):
+    frames = utils.load_data(year)
+    masks = filters.row_masks(year, case)
+    expected = pandas_masks(frames, case)
+    assert list(masks) == list(utils.TABLES)
+    for table, frame in zip(utils.TABLES, frames):
+        assert len(masks[table]) == len(frame)
+        assert np.array_equal(masks[table], expected[table]), table
+        assert not masks[table].flags.writeable
+
+
+@pytest.mark.parametrize("year", YEARS)
+def test_edge_cases_are_present(edited_assets, year):
+    # Le millésime retouché contient bien les cas que les filtres doivent gérer
+    characteristics, locations, users, _ = utils.load_data(year)
+    assert locations["Num_Acc"].duplicated().any()
+    assert not characteristics["Num_Acc"].isin(locations["Num_Acc"]).all()
+    assert locations["surf"].isna().any()
+    assert users["grav"].isna().any() and users["catu"].isna().any()
+
+
+def test_first_location_only(edited_assets):
+    # Accident dont le second lieu passe le filtre mais pas le premier
+    characteristics, locations, _, _ = utils.load_data(2021)
+    repeated = locations[locations["Num_Acc"].duplicated(keep=False)]
+    second = repeated[repeated["Num_Acc"].duplicated()].iloc[0]
+    masks = filters.row_masks(2021, {"surf": [int(second["surf"])]})
+    row = np.flatnonzero(characteristics["Num_Acc"] == second["Num_Acc"])[0]
+    assert not masks["caracteristiques"][row]
+
+
+def test_no_filters(edited_assets):
+    assert filters.row_masks(2021, {}) is None
+    assert filters.row_masks(2021, {"grav": [], "dep": []}) is None
+    assert filters.filter_key({"grav": [3, 2], "dep": []}) == (("grav", (2, 3)),)
+
+
+def test_build_bitmaps():
+    values = np.array([3, -1, 3, 7, 2, 3, -1, 7, 7, 2, 2])
+    bitmaps = filters.build_bitmaps(values)
+    assert sorted(bitmaps) == [-1, 2, 3, 7]
+    for code, bits in bitmaps.items():
+        rows = np.unpackbits(bits, count=len(values)).astype(bool)
+        assert np.array_equal(rows, values == code)
+        assert not bits.flags.writeable
+    selected = filters.select(bitmaps, [2, 7, 99], len(values))
+    rows = np.unpackbits(selected, count=len(values)).astype(bool)
+    assert np.array_equal(rows, np.isin(values, [2, 7]))
+    assert filters.build_bitmaps([]) == {}
@@ -0,0 +1,126 @@
+# Points noirs : la densité lissée par FFT donne les mêmes maxima qu'une
+# convolution directe du noyau gaussien, et les comptes autour de chaque point
+# noir sont ceux d'un parcours exhaustif (haversine).
+import numpy as np
+import pandas as pd
+import pytest
+
+import hotspots
+from spatial import haversine_m
+
+
+def clusters(seed=0):
+    # Trois foyers autour de Paris (effectifs décroissants) et un bruit uniforme
+    rng = np.random.default_rng(seed)
+    centers = [(48.86, 2.35, 300), (48.80, 2.45, 150), (48.92, 2.25, 60)]
+    lat = [rng.normal(c_lat, 0.004, n) for c_lat, _, n in centers]
+    lon = [rng.normal(c_lon, 0.006, n) for _, c_lon, n in centers]
+    lat.append(rng.uniform(48.70, 49.00, 400))
+    lon.append(rng.uniform(2.10, 2.60, 400))
+    lat, lon = np.concatenate(lat), np.concatenate(lon)
+    fatal = rng.random(len(lat)) < 0.05
+    return lat, lon, fatal
+
+
+def direct_hotspots(lat, lon, top_k):
+    # Même grille que find_hotspots, densité par somme directe du noyau décalé
+    cell_lat = hotspots.CELL_M / hotspots.METERS_PER_DEGREE
+    cell_lon = cell_lat / np.cos(np.radians((lat.min() + lat.max()) / 2))
+    rows = ((lat - lat.min()) / cell_lat).astype(np.int64)
+    cols = ((lon - lon.min()) / cell_lon).astype(np.int64)
+    shape = (rows.max() + 1, cols.max() + 1)
+    counts = np.zeros(shape)
+    np.add.at(counts, (rows, cols), 1)
+
+    sigma = hotspots.BANDWIDTH_M / hotspots.CELL_M
+    radius = int(np.ceil(3 * sigma))
+    kernel = np.exp(-((hotspots._offsets(radius) / sigma) ** 2) / 2)
+    kernel /= kernel.sum()
+    padded = np.pad(counts, radius)
+    density = np.zeros(shape)
+    for dr in range(-radius, radius + 1):
+        for dc in range(-radius, radius + 1):
+            window = padded[
+                radius + dr : radius + dr + shape[0],
+                radius + dc : radius + dc + shape[1],
+            ]
+            density += kernel[radius + dr, radius + dc] * window
+
+    candidates = hotspots.local_maxima(density)
+    candidates = candidates[np.argsort(density.ravel()[candidates], kind="stable")]
+    candidates = candidates[::-1]
+    peak_rows, peak_cols = np.divmod(candidates, shape[1])
+    peak_lat = lat.min() + (peak_rows + 0.5) * cell_lat
+    peak_lon = lon.min() + (peak_cols + 0.5) * cell_lon
+    kept = hotspots._separated(
+        peak_lat, peak_lon, np.arange(len(candidates)), top_k, hotspots.HOTSPOT_RADIUS_M
+    )
+    return peak_lat[kept], peak_lon[kept], density.ravel()[candidates[kept]]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_fft_density_matches_direct_kde(seed):
+    lat, lon, fatal = clusters(seed)
+    result = hotspots.find_hotspots(lat, lon, fatal, top_k=10)
+    expected_lat, expected_lon, expected_density = direct_hotspots(lat, lon, 10)
+    assert np.allclose(result["lat"], expected_lat)
+    assert np.allclose(result["lon"], expected_lon)
+    assert np.allclose(result["density"], expected_density)
+    # Le foyer le plus peuplé arrive en tête
+    assert haversine_m(result["lat"][0], result["lon"][0], 48.86, 2.35) < 1_000
+
+
+def test_counts_around_each_hotspot():
+    lat, lon, fatal = clusters()
+    result = hotspots.find_hotspots(lat, lon, fatal, top_k=5)
+    for hotspot in result.itertuples():
+        around = haversine_m(hotspot.lat, hotspot.lon, lat, lon)
+        around = around <= hotspots.HOTSPOT_RADIUS_M
+        assert hotspot.accidents == around.sum()
+        assert hotspot.fatal_accidents == (around & fatal).sum()
+    assert (result["fatality_share"] <= 1).all()
+
+
+def test_hotspots_are_separated():
+    lat, lon, fatal = clusters()
+    result = hotspots.find_hotspots(lat, lon, fatal, top_k=20)
+    assert result["density"].is_monotonic_decreasing
+    for i in range(len(result)):
+        others = result.drop(index=i)
+        distances = haversine_m(
+            result["lat"][i], result["lon"][i], others["lat"], others["lon"]
+        )
+        # Distance plane de _separated : marge d'un mètre sur haversine
+        assert (distances > hotspots.HOTSPOT_RADIUS_M - 1).all()
+
+
+def test_no_accidents():
+    result = hotspots.find_hotspots([], [], [])
+    assert result.empty
+    assert "fatality_share" in result.columns
+
+
+def test_fatal_accidents():
+    characteristics = pd.DataFrame({"Num_Acc": [10, 11, 12, 13]})
+    users = pd.DataFrame(
+        {"Num_Acc": [10, 10, 11, 12, 14], "grav": [1, 2, 3, pd.NA, 2]},
+    ).astype({"grav": "Int8"})
+    fatal = hotspots.fatal_accidents(characteristics, users)
+    assert fatal.tolist() == [True, False, False, False]
+
+
+def test_year_area(synthetic_assets):
+    # Zone d'une page : mêmes points noirs que find_hotspots sur ses accidents
+    import utils
+    from maps import area_rows
+
+    characteristics, _, users, _ = utils.load_data(2021)
+    rows = area_rows(2021, ("dep", 75))
+    lat = characteristics["lat"].to_numpy(np.float64)[rows]
+    lon = characteristics["long"].to_numpy(np.float64)[rows]
+    valid = utils.valid_coordinates(lat, lon)
+    fatal = hotspots.fatal_accidents(characteristics, users)[rows]
+    expected = hotspots.find_hotspots(lat[valid], lon[valid], fatal[valid], 5)
+    result = hotspots.hotspots(2021, ("dep", 75), 5)
+    pd.testing.assert_frame_equal(result, expected)
+    assert len(result) == 5
@@ -0,0 +1,78 @@
+# Jointure usagers-véhicules au bon grain : mêmes lignes que pd.merge sur
+# (Num_Acc, num_veh) avant 2019 et sur (Num_Acc, id_vehicule) ensuite.
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+import joins
+import utils
+
+
+def merged_view(characteristics, locations, users, vehicles, keys):
+    merged = users
+    for table, on in ((vehicles, keys), (characteristics, ["Num_Acc"])):
+        columns = on + [c for c in table.columns if c not in merged.columns]
+        merged = merged.merge(table[columns], on=on)
+    # Premier lieu de chaque accident, comme accident_positions
+    locations = locations.drop_duplicates("Num_Acc")
+    columns = ["Num_Acc"] + [c for c in locations.columns if c not in merged.columns]
+    return merged.merge(locations[columns], on="Num_Acc")
+
+
+def assert_same_rows(view, expected):
+    assert list(view.columns) == list(expected.columns)
+    # Catégories propres à chaque table : on compare les valeurs
+    assert_frame_equal(
+        view.astype(object), expected.astype(object), check_index_type=False
+    )
+
+
+@pytest.mark.parametrize(
+    "year, keys", [(2017, ["Num_Acc", "num_veh"]), (2021, ["Num_Acc", "id_vehicule"])]
+)
+def test_view_matches_merge(synthetic_assets, year, keys):
+    frames = utils.load_data(year)
+    view = joins.user_vehicle_view(year)
+    assert len(view) > 0
+    assert_same_rows(view, merged_view(*frames, keys))
+
+
+def small_year():
+    # Deux accidents avec les mêmes num_veh ; usager sans véhicule ; num_veh vide
+    characteristics = pd.DataFrame({"Num_Acc": [1, 2, 3], "lum": [1, 2, 3]})
+    locations = pd.DataFrame({"Num_Acc": [1, 2, 2, 3], "catr": [1, 3, 4, 2]})
+    vehicles = pd.DataFrame(
+        {
+            "Num_Acc": [1, 1, 2, 2, 3],
+            "num_veh": ["A01", "B01", "A01", "B01", None],
+            "catv": [7, 33, 2, 7, 7],
+        }
+    )
+    users = pd.DataFrame(
+        {
+            "Num_Acc": [1, 1, 1, 2, 2, 3, 3],
+            "num_veh": ["A01", "B01", "B01", "B01", "C01", None, "A01"],
+            "grav": [1, 2, 3, 4, 1, 2, 3],
+        }
+    )
+    return characteristics, locations, users, vehicles
+
+
+def test_small_year_num_veh():
+    characteristics, locations, users, vehicles = small_year()
+    view = joins.join_users_vehicles(users, vehicles, characteristics, locations)
+    expected = merged_view(*small_year(), ["Num_Acc", "num_veh"])
+    assert_same_rows(view, expected)
+    assert view["catv"].tolist() == [7, 33, 33, 7, 7]
+
+
+def test_num_veh_key_limits():
+    users = pd.DataFrame({"Num_Acc": [1], "num_veh": ["A01"]})
+    too_many = pd.Index([f"V{i}" for i in range(joins.NUM_VEH_SLOTS)])
+    with pytest.raises(ValueError, match="num_veh"):
+        joins._num_veh_keys(users, too_many)
+
+    huge = users.assign(Num_Acc=np.iinfo(np.int64).max // 100)
+    with pytest.raises(ValueError, match="Num_Acc"):
+        joins._num_veh_keys(huge, pd.Index(["A01"]))
@@ -0,0 +1,70 @@
+# Chiffres clés par table : mêmes valeurs que l'ancienne fusion des quatre tables
+# de Home.py (accidents et accidents mortels), victimes et véhicules comptés une
+# fois chacun parmi les accidents de cette fusion.
+import pandas as pd
+
+import utils
+from kpis import KILLED, compute_kpis
+
+
+def merged_kpis(characteristics, locations, users, vehicles):
+    data_complete = (
+        characteristics.merge(users, on="Num_Acc")
+        .merge(locations, on="Num_Acc")
+        .merge(vehicles, on="Num_Acc")
+    )
+    accidents = data_complete["Num_Acc"].unique()
+    users = users[users["Num_Acc"].isin(accidents)]
+    return {
+        "accidents": len(accidents),
+        "fatal_accidents": len(
+            data_complete[data_complete["grav"] == KILLED]["Num_Acc"].unique()
+        ),
+        "users": len(users),
+        "killed": int((users["grav"] == KILLED).sum()),
+        "hospitalized": int((users["grav"] == 3).sum()),
+        "slightly_injured": int((users["grav"] == 4).sum()),
+        "injured": int(users["grav"].isin([3, 4]).sum()),
+        "vehicles": int(vehicles["Num_Acc"].isin(accidents).sum()),
+    }
+
+
+def small_year():
+    # 1 : deux véhicules, quatre usagers dont deux tués ; 2 : un véhicule, deux
+    # usagers indemne/blessé ; 3 : trois véhicules, deux lignes de lieux ;
+    # 4 : tué mais absent de lieux ; 5 : sans usager ; 6 : sans véhicule
+    characteristics = pd.DataFrame({"Num_Acc": [1, 2, 3, 4, 5, 6]})
+    locations = pd.DataFrame(
+        {"Num_Acc": [1, 2, 3, 3, 5, 6], "catr": [1, 3, 4, 4, 2, 3]}
+    )
+    vehicles = pd.DataFrame(
+        {
+            "Num_Acc": [1, 1, 2, 3, 3, 3, 4, 5],
+            "id_vehicule": [10, 11, 20, 30, 31, 32, 40, 50],
+        }
+    )
+    users = pd.DataFrame(
+        {
+            "Num_Acc": [1, 1, 1, 1, 2, 2, 3, 3, 3, 4, 6],
+            "id_vehicule": [10, 10, 11, 11, 20, 20, 30, 31, 32, 40, 60],
+            "grav": [2, 3, 2, 1, 1, 4, 3, 4, 4, 2, 2],
+        }
+    )
+    return characteristics, locations, users, vehicles
+
+
+def test_small_year():
+    frames = small_year()
+    kpis = compute_kpis(*frames)
+    assert kpis == merged_kpis(*frames)
+    assert kpis["accidents"] == 3
+    assert kpis["fatal_accidents"] == 1
+    assert kpis["killed"] == 2
+    assert kpis["users"] == 9
+    assert kpis["vehicles"] == 6
+
+
+def test_synthetic_years(synthetic_assets):
+    for year in (2017, 2021):
+        frames = utils.load_data(year)
+        assert compute_kpis(*frames) == merged_kpis(*frames)
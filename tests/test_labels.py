@@ -0,0 +1,72 @@
+# Libellés : décoder puis recoder redonne les codes d'origine, quel que soit le
+# type des colonnes chargées ; un code inconnu ou manquant devient NaN.
+import numpy as np
+import pandas as pd
+import pytest
+
+import labels
+
+
+def encode(decoded, column):
+    # Libellés -> codes, à l'inverse de labels.decode
+    codes = {label: code for code, label in labels.LABELS[column].items()}
+    return pd.Series(decoded).map(codes)
+
+
+@pytest.mark.parametrize("column", list(labels.LABELS))
+@pytest.mark.parametrize("dtype", ["int8", "int16", "int64", "float64", "Int8"])
+def test_round_trip(column, dtype):
+    codes = pd.Series(list(labels.LABELS[column]) * 3).astype(dtype)
+    decoded = labels.decode(codes, column)
+    assert decoded.dtype == labels.label_dtype(column)
+    assert decoded.ordered
+    assert encode(decoded, column).astype(dtype).equals(codes)
+    # Même résultat qu'un Series.map sur le dictionnaire
+    expected = codes.map(labels.LABELS[column]).astype(object)
+    assert list(decoded) == list(expected)
+
+
+@pytest.mark.parametrize("column", ["grav", "catu", "surf"])
+def test_unknown_and_missing_codes(column):
+    known = next(iter(labels.LABELS[column]))
+    codes = pd.Series([known, 99, pd.NA, known], dtype="Int16")
+    decoded = labels.decode(codes, column)
+    assert list(pd.isna(decoded)) == [False, True, True, False]
+    assert decoded[0] == labels.LABELS[column][known]
+
+
+def test_category_order_follows_the_mapping():
+    decoded = labels.decode([2, 1, 3, 4], "grav")
+    assert list(decoded.categories) == list(labels.GRAV.values())
+    assert list(decoded.sort_values()) == [
+        "Unharmed",
+        "Slight injury",
+        "Hospitalized injury",
+        "Killed",
+    ]
+
+
+def test_decode_frame_leaves_the_shared_frame_untouched():
+    df = pd.DataFrame(
+        {
+            "Num_Acc": np.arange(4, dtype=np.int64),
+            "grav": pd.array([1, 2, 3, 4], dtype="int8"),
+            "sexe": pd.array([1, 2, -1, pd.NA], dtype="Int8"),
+            "an_nais": [1980, 1990, 2000, 2010],
+        }
+    )
+    before = df.copy()
+    decoded = labels.decode_frame(df)
+    pd.testing.assert_frame_equal(df, before)
+    assert list(decoded.columns) == list(df.columns)
+    for column in ["grav", "sexe"]:
+        expected = labels.decode(df[column], column)
+        assert decoded[column].dtype == labels.label_dtype(column)
+        assert decoded[column].equals(pd.Series(expected, name=column))
+    # Colonnes sans libellés partagées, sans copie
+    assert np.shares_memory(decoded["Num_Acc"].to_numpy(), df["Num_Acc"].to_numpy())
+    assert decoded["an_nais"].equals(df["an_nais"])
+
+    only_grav = labels.decode_frame(df, ["grav", "an_nais"])
+    assert only_grav["grav"].dtype == labels.label_dtype("grav")
+    assert only_grav["sexe"].equals(df["sexe"])
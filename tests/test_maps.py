@@ -0,0 +1,94 @@
+# Grappes précalculées : le plafond de marqueurs s'applique par tuile, de sorte
+# qu'une vue rapprochée montre les accidents un par un quelle que soit la zone.
+# Carte de chaleur : un niveau de cellules par zoom atteignable.
+import json
+
+import numpy as np
+
+import maps
+
+
+def disc(count, radius, seed=0):
+    # Accidents répartis uniformément dans un disque autour de Paris
+    rng = np.random.default_rng(seed)
+    distance = radius * np.sqrt(rng.random(count))
+    angle = rng.random(count) * 2 * np.pi
+    return 48.8566 + distance * np.cos(angle), 2.3522 + 1.5 * distance * np.sin(angle)
+
+
+def per_tile(markers, zoom):
+    resolution = maps.resolution_for_zoom(zoom, maps.TILE_PIXELS)
+    points = np.array([marker[:2] for marker in markers])
+    _, counts = np.unique(np.floor(points / resolution), axis=0, return_counts=True)
+    return counts
+
+
+def test_every_accident_is_counted_once():
+    lat, lon = disc(3_019, 0.09)
+    for zoom in maps.CLUSTER_ZOOMS:
+        markers = maps.cluster_points(lat, lon, zoom)
+        assert sum(marker[2] for marker in markers) == len(lat)
+
+
+def test_detail_zoom_shows_single_accidents_over_a_large_area():
+    # Environ 10 km autour de Paris : trop d'accidents pour un plafond global
+    lat, lon = disc(3_019, 0.09)
+    markers = maps.cluster_points(lat, lon, maps.DETAIL_ZOOM)
+    assert len(markers) == len(lat)
+    assert all(marker[2] == 1 for marker in markers)
+
+
+def test_dense_tiles_stay_clustered():
+    lat, lon = disc(20_000, 0.005)
+    markers = maps.cluster_points(lat, lon, maps.DETAIL_ZOOM)
+    assert sum(marker[2] for marker in markers) == len(lat)
+    assert per_tile(markers, maps.DETAIL_ZOOM).max() <= maps.MAX_TILE_MARKERS
+    assert any(marker[2] > 1 for marker in markers)
+
+
+def test_clusters_per_tile_are_bounded():
+    cells = (maps.TILE_PIXELS // maps.CLUSTER_CELL_PIXELS) ** 2
+    lat, lon = disc(50_000, 2.0)
+    for zoom in maps.CLUSTER_ZOOMS[:-1]:
+        markers = maps.cluster_points(lat, lon, zoom)
+        # Le barycentre d'une grappe reste dans sa cellule, donc dans sa tuile
+        assert per_tile(markers, zoom).max() <= cells
+
+
+def test_heatmap_levels_follow_the_zoom():
+    lat, lon = disc(3_019, 0.09)
+    levels = maps.bin_levels(lat, lon)
+    zooms = list(levels)
+    assert zooms == list(maps.HEATMAP_ZOOMS[: len(zooms)])
+    for zoom in zooms[:-1]:
+        points = maps.bin_points(lat, lon, maps.resolution_for_zoom(zoom))
+        assert np.allclose(levels[zoom], points, atol=1e-4)
+    # Cellules de plus en plus fines, jusqu'aux positions exactes
+    sizes = [len(levels[zoom]) for zoom in zooms]
+    assert sizes == sorted(sizes)
+    exact = sorted(tuple(point[:2]) for point in levels[zooms[-1]])
+    rounded = np.round(np.column_stack([lat, lon]), maps.COORDINATE_DECIMALS)
+    assert exact == sorted(map(tuple, rounded.tolist()))
+    assert zooms[-1] < maps.HEATMAP_ZOOMS[-1]
+
+
+def test_heatmap_levels_keep_weights():
+    lat, lon = disc(500, 0.05)
+    lat, lon = np.repeat(lat, 2), np.repeat(lon, 2)  # deux accidents par position
+    weights = np.tile([1.0, 10.0], 500)
+    last = list(maps.bin_levels(lat, lon, weights).values())[-1]
+    assert len(last) == 500
+    assert all(point[2] == 1.0 for point in last)
+    assert maps.bin_levels([], []) == {maps.HEATMAP_ZOOMS[0]: []}
+
+
+def test_zoom_heatmap_switches_levels():
+    import folium
+
+    levels = maps.bin_levels(*disc(200, 0.05))
+    city_map = folium.Map(location=(48.8566, 2.3522), zoom_start=12)
+    city_map.add_child(maps.ZoomHeatMap(json.dumps(levels), radius=15))
+    html = city_map.get_root().render()
+    assert "leaflet_heat.min.js" in html
+    assert "L.heatLayer" in html and "setLatLngs" in html
+    assert '"radius": 15' in html
@@ -0,0 +1,60 @@
+# Profilage par l'URL réservé à l'exploitant (ACCIDENTS_PROFILE_ENABLED=1) ;
+# mémoire mesurée par une seule exécution à la fois.
+import threading
+import tracemalloc
+
+import pytest
+
+import perf
+
+
+@pytest.mark.parametrize(
+    "enabled, value, mode",
+    [
+        (False, "1", None),
+        (False, "memory", None),
+        (True, None, None),
+        (True, "0", None),
+        (True, "1", "cpu"),
+        (True, "memory", "memory"),
+    ],
+)
+def test_profile_mode(monkeypatch, enabled, value, mode):
+    monkeypatch.setattr(perf, "PROFILE_ENABLED", enabled)
+    monkeypatch.setattr(perf, "_query_param", lambda name: value)
+    assert perf._profile_mode() == mode
+
+
+def test_one_traced_run_at_a_time(monkeypatch):
+    # reset_peak est global : une deuxième exécution concurrente ne mesure pas
+    # la mémoire, et la suivante peut de nouveau le faire
+    monkeypatch.setattr(perf, "TRACEMALLOC", True)
+    monkeypatch.setattr(perf, "PERF_LOG", "")
+    monkeypatch.setattr(perf, "performance_panel", lambda summary: None)
+    # Les deux exécutions sont dans leur étape en même temps
+    overlap, claimed = threading.Barrier(2), threading.Event()
+    summaries = {}
+
+    def page(name):
+        perf.start_run(name)
+        claimed.set()
+        with perf.stage("work"):
+            overlap.wait()
+        summaries[name] = perf.finish_run()
+
+    first = threading.Thread(target=page, args=("first",))
+    first.start()
+    claimed.wait()
+    second = threading.Thread(target=page, args=("second",))
+    second.start()
+    first.join()
+    second.join()
+    try:
+        assert summaries["first"]["tracemalloc"]
+        assert "peak_mb" in summaries["first"]["stages"][0]
+        assert not summaries["second"]["tracemalloc"]
+        assert summaries["second"]["tracemalloc_busy"]
+        assert "peak_mb" not in summaries["second"]["stages"][0]
+        assert perf._tracing_owner is None
+    finally:
+        tracemalloc.stop()
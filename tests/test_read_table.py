@@ -0,0 +1,29 @@
+# Copie Parquet des CSV : relue à l'identique, et sans pyarrow un avertissement
+# signale le retour au CSV au lieu d'une dégradation silencieuse.
+import logging
+import os
+
+import pytest
+from pandas.testing import assert_frame_equal
+
+import utils
+
+
+# Parquet relit les textes vides en None, le CSV en NaN
+@pytest.mark.filterwarnings("ignore:Mismatched null-like values")
+def test_columnar_copy_matches_csv(synthetic_assets):
+    for table in utils.TABLES:
+        expected = utils.read_table(2021, table, columnar=False)
+        utils.read_table(2021, table)
+        assert os.path.exists(utils.columnar_path(2021, table))
+        assert_frame_equal(utils.read_table(2021, table), expected)
+
+
+def test_missing_pyarrow_warns_once(synthetic_assets, monkeypatch, caplog):
+    monkeypatch.setattr(utils, "pq", None)
+    monkeypatch.setattr(utils, "_fallback_warned", False)
+    with caplog.at_level(logging.WARNING, logger="accidents.data"):
+        utils.read_table(2021, "lieux")
+        utils.read_table(2021, "vehicules")
+    warnings = [r for r in caplog.records if "pyarrow" in r.getMessage()]
+    assert len(warnings) == 1
@@ -0,0 +1,51 @@
+# Codes entiers lus dans les types par défaut de read_csv puis ramenés au type
+# compact du schéma : bornes vérifiées, type nullable seulement si une case est vide.
+import os
+
+import pandas as pd
+import pytest
+
+import schema
+import utils
+
+
+def test_codes_are_downcast():
+    df = pd.DataFrame(
+        {"Num_Acc": [1, 2, 3], "catr": [1, 4, 9], "surf": [1.0, None, 2.0]}
+    )
+    df = schema.finalize(df, "lieux")
+    assert df["catr"].dtype == "int8"
+    assert df["surf"].dtype == "Int8"
+    assert df["surf"].tolist() == [1, pd.NA, 2]
+
+
+@pytest.mark.parametrize("value", [300, -200])
+def test_out_of_range_code_raises(value):
+    df = pd.DataFrame({"Num_Acc": [1, 2], "catr": [1, value]})
+    with pytest.raises(ValueError, match="lieux.catr"):
+        schema.finalize(df, "lieux")
+
+
+def test_int16_bounds():
+    df = pd.DataFrame({"Num_Acc": [1, 2], "vma": [130, 32_767]})
+    assert schema.finalize(df, "lieux")["vma"].dtype == "int16"
+    df = pd.DataFrame({"Num_Acc": [1, 2], "vma": [130, 40_000]})
+    with pytest.raises(ValueError, match="lieux.vma"):
+        schema.finalize(df, "lieux")
+
+
+def test_text_and_decimals_are_kept():
+    df = pd.DataFrame({"Num_Acc": [1, 2], "catr": ["1", "x"], "circ": [1.5, 2.0]})
+    df = schema.finalize(df, "lieux")
+    assert df["catr"].tolist() == ["1", "x"]
+    assert df["circ"].tolist() == [1.5, 2.0]
+
+
+def test_csv_overflow_raises(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("assets/2021")
+    with open(utils.source_path(2021, "lieux"), "w") as f:
+        f.write('"Num_Acc";"catr";"surf"\n"202100000001";"3";"1"\n')
+        f.write('"202100000002";"300";"2"\n')
+    with pytest.raises(ValueError, match="lieux.catr"):
+        utils.read_table(2021, "lieux", columnar=False)
@@ -0,0 +1,78 @@
+# Index spatial en grille : mêmes accidents qu'un parcours exhaustif (haversine
+# sur toutes les lignes aux coordonnées valides) du millésime synthétique.
+import numpy as np
+import pytest
+
+import spatial
+import utils
+
+YEAR = 2021
+
+# Centres denses, point isolé, bord de grille et point hors du territoire
+POINTS = [
+    (48.8566, 2.3522),
+    (43.2965, 5.3698),
+    (45.7640, 4.8357),
+    (47.0, 1.0),
+    (41.0, -5.5),
+    (60.0, 30.0),
+]
+
+
+@pytest.fixture
+def year_points(synthetic_assets):
+    characteristics = utils.load_data(YEAR)[0]
+    lat = characteristics["lat"].to_numpy(np.float64)
+    lon = characteristics["long"].to_numpy(np.float64)
+    return spatial.year_grid_index(YEAR), lat, lon, utils.valid_coordinates(lat, lon)
+
+
+def brute_force(lat, lon, valid, point, radius_m):
+    distances = spatial.haversine_m(*point, lat, lon)
+    return np.flatnonzero(valid & (distances <= radius_m)), distances
+
+
+@pytest.mark.parametrize("point", POINTS)
+@pytest.mark.parametrize("radius_m", [50, 1_000, 20_000])
+def test_radius_query(year_points, point, radius_m):
+    index, lat, lon, valid = year_points
+    expected, _ = brute_force(lat, lon, valid, point, radius_m)
+    result = spatial.radius_query(index, *point, radius_m)
+    assert np.array_equal(np.sort(result), expected)
+
+
+@pytest.mark.parametrize(
+    "bounds",
+    [
+        (48.80, 2.25, 48.90, 2.42),
+        (43.0, 5.0, 44.0, 6.0),
+        (40.0, -6.0, 52.0, 11.0),  # toute la France
+        (48.8566, 2.3522, 48.8566, 2.3522),  # rectangle réduit à un point
+        (50.0, 20.0, 51.0, 21.0),  # hors de la grille
+    ],
+)
+def test_bbox_query(year_points, bounds):
+    index, lat, lon, valid = year_points
+    south, west, north, east = bounds
+    inside = valid & (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+    assert np.array_equal(spatial.bbox_query(index, *bounds), np.flatnonzero(inside))
+
+
+@pytest.mark.parametrize("point", POINTS[:3])
+def test_nearest(year_points, point):
+    index, lat, lon, valid = year_points
+    expected, distances = brute_force(lat, lon, valid, point, 2_000)
+    rows, result_distances = spatial.nearest(index, *point, 2_000)
+    assert sorted(rows.tolist()) == expected.tolist()
+    assert np.all(np.diff(result_distances) >= 0)
+    assert np.allclose(result_distances, distances[rows])
+
+    rows, _ = spatial.nearest(index, *point, 2_000, limit=10)
+    closest = np.sort(distances[expected])[:10]
+    assert np.allclose(np.sort(distances[rows]), closest)
+
+
+def test_no_valid_coordinates():
+    index = spatial.build_grid_index([np.nan, -1.0, 0.0], [np.nan, -1.0, 0.0])
+    assert len(spatial.radius_query(index, 48.8566, 2.3522, 10_000)) == 0
+    assert len(spatial.bbox_query(index, 40.0, -6.0, 52.0, 11.0)) == 0
@@ -0,0 +1,65 @@
+# Tuiles de densité : construction dans un dossier temporaire mis en place d'un
+# bloc sous le verrou de l'année, y compris quand plusieurs sessions les demandent.
+import os
+import threading
+
+import pytest
+
+import tiles
+import utils
+
+YEAR = 2021
+
+
+@pytest.fixture
+def tiles_dir(synthetic_assets, tmp_path, monkeypatch):
+    monkeypatch.setattr(tiles, "TILES_DIR", str(tmp_path / "tiles"))
+    tiles._cached_mosaic.cache_clear()
+
+
+def leftovers():
+    return [
+        name for name in os.listdir(tiles.TILES_DIR) if name.endswith((".tmp", ".old"))
+    ]
+
+
+def test_concurrent_sessions_share_one_build(tiles_dir, monkeypatch):
+    builds = []
+    render = tiles.render_zoom
+    monkeypatch.setattr(
+        tiles, "render_zoom", lambda *args: builds.append(args[2]) or render(*args)
+    )
+    results = [None] * 4
+
+    def session(i):
+        results[i] = tiles.tile_mosaic(YEAR, 6)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(result == results[0] for result in results)
+    assert results[0][0].startswith("data:image/png;base64,")
+    assert builds == list(tiles.TILE_ZOOMS)  # une seule construction
+    assert not leftovers()
+    assert not tiles.build_year_tiles(YEAR)
+
+
+def test_rebuild_replaces_the_year(tiles_dir):
+    tiles.build_year_tiles(YEAR, force=True)
+    tiles.tile_mosaic(YEAR, 5)
+    stale = os.path.join(tiles.year_dir(YEAR), "stale.png")
+    open(stale, "w").close()
+
+    # Fichier source modifié : nouveau jeu de tuiles, l'ancien disparaît
+    path = utils.source_path(YEAR, "caracteristiques")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    utils.clear_cache()
+    tiles.tile_mosaic(YEAR, 5)
+    assert not os.path.exists(stale)
+    assert os.path.exists(tiles.mosaic_path(YEAR, 5, tiles.FRANCE_BOUNDS))
+    assert os.path.exists(os.path.join(tiles.year_dir(YEAR), "manifest.json"))
+    assert not leftovers()
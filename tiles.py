@@ -0,0 +1,220 @@
+# Tuiles PNG de densité d'accidents (projection Web Mercator, schéma z/x/y),
+# construites hors ligne année par année à partir des coordonnées nettoyées.
+# Lancer depuis la racine du dépôt : python -m tiles 2019 2020 2021
+# Une année est construite dans un dossier temporaire puis mise en place d'un
+# bloc, sous un verrou par année (threads des sessions et autres processus) :
+# une session ne lit jamais des tuiles qu'une autre est en train de remplacer.
+import base64
+import functools
+import json
+import os
+import shutil
+import sys
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité aux threads du processus
+    fcntl = None
+
+from spatial import valid_coordinates
+from utils import load_data, source_path
+
+TILES_DIR = os.environ.get("ACCIDENTS_TILES_DIR", "assets/.tiles")
+TILE_SIZE = 256
+TILE_ZOOMS = range(5, 11)
+
+# Zooms proposés pour l'image assemblée de la France : au zoom 9, elle dépasse
+# déjà 5 000 px de côté (plus de 100 Mo en RGBA à assembler)
+MOSAIC_ZOOMS = range(5, 9)
+
+# Incrémenté quand le rendu des tuiles change
+TILES_VERSION = 1
+
+# France métropolitaine (sud, ouest, nord, est)
+FRANCE_BOUNDS = (41.0, -5.5, 51.5, 10.0)
+
+_year_locks = {}
+_year_locks_guard = threading.Lock()
+
+
+def lonlat_to_pixels(lat, lon, zoom):
+    # Coordonnées en pixels du monde entier au zoom donné (Web Mercator)
+    scale = TILE_SIZE * 2**zoom
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)
+    x = (np.asarray(lon, dtype=np.float64) + 180) / 360 * scale
+    y = (1 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2 * scale
+    return x, y
+
+
+def pixels_to_lat(y, zoom):
+    scale = TILE_SIZE * 2**zoom
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y) / scale))))
+
+
+def colorize(density):
+    # Densité normalisée [0, 1] -> RGBA : jaune transparent vers rouge opaque
+    rgba = np.zeros(density.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[..., 1] = (220 * (1 - density)).astype(np.uint8)
+    rgba[..., 3] = np.where(density > 0, 90 + 165 * density, 0).astype(np.uint8)
+    return rgba
+
+
+def render_zoom(lat, lon, zoom):
+    # {(x, y): tableau RGBA} des tuiles non vides ; échelle logarithmique commune
+    # à tout le niveau de zoom pour que les tuiles se raccordent
+    x, y = lonlat_to_pixels(lat, lon, zoom)
+    size = TILE_SIZE * 2**zoom
+    pixels = np.clip(y.astype(np.int64), 0, size - 1) * size + np.clip(
+        x.astype(np.int64), 0, size - 1
+    )
+    pixels, counts = np.unique(pixels, return_counts=True)
+    if not len(pixels):
+        return {}
+    density = np.log1p(counts) / np.log1p(counts.max())
+    py, px = np.divmod(pixels, size)
+    tile_ids = (py // TILE_SIZE) * 2**zoom + px // TILE_SIZE
+    tiles = {}
+    for tile_id in np.unique(tile_ids):
+        inside = tile_ids == tile_id
+        grid = np.zeros((TILE_SIZE, TILE_SIZE))
+        grid[py[inside] % TILE_SIZE, px[inside] % TILE_SIZE] = density[inside]
+        tile_y, tile_x = divmod(int(tile_id), 2**zoom)
+        tiles[tile_x, tile_y] = colorize(grid)
+    return tiles
+
+
+def year_dir(year):
+    return os.path.join(TILES_DIR, str(year))
+
+
+def tile_path(year, zoom, x, y, root=None):
+    return os.path.join(root or year_dir(year), str(zoom), str(x), f"{y}.png")
+
+
+@contextmanager
+def _year_lock(year):
+    # Non réentrant : flock sur un second descripteur bloquerait le même processus
+    with _year_locks_guard:
+        lock = _year_locks.setdefault(year, threading.Lock())
+    with lock:
+        os.makedirs(TILES_DIR, exist_ok=True)
+        with open(os.path.join(TILES_DIR, f"{year}.lock"), "w") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+
+def _manifest(year):
+    stat = os.stat(source_path(year, "caracteristiques"))
+    return {
+        "version": TILES_VERSION,
+        "source": [stat.st_mtime_ns, stat.st_size],
+        "zooms": list(TILE_ZOOMS),
+    }
+
+
+def _build_year_tiles(year, force):
+    # Appelé sous _year_lock
+    manifest_path = os.path.join(year_dir(year), "manifest.json")
+    manifest = _manifest(year)
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                return False
+
+    characteristics = load_data(year)[0]
+    lat = characteristics["lat"].to_numpy(dtype=np.float64)
+    lon = characteristics["long"].to_numpy(dtype=np.float64)
+    valid = valid_coordinates(lat, lon)
+    # Construction à côté de l'ancien jeu, qui reste lisible jusqu'à l'échange
+    target = year_dir(year)
+    tmp_dir, old_dir = f"{target}.{os.getpid()}.tmp", f"{target}.{os.getpid()}.old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for zoom in TILE_ZOOMS:
+        for (x, y), rgba in render_zoom(lat[valid], lon[valid], zoom).items():
+            path = tile_path(year, zoom, x, y, root=tmp_dir)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            Image.fromarray(rgba, "RGBA").save(path, optimize=True)
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    if os.path.exists(target):
+        os.replace(target, old_dir)
+    os.replace(tmp_dir, target)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return True
+
+
+def build_year_tiles(year, force=False):
+    # Incrémental : une année n'est reconstruite que si ses caractéristiques ont changé
+    with _year_lock(year):
+        return _build_year_tiles(year, force)
+
+
+def mosaic_path(year, zoom, bounds):
+    name = "_".join(f"{bound:g}" for bound in bounds)
+    return os.path.join(year_dir(year), f"mosaic-{zoom}-{name}.png")
+
+
+def _tile_range(zoom, bounds):
+    south, west, north, east = bounds
+    x0, y0 = (int(v // TILE_SIZE) for v in lonlat_to_pixels(north, west, zoom))
+    x1, y1 = (int(v // TILE_SIZE) for v in lonlat_to_pixels(south, east, zoom))
+    return x0, y0, x1, y1
+
+
+def _assemble(year, zoom, bounds):
+    # Image PNG des tuiles couvrant bounds, écrite à côté des tuiles : elle est
+    # supprimée avec elles quand l'année est reconstruite
+    x0, y0, x1, y1 = _tile_range(zoom, bounds)
+    mosaic = Image.new("RGBA", ((x1 - x0 + 1) * TILE_SIZE, (y1 - y0 + 1) * TILE_SIZE))
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            path = tile_path(year, zoom, x, y)
+            if os.path.exists(path):
+                with Image.open(path) as tile:
+                    mosaic.paste(tile, ((x - x0) * TILE_SIZE, (y - y0) * TILE_SIZE))
+    path = mosaic_path(year, zoom, bounds)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    mosaic.save(tmp_path, format="PNG", optimize=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_mosaic(year, zoom, bounds, source):
+    path = mosaic_path(year, zoom, bounds)
+    if not os.path.exists(path):
+        path = _assemble(year, zoom, bounds)
+    with open(path, "rb") as f:
+        url = "data:image/png;base64," + base64.b64encode(f.read()).decode()
+    x0, y0, x1, y1 = _tile_range(zoom, bounds)
+    scale = 2**zoom
+    image_bounds = [
+        [float(pixels_to_lat((y1 + 1) * TILE_SIZE, zoom)), x0 / scale * 360 - 180],
+        [float(pixels_to_lat(y0 * TILE_SIZE, zoom)), (x1 + 1) / scale * 360 - 180],
+    ]
+    return url, image_bounds
+
+
+def tile_mosaic(year, zoom, bounds=FRANCE_BOUNDS):
+    # Image des tuiles couvrant bounds (URL data:) et ses bornes exactes
+    # [[sud, ouest], [nord, est]] ; assemblée une fois par jeu de tuiles, puis
+    # relue du disque ou de la mémoire. Tuiles et image sont lues sous le verrou
+    # de l'année : une reconstruction concurrente attend la fin de la lecture
+    with _year_lock(year):
+        _build_year_tiles(year, force=False)
+        source = tuple(_manifest(year)["source"])
+        return _cached_mosaic(year, zoom, tuple(bounds), source)
+
+
+if __name__ == "__main__":
+    for year in map(int, sys.argv[1:]):
+        built = build_year_tiles(year)
+        print(year, "built" if built else "up to date")
@@ -1,45 +1,410 @@
 # Importation des bibliothèques nécessaires
 import streamlit as st
 import pandas as pd
+import numpy as np
+import functools
+import logging
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
+import schema
+from perf import timed
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # sans pyarrow, on relit simplement les CSV
+    pa = pq = None
+
+# Budget mémoire du cache partagé de load_data (en Mo), configurable par variable d'environnement
+CACHE_MAX_MB = int(os.environ.get("ACCIDENTS_CACHE_MAX_MB", "1024"))
+
+TABLES = ("caracteristiques", "lieux", "usagers", "vehicules")
+
+# Plafond mémoire d'un morceau lors de la lecture en flux (iter_chunks), en Mo
+STREAM_MEMORY_MB = int(os.environ.get("ACCIDENTS_STREAM_MEMORY_MB", "64"))
+
+# Copies colonnaires (Parquet) des CSV, reconstruites quand le CSV source change
+COLUMNAR_DIR = os.environ.get("ACCIDENTS_COLUMNAR_DIR", "assets/.columnar")
+
+_logger = logging.getLogger("accidents.data")
+_fallback_warned = False
+
+# Cache commun à toutes les pages et à toutes les sessions du processus Streamlit
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _split_hrmn(hrmn):
+    # Chemin rapide : toutes les valeurs au format "HH:MM" en ASCII, on lit les
+    # chiffres directement dans les octets
+    try:
+        raw = hrmn.to_numpy(dtype="S")
+    except (UnicodeEncodeError, ValueError, TypeError):
+        raw = None
+    if raw is not None and len(raw) and raw.dtype.itemsize == 5:
+        codes = raw.view(np.uint8).reshape(-1, 5)
+        digits = codes[:, [0, 1, 3, 4]].astype(np.int64) - ord("0")
+        if (codes[:, 2] == ord(":")).all() and ((digits >= 0) & (digits <= 9)).all():
+            hour = digits[:, 0] * 10 + digits[:, 1]
+            minute = digits[:, 2] * 10 + digits[:, 3]
+            return (
+                pd.Series(hour, index=hrmn.index),
+                pd.Series(minute, index=hrmn.index),
+            )
+
+    parts = hrmn.str.split(":")
+    return parts.str[0].astype(int), parts.str[1].astype(int)
+
+
+def convert_coordinates(values):
+    # Équivalent vectorisé de float(str(x).replace(",", ".").replace(" ", "")),
+    # -1 quand la conversion échoue
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+
+    text = values.astype(str).str.replace(",", ".", regex=False)
+    text = text.str.replace(" ", "", regex=False)
+    # astype(float) reproduit exactement float(), contrairement à to_numeric
+    # qui peut différer au dernier chiffre sur les longues décimales
+    try:
+        return pd.Series(text.to_numpy().astype(np.float64), index=values.index)
+    except ValueError:
+        pass
+
+    # Au moins une valeur invalide : on isole les valeurs lisibles par to_numeric
+    result = np.full(len(text), np.nan)
+    valid = pd.to_numeric(text, errors="coerce").notna().to_numpy()
+    try:
+        result[valid] = text.to_numpy()[valid].astype(np.float64)
+    except ValueError:
+        valid[:] = False
+
+    def convert(value):
+        try:
+            return float(value)
+        except ValueError:
+            return -1.0
+
+    # Les rares valeurs restantes ("nan", "", texte...) passent par float()
+    rest = text[~valid]
+    result[~valid] = rest.map(
+        {value: convert(value) for value in rest.unique()}
+    ).to_numpy()
+    return pd.Series(result, index=values.index)
+
+
+@timed
 def clean_characteristics(df):
-    df["hour"] = df["hrmn"].str.split(":").str[0].astype(int)
-    df["minute"] = df["hrmn"].str.split(":").str[1].astype(int)
+    df["hour"], df["minute"] = _split_hrmn(df["hrmn"])
     df.drop(columns=["hrmn"], inplace=True)
 
-    df["dep"] = pd.to_numeric(df["dep"], errors="coerce").fillna(0).astype(int)
+    # Une centaine de codes distincts seulement : on convertit les valeurs uniques
+    codes, uniques = pd.factorize(df["dep"])
+    dep = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce")
+    dep = dep.fillna(0).astype(int).to_numpy()
+    df["dep"] = np.where(codes >= 0, dep[codes], 0) if len(dep) else 0
+
+    df["lat"] = convert_coordinates(df["lat"])
+    df["long"] = convert_coordinates(df["long"])
+
+    return df
+
+
+@timed
+def normalize_legacy_characteristics(df):
+    # Format 2005-2018 ramené au format nettoyé de 2019+ : année sur deux chiffres,
+    # hrmn entier (1930), dep sur trois chiffres (750), coordonnées en 1e-5 degré
+    df["an"] = df["an"].where(df["an"] >= 100, df["an"] + 2000)
+
+    hrmn = pd.to_numeric(df["hrmn"].astype(str), errors="coerce").fillna(0)
+    hrmn = hrmn.astype(int).to_numpy()
+    df["hour"], df["minute"] = hrmn // 100, hrmn % 100
+    df.drop(columns=["hrmn"], inplace=True)
+
+    codes, uniques = pd.factorize(df["dep"])
+    dep = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce")
+    dep = dep.fillna(0).astype(int).to_numpy()
+    # Départements d'outre-mer (971...) inchangés ; la Corse (201, 202) donne 0
+    # comme "2A"/"2B" dans clean_characteristics
+    dep = np.where(dep >= 970, dep, np.where(np.isin(dep, (201, 202)), 0, dep // 10))
+    df["dep"] = np.where(codes >= 0, dep[codes], 0) if len(dep) else 0
+
+    for column in ("lat", "long"):
+        values = convert_coordinates(df[column])
+        df[column] = values.where(values == -1, values / 100000)
+
+    return df
+
+
+def valid_coordinates(lat, lon):
+    # NaN, -1 (conversion impossible) et (0, 0) ne sont pas des positions
+    return (
+        np.isfinite(lat)
+        & np.isfinite(lon)
+        & (lat != -1)
+        & (lon != -1)
+        & ~((lat == 0) & (lon == 0))
+        & (np.abs(lat) <= 90)
+        & (np.abs(lon) <= 180)
+    )
+
+
+def source_path(year, table):
+    return os.path.join(f"assets/{year}", f"{table}-{year}.csv")
+
+
+def csv_options(year):
+    # Jusqu'en 2018 les fichiers sont séparés par des virgules et encodés en latin1
+    if year > 2018:
+        return {"sep": ";"}
+    return {"sep": ",", "encoding": "latin1"}
+
 
-    def convert_latitude(latitude):
+def columnar_path(year, table):
+    return os.path.join(COLUMNAR_DIR, str(year), f"{table}-{year}.parquet")
+
+
+@timed
+def _read_csv_table(year, table):
+    path = source_path(year, table)
+    try:
+        df = pd.read_csv(path, dtype=schema.parse_dtypes(table), **csv_options(year))
+    except (ValueError, TypeError):
+        # Valeur hors format dans un millésime : lecture sans types imposés
+        df = pd.read_csv(path, **csv_options(year))
+    return _clean(df, year, table)
+
+
+def _clean(df, year, table):
+    if table == "caracteristiques":
+        if year > 2018:
+            df = clean_characteristics(df)
+        else:
+            df = normalize_legacy_characteristics(df)
+    return schema.finalize(df, table)
+
+
+def iter_chunks(year, table, columns=None, memory_mb=None):
+    # Lecture en flux : chaque morceau est typé, nettoyé puis rendu à l'appelant,
+    # qui l'agrège et le libère. La taille des morceaux s'ajuste pour qu'un
+    # morceau (texte brut compris) reste sous le plafond mémoire.
+    memory_mb = memory_mb or STREAM_MEMORY_MB
+    options = {**csv_options(year), "dtype": schema.parse_dtypes(table)}
+    if columns is not None:
+        wanted = set(columns)
+        if table == "caracteristiques":
+            # Colonnes nécessaires au nettoyage
+            wanted |= {"an", "hrmn", "dep", "lat", "long"}
+        options["usecols"] = lambda column: column in wanted
+
+    rows = 1_000  # premier morceau de calibrage
+    with pd.read_csv(source_path(year, table), iterator=True, **options) as reader:
+        while True:
+            try:
+                chunk = reader.get_chunk(rows)
+            except StopIteration:
+                return
+            chunk = _clean(chunk, year, table)
+            # Le parseur garde aussi le texte brut : on compte trois fois la taille typée
+            row_bytes = 3 * chunk.memory_usage(deep=True).sum() / max(len(chunk), 1)
+            rows = max(1_000, int(memory_mb * 1024 * 1024 / max(row_bytes, 1)))
+            yield chunk if columns is None else chunk[list(columns)]
+
+
+def _write_columnar(df, path, tag):
+    # Parquet exige un type par colonne : les colonnes objet mêlant nombres et
+    # chaînes (ex. "voie") sont stockées en chaînes
+    for column in df.columns:
+        if pd.api.types.infer_dtype(df[column], skipna=True).startswith("mixed"):
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), b"accidents_source": tag}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    os.replace(tmp_path, path)
+
+
+@timed
+def read_table(year, table, columnar=True):
+    global _fallback_warned
+    if columnar and pq is None and not _fallback_warned:
+        # Une seule fois par processus : chaque lecture relira le CSV
+        _logger.warning("pyarrow is not installed: Parquet cache disabled, reading CSV")
+        _fallback_warned = True
+    if not columnar or pq is None:
+        return _read_csv_table(year, table)
+
+    stat = os.stat(source_path(year, table))
+    tag = f"{schema.SCHEMA_VERSION}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+    path = columnar_path(year, table)
+    if os.path.exists(path):
         try:
-            # Convertir la valeur en chaîne de caractères, puis supprimer les virgules et les espaces, puis convertir en float
-            latitude_str = str(latitude).replace(",", ".").replace(" ", "")
-            return float(latitude_str)
-        except ValueError:
-            # Si la conversion échoue, renvoyer une valeur par défaut (par exemple, -1)
-            return -1  # Vous pouvez choisir une valeur appropriée ici
-        # Appliquer la fonction de conversion à la colonne 'latitude'
+            if pq.read_schema(path).metadata.get(b"accidents_source") == tag:
+                return schema.finalize(pd.read_parquet(path), table)
+        except (OSError, AttributeError, pa.ArrowException):
+            pass  # copie illisible : on la reconstruit
+
+    df = _read_csv_table(year, table)
+    try:
+        _write_columnar(df, path, tag)
+    except (OSError, pa.ArrowException) as error:
+        # Dossier en lecture seule ou colonne non convertible : on garde le CSV
+        _logger.warning("Parquet copy of %s %s not written: %s", table, year, error)
+    return df
 
-    df["lat"] = df["lat"].apply(convert_latitude)
-    df["long"] = df["long"].apply(convert_latitude)
 
-    # Maintenant, la colonne 'latitude' contient des valeurs float
+def source_signature(year):
+    # (mtime, taille) de chaque CSV : si un fichier est remplacé, la clé du cache change
+    signature = []
+    for table in TABLES:
+        stat = os.stat(source_path(year, table))
+        signature.append((table, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
 
+
+def freeze(df):
+    # Rend les tableaux numpy sous-jacents non modifiables : une page ne peut pas
+    # altérer en place les données partagées avec les autres pages/sessions
+    for block in df._mgr.blocks:
+        values = block.values
+        # Catégories et entiers nullables : on gèle les tableaux qui les portent
+        for array in (
+            values,
+            *(getattr(values, a, None) for a in ("_codes", "_data", "_mask")),
+        ):
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
     return df
 
 
+def _frames_nbytes(frames):
+    return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+
+def _evict(max_bytes):
+    while _cache and sum(entry[1] for entry in _cache.values()) > max_bytes:
+        _cache.popitem(last=False)
+        _cache_stats["evictions"] += 1
+
+
+def _read_year(year):
+    return tuple(read_table(year, table) for table in TABLES)
+
+
+def load_years(years, tables=TABLES, max_workers=None):
+    # Lecture concurrente de chaque (année, table) : le parseur CSV et la lecture
+    # Parquet relâchent le GIL. Renvoie une table par nom, concaténée année par
+    # année avec une colonne "year".
+    jobs = [(year, table) for year in sorted(years) for table in tables]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        frames = dict(zip(jobs, executor.map(lambda job: read_table(*job), jobs)))
+
+    combined = {}
+    for table in tables:
+        parts = [frames[year, table].assign(year=year) for year in sorted(years)]
+        df = pd.concat(parts, ignore_index=True)
+        df["year"] = df["year"].astype("int16")
+        # Les catégories diffèrent d'une année à l'autre : concat repasse en objet
+        combined[table] = schema.finalize(df, table)
+    return combined
+
+
+@timed
 def load_data(year):
-    base_path = f"assets/{year}"
-    caracteristiques = pd.read_csv(
-        os.path.join(base_path, f"caracteristiques-{year}.csv"), sep=";"
+    key = (year, source_signature(year))
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+    if entry is None:
+        frames = tuple(freeze(df) for df in _read_year(year))
+        entry = (frames, _frames_nbytes(frames))
+        with _cache_lock:
+            _cache_stats["misses"] += 1
+            # Les anciennes versions de la même année ne serviront plus
+            for stale in [k for k in _cache if k[0] == year and k != key]:
+                del _cache[stale]
+            _cache[key] = entry
+            _evict(CACHE_MAX_MB * 1024 * 1024)
+    # Copies superficielles : ajouter ou remplacer une colonne ne touche pas au cache
+    return tuple(df.copy(deep=False) for df in entry[0])
+
+
+def build_location_index(characteristics, column):
+    # Lignes des caractéristiques regroupées par code (dep, com...) : les lignes
+    # d'un code sont order[start:stop], dans l'ordre du fichier. Centre et
+    # rectangle englobant sont calculés sur les coordonnées valides.
+    codes, uniques = pd.factorize(characteristics[column], sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+    lat = characteristics["lat"].to_numpy(dtype=np.float64, na_value=np.nan)
+    lon = characteristics["long"].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = valid_coordinates(lat, lon) & (codes >= 0)
+    places = (
+        pd.DataFrame({"code": codes[valid], "lat": lat[valid], "lon": lon[valid]})
+        .groupby("code")
+        .agg(
+            lat=("lat", "mean"),
+            lon=("lon", "mean"),
+            south=("lat", "min"),
+            west=("lon", "min"),
+            north=("lat", "max"),
+            east=("lon", "max"),
+        )
     )
 
-    caracteristiques = clean_characteristics(caracteristiques)
-    lieux = pd.read_csv(os.path.join(base_path, f"lieux-{year}.csv"), sep=";")
-    usagers = pd.read_csv(os.path.join(base_path, f"usagers-{year}.csv"), sep=";")
-    vehicules = pd.read_csv(os.path.join(base_path, f"vehicules-{year}.csv"), sep=";")
-    return caracteristiques, lieux, usagers, vehicules
+    entries = {}
+    for code, value in enumerate(pd.Index(uniques).tolist()):
+        entry = {"rows": (int(bounds[code]), int(bounds[code + 1]))}
+        entry["count"] = entry["rows"][1] - entry["rows"][0]
+        entry["centroid"] = entry["bbox"] = None
+        if code in places.index:
+            place = places.loc[code]
+            entry["centroid"] = (place["lat"], place["lon"])
+            entry["bbox"] = tuple(place[["south", "west", "north", "east"]])
+        entries[value] = entry
+    order.flags.writeable = False
+    return {"column": column, "order": order, "codes": entries}
+
+
+def location_rows(index, code):
+    # Positions (lignes des caractéristiques) des accidents d'un code : une tranche
+    start, stop = index["codes"][code]["rows"]
+    return index["order"][start:stop]
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_location_index(year, signature, column):
+    return build_location_index(load_data(year)[0], column)
+
+
+def location_index(year, column="dep"):
+    # Index construit une fois par (année, colonne) et partagé par les pages
+    return _cached_location_index(year, source_signature(year), column)
+
+
+def cache_info():
+    with _cache_lock:
+        return {
+            **_cache_stats,
+            "entries": len(_cache),
+            "nbytes": sum(entry[1] for entry in _cache.values()),
+            "max_bytes": CACHE_MAX_MB * 1024 * 1024,
+        }
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+        for name in _cache_stats:
+            _cache_stats[name] = 0
 
 
 def alignement(numb):